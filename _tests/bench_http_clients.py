@@ -0,0 +1,136 @@
+"""
+Benchmark: requests-based HttpUser vs geventhttpclient-based FastHttpUser.
+
+Starts a minimal keep-alive HTTP server (one process per --server-procs,
+sharing the port with SO_REUSEPORT), then runs locustfile.py headless once
+with LOCUST_CLIENT=requests and once with LOCUST_CLIENT=fast, with no wait
+time, and compares the aggregated requests per second. The Locust process is
+pinned to one CPU where the platform allows it, so the numbers are per core.
+
+USAGE (from the backend directory, so `app` is importable):
+    python app/core/locust_load_test/_tests/bench_http_clients.py --users 50 --seconds 20
+"""
+import argparse
+import csv
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+LOCUSTFILE = Path(__file__).parent.parent / "locustfile.py"
+
+SERVER = r"""
+import sys
+from gevent import socket
+from gevent.server import StreamServer
+
+BODY = b'{"status":"ok"}'
+RESPONSE = (
+    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+    b"Content-Length: " + str(len(BODY)).encode() + b"\r\n\r\n" + BODY
+)
+
+def handle(sock, address):
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    buffer = b""
+    while True:
+        try:
+            data = sock.recv(65536)
+        except ConnectionError:
+            return
+        if not data:
+            return
+        buffer += data
+        while b"\r\n\r\n" in buffer:
+            head, _, buffer = buffer.partition(b"\r\n\r\n")
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    buffer = buffer[int(line.split(b":")[1]):]
+            sock.sendall(RESPONSE)
+
+listener = socket.socket()
+listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+listener.bind(("127.0.0.1", int(sys.argv[1])))
+listener.listen(1024)
+StreamServer(listener, handle).serve_forever()
+"""
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+CPUS = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else []
+
+
+def pin_to(cpus):
+    """preexec_fn restricting the child to `cpus`; a no-op where affinity isn't available."""
+    def preexec():
+        if cpus:
+            os.sched_setaffinity(0, cpus)
+    return preexec
+
+
+def run_locust(client, host, users, seconds, workdir):
+    prefix = os.path.join(workdir, client)
+    env = dict(os.environ, LOCUST_CLIENT=client, LOCUST_WAIT_TIME_MIN="0", LOCUST_WAIT_TIME_MAX="0")
+    subprocess.run(
+        [
+            sys.executable, "-m", "locust", "-f", str(LOCUSTFILE), "--headless",
+            "-u", str(users), "-r", str(users), "-t", f"{seconds}s",
+            "--host", host, "--csv", prefix, "--only-summary", "--loglevel", "ERROR",
+        ],
+        env=env,
+        preexec_fn=pin_to(CPUS[:1]),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        check=False,
+    )
+    with open(f"{prefix}_stats.csv", newline="") as f:
+        for row in csv.DictReader(f):
+            if row["Name"] == "Aggregated":
+                ok = float(row["Request Count"]) - float(row["Failure Count"])
+                return ok / seconds, float(row["Average Response Time"])
+    return 0.0, 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare HttpUser and FastHttpUser throughput per core")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--seconds", type=int, default=20)
+    parser.add_argument("--server-procs", type=int, default=max(1, min(4, len(CPUS) - 1)))
+    args = parser.parse_args()
+
+    if len(CPUS) < 2:
+        print("Only one CPU available: the server shares it with Locust, so absolute numbers are low")
+    port = free_port()
+    servers = [
+        subprocess.Popen([sys.executable, "-c", SERVER, str(port)], preexec_fn=pin_to(CPUS[1:]))
+        for _ in range(args.server_procs)
+    ]
+    try:
+        time.sleep(1)
+        host = f"http://127.0.0.1:{port}"
+        results = {}
+        with tempfile.TemporaryDirectory() as workdir:
+            for client in ("requests", "fast"):
+                results[client] = run_locust(client, host, args.users, args.seconds, workdir)
+    finally:
+        for server in servers:
+            server.terminate()
+
+    print(f"{'client':>10} {'ok req/s per core':>18} {'avg ms':>8}")
+    for client, (rps, avg) in results.items():
+        print(f"{client:>10} {rps:>18.0f} {avg:>8.2f}")
+    if results["requests"][0]:
+        print(f"speedup: {results['fast'][0] / results['requests'][0]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
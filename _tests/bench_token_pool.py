@@ -0,0 +1,84 @@
+"""
+Microbenchmark: TokenPool vs the previous list + RLock token pool.
+
+Measures the cost of handing out a token (the hot path every authenticated
+task goes through) and of adding a token to a full pool (which triggers an
+eviction), at 10, 100 and 1000 tokens.
+
+USAGE:
+    python backend/app/core/locust_load_test/_tests/bench_token_pool.py
+"""
+import importlib.util
+import random
+import threading
+import timeit
+from pathlib import Path
+
+# Load custom/token_pool.py directly so the benchmark runs without the app package
+TOKEN_POOL_PATH = Path(__file__).parent.parent / "custom" / "token_pool.py"
+spec = importlib.util.spec_from_file_location("token_pool", TOKEN_POOL_PATH)
+token_pool = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(token_pool)
+
+POOL_SIZES = [10, 100, 1000]
+ACQUIRE_CALLS = 20000
+ADD_CALLS = 2000
+
+
+class LegacyTokenPool:
+    """The weighted-random list pool FastAPIUser used before TokenPool."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.tokens = []
+        self.usage = {}
+        self.lock = threading.RLock()
+
+    def acquire(self):
+        with self.lock:
+            if not self.tokens:
+                return None
+            weights = [1.0 / (self.usage.get(t, 0) + 1) for t in self.tokens]
+            idx = random.choices(range(len(self.tokens)), weights=weights, k=1)[0]
+            token = self.tokens[idx]
+            self.usage[token] = self.usage.get(token, 0) + 1
+            return token
+
+    def add(self, token):
+        with self.lock:
+            if token not in self.tokens:
+                self.tokens.append(token)
+                self.usage[token] = 0
+                if len(self.tokens) > self.max_size:
+                    most_used = max(self.tokens, key=lambda t: self.usage.get(t, 0))
+                    self.tokens.remove(most_used)
+                    del self.usage[most_used]
+
+
+def filled(pool_cls, size):
+    pool = pool_cls(max_size=size)
+    for i in range(size):
+        pool.add(f"token-{i}")
+    return pool
+
+
+def bench(pool_cls, size):
+    pool = filled(pool_cls, size)
+    acquire = timeit.timeit(pool.acquire, number=ACQUIRE_CALLS) / ACQUIRE_CALLS
+
+    counter = iter(range(10**9))
+    pool = filled(pool_cls, size)
+    add = timeit.timeit(lambda: pool.add(f"new-{next(counter)}"), number=ADD_CALLS) / ADD_CALLS
+    return acquire * 1e6, add * 1e6
+
+
+def main():
+    print(f"{'tokens':>8} {'impl':>8} {'acquire (us)':>14} {'add+evict (us)':>16}")
+    for size in POOL_SIZES:
+        for label, pool_cls in (("legacy", LegacyTokenPool), ("bucketed", token_pool.TokenPool)):
+            acquire_us, add_us = bench(pool_cls, size)
+            print(f"{size:>8} {label:>8} {acquire_us:>14.2f} {add_us:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
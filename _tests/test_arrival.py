@@ -0,0 +1,169 @@
+"""
+Test suite for arrival.py
+Checks constant and Poisson pacing, the per-worker split of the rate and
+missed-arrival accounting when users fall behind.
+
+Run with: pytest test_arrival.py
+"""
+import importlib.util
+from pathlib import Path
+
+import gevent
+import pytest
+
+MODULE_PATH = Path(__file__).parent.parent / "arrival.py"
+
+
+@pytest.fixture
+def arrival():
+    spec = importlib.util.spec_from_file_location("arrival", MODULE_PATH)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_constant_rate_spaces_arrivals_evenly(arrival):
+    clock = FakeClock()
+    schedule = arrival.ArrivalSchedule(10, clock=clock)
+
+    due = [schedule.claim() for _ in range(5)]
+
+    assert due == pytest.approx([100.0, 100.1, 100.2, 100.3, 100.4])
+    assert schedule.wait_time() == pytest.approx(0.5)
+
+
+def test_workers_split_rate_and_interleave(arrival):
+    clock = FakeClock()
+    workers = [arrival.ArrivalSchedule(10, worker_index=i, worker_count=2, clock=clock) for i in range(2)]
+
+    due = sorted(t for schedule in workers for t in (schedule.claim(), schedule.claim(), schedule.claim()))
+
+    assert workers[0].worker_rate == 5
+    assert due == pytest.approx([100.0 + 0.1 * i for i in range(6)])
+
+
+def test_late_arrivals_are_dropped_as_missed(arrival):
+    clock = FakeClock()
+    schedule = arrival.ArrivalSchedule(10, max_lag=0.55, clock=clock)
+    schedule.claim()
+
+    clock.now += 2.0  # every user was busy for two seconds
+    due = schedule.claim()
+
+    assert clock.now - due <= 0.55
+    assert schedule.missed == 14
+    assert schedule.take_counts() == {"started": 2, "missed": 14}
+    assert schedule.take_counts() == {"started": 0, "missed": 0}
+
+
+def test_dropped_arrivals_are_handed_to_the_histograms(arrival, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(arrival, "schedule", arrival.ArrivalSchedule(10, max_lag=0.25, clock=clock))
+    wait_time = arrival.open_model_wait_time(None)
+    wait_time(None)
+
+    clock.now += 0.45  # arrivals at +0.1 and +0.2 are more than 0.25 s late
+    wait_time(None)
+
+    assert arrival.take_missed_lags_ms() == pytest.approx([350.0, 250.0])
+    assert arrival.take_missed_lags_ms() == []
+    assert arrival.task_start_lag_ms() == pytest.approx(150.0)
+
+
+def test_spawned_greenlets_carry_the_task_lag(arrival, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(arrival, "schedule", arrival.ArrivalSchedule(10, max_lag=5, clock=clock))
+    wait_time = arrival.open_model_wait_time(None)
+    wait_time(None)
+    clock.now += 0.35
+    wait_time(None)
+
+    plain = gevent.spawn(arrival.task_start_lag_ms)
+    carried = gevent.spawn(arrival.carry_task_lag(arrival.task_start_lag_ms))
+    gevent.joinall([plain, carried])
+
+    assert plain.value == 0.0
+    assert carried.value == pytest.approx(250.0)
+
+
+def test_poisson_rate_matches_on_average(arrival):
+    clock = FakeClock()
+    schedule = arrival.ArrivalSchedule(50, mode="poisson", max_lag=1e9, seed=7, clock=clock)
+
+    due = [schedule.claim() for _ in range(20000)]
+
+    assert (due[-1] - due[0]) / (len(due) - 1) == pytest.approx(1 / 50, rel=0.05)
+
+
+def test_poisson_is_replayable_with_seed(arrival):
+    first, second = (
+        arrival.ArrivalSchedule(5, mode="poisson", seed=1, worker_index=1, worker_count=3, clock=FakeClock())
+        for _ in range(2)
+    )
+
+    assert [first.claim() for _ in range(10)] == [second.claim() for _ in range(10)]
+
+
+def test_invalid_mode_is_rejected(arrival):
+    with pytest.raises(ValueError):
+        arrival.ArrivalSchedule(1, mode="burst")
+
+
+def test_open_model_wait_time_only_replaces_when_rate_set(arrival, monkeypatch):
+    closed = object()
+    monkeypatch.setattr(arrival, "schedule", None)
+    assert arrival.open_model_wait_time(closed) is closed
+
+    clock = FakeClock()
+    monkeypatch.setattr(arrival, "schedule", arrival.ArrivalSchedule(4, clock=clock))
+    wait_time = arrival.open_model_wait_time(closed)
+    assert [wait_time(None) for _ in range(3)] == pytest.approx([0.0, 0.25, 0.5])
+
+
+def test_open_model_wait_time_records_task_lag(arrival, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(arrival, "schedule", arrival.ArrivalSchedule(10, max_lag=5, clock=clock))
+    wait_time = arrival.open_model_wait_time(None)
+
+    assert wait_time(None) == 0.0
+    assert arrival.task_start_lag_ms() == 0.0
+
+    clock.now += 0.35  # the user was busy past its next arrival
+    assert wait_time(None) == 0.0
+    assert arrival.task_start_lag_ms() == pytest.approx(250.0)
+    assert arrival.start_lag_source() is arrival.task_start_lag_ms
+
+
+def test_replacing_keeps_counts_and_takes_new_share(arrival):
+    clock = FakeClock()
+    schedule = arrival.ArrivalSchedule(12, worker_index=0, worker_count=3, clock=clock)
+    schedule.claim()
+    schedule.claim()
+
+    schedule.place(1, 2)  # a worker left mid-run
+
+    assert schedule.worker_rate == 6
+    assert schedule.claim() == pytest.approx(100.0 + 1 / 12)
+    assert schedule.take_counts() == {"started": 3, "missed": 0}
+
+
+def test_users_hold_off_until_worker_is_placed(arrival, monkeypatch):
+    schedule = arrival.ArrivalSchedule(10, clock=FakeClock())
+    schedule.placed = False
+    monkeypatch.setattr(arrival, "schedule", schedule)
+    wait_time = arrival.open_model_wait_time(None)
+
+    assert wait_time(None) == arrival.UNPLACED_WAIT
+    assert schedule.started == 0
+
+    schedule.place(0, 2)
+    assert wait_time(None) == 0.0
+    assert schedule.started == 1
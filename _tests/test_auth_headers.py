@@ -0,0 +1,77 @@
+"""
+Test suite for custom/auth_headers.py
+Checks that HeaderCache hands out the same mapping for a token / IP pair,
+drops a token's mappings when it rotates out, and that the shared mappings
+cannot be modified.
+
+Run with: pytest test_auth_headers.py
+"""
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+MODULE_PATH = Path(__file__).parent.parent / "custom" / "auth_headers.py"
+
+
+@pytest.fixture
+def auth_headers():
+    spec = importlib.util.spec_from_file_location("auth_headers", MODULE_PATH)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def test_headers_are_built_once_per_token_and_ip(auth_headers):
+    cache = auth_headers.HeaderCache()
+
+    plain = cache.get("t1")
+    spoofed = cache.get("t1", "10.0.0.1")
+
+    assert cache.get("t1") is plain
+    assert cache.get("t1", "10.0.0.1") is spoofed
+    assert dict(plain) == {"Authorization": "Bearer t1", "Content-Type": "application/json"}
+    assert all(spoofed[name] == "10.0.0.1" for name in auth_headers.IP_SPOOFING_HEADERS)
+    assert cache.ip_headers("10.0.0.1") is cache.ip_headers("10.0.0.1")
+    assert len(cache) == 2
+
+
+def test_rotated_token_drops_only_its_own_headers(auth_headers):
+    cache = auth_headers.HeaderCache()
+    old = cache.get("old", "10.0.0.1")
+    other = cache.get("other", "10.0.0.1")
+
+    cache.invalidate_token("old")
+
+    assert len(cache) == 1
+    assert cache.get("other", "10.0.0.1") is other
+    rebuilt = cache.get("old", "10.0.0.1")
+    assert rebuilt is not old and rebuilt == old
+    assert cache.get("new", "10.0.0.1")["Authorization"] == "Bearer new"
+
+
+def test_shared_headers_cannot_be_modified(auth_headers):
+    cache = auth_headers.HeaderCache()
+    headers = cache.get("t1", "10.0.0.1")
+
+    with pytest.raises(TypeError):
+        headers["Authorization"] = "Bearer stolen"
+    with pytest.raises(TypeError):
+        del headers["X-Real-IP"]
+    with pytest.raises(TypeError):
+        cache.ip_headers("10.0.0.1")["X-Real-IP"] = "10.0.0.2"
+
+    copied = dict(headers)  # what the HTTP clients do before adding their own headers
+    copied["Accept"] = "application/json"
+    assert "Accept" not in cache.get("t1", "10.0.0.1")
+
+
+def test_full_cache_starts_over(auth_headers):
+    cache = auth_headers.HeaderCache(max_entries=2)
+    first = cache.get("t1")
+    cache.get("t2")
+
+    cache.get("t3")
+
+    assert len(cache) == 1
+    assert cache.get("t1") is not first
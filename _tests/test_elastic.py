@@ -0,0 +1,139 @@
+"""
+Test suite for elastic.py
+Checks the scaling policy and drives ElasticScaler with a fake master
+runner and fake worker processes.
+
+This does NOT start real Locust processes.
+
+Run with: pytest test_elastic.py
+"""
+import importlib.util
+import signal
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+MODULE_PATH = Path(__file__).parent.parent / "elastic.py"
+
+
+@pytest.fixture
+def elastic():
+    spec = importlib.util.spec_from_file_location("elastic", MODULE_PATH)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def test_parse_range(elastic):
+    assert elastic.parse_range("2:8") == (2, 8)
+    assert elastic.parse_range("4") == (4, 4)
+    with pytest.raises(ValueError):
+        elastic.parse_range("5:2")
+
+
+def test_policy_scales_up_on_cpu(elastic):
+    policy = elastic.ScalingPolicy(1, 10, cpu_high=75, cpu_low=30)
+
+    assert policy.desired([50.0, 60.0], target_users=0) == 2
+    assert policy.desired([80.0, 76.0], target_users=0) == 3
+    # Enough workers to bring 4 x 100% under 75%
+    assert policy.desired([100.0] * 4, target_users=0) == 6
+    assert policy.desired([100.0] * 9, target_users=0) == 10
+
+
+def test_policy_scales_down_one_at_a_time(elastic):
+    policy = elastic.ScalingPolicy(1, 10, cpu_high=75, cpu_low=30)
+
+    assert policy.desired([10.0, 10.0, 10.0], target_users=0) == 2
+    # Two workers at 30% would put one at 60%, which is fine; 45% each would not
+    assert policy.desired([30.0, 30.0], target_users=0) == 1
+    assert policy.desired([10.0], target_users=0) == 1
+
+
+def test_policy_keeps_capacity_for_target_users(elastic):
+    policy = elastic.ScalingPolicy(1, 5, users_per_worker=100)
+
+    assert policy.desired([5.0], target_users=350) == 4
+    assert policy.desired([5.0, 5.0, 5.0, 5.0], target_users=350) == 4
+    assert policy.desired([5.0], target_users=10_000) == 5
+
+
+class FakeProcess:
+    def __init__(self, pid):
+        self.pid = pid
+        self.signals = []
+
+    def poll(self):
+        return None
+
+    def send_signal(self, sig):
+        self.signals.append(sig)
+
+
+class Harness:
+    def __init__(self, elastic, state, clients, target_users=0, **policy):
+        self.now = 0.0
+        self.spawned = []
+        self.runner = SimpleNamespace(
+            state=state,
+            clients={f"w{i}": SimpleNamespace(state="running", cpu_usage=cpu) for i, cpu in enumerate(clients)},
+            target_user_count=target_users,
+        )
+
+        def spawn():
+            process = FakeProcess(len(self.spawned))
+            self.spawned.append(process)
+            return process
+
+        self.scaler = elastic.ElasticScaler(
+            SimpleNamespace(runner=self.runner),
+            elastic.ScalingPolicy(**policy),
+            cooldown=10,
+            spawn=spawn,
+            clock=lambda: self.now,
+        )
+
+
+def test_scaler_starts_minimum_before_first_run(elastic):
+    pytest.importorskip("locust")
+    harness = Harness(elastic, "ready", [], min_workers=2, max_workers=4)
+
+    assert harness.scaler.step() == 2
+    assert len(harness.spawned) == 2
+    # Cooldown covers the workers' startup
+    assert harness.scaler.step() == 0
+
+
+def test_scaler_follows_cpu_and_respects_cooldown(elastic):
+    pytest.importorskip("locust")
+    harness = Harness(elastic, "running", [90.0, 90.0], min_workers=1, max_workers=4)
+
+    assert harness.scaler.step() == 1
+    harness.runner.clients["n0"] = SimpleNamespace(state="running", cpu_usage=5.0)
+    for client in harness.runner.clients.values():
+        client.cpu_usage = 5.0
+    harness.now = 5
+    assert harness.scaler.step() == 0
+
+    harness.now = 10
+    assert harness.scaler.step() == -1
+    assert harness.spawned[0].signals == [signal.SIGTERM]
+    assert harness.scaler.retiring == [harness.spawned[0]]
+
+
+def test_scaler_never_stops_workers_it_did_not_start(elastic):
+    pytest.importorskip("locust")
+    harness = Harness(elastic, "running", [1.0, 1.0, 1.0], min_workers=1, max_workers=4)
+
+    assert harness.scaler.step() == 0
+    assert harness.spawned == []
+
+
+def test_local_workers_get_the_target_host(elastic):
+    environment = SimpleNamespace(host="http://target:8000", parsed_options=SimpleNamespace(host=None))
+    scaler = elastic.ElasticScaler(environment, elastic.ScalingPolicy(1, 2))
+    assert scaler.worker_args() == ["--host", "http://target:8000"]
+
+    environment.host = None
+    assert scaler.worker_args() == []
@@ -0,0 +1,213 @@
+"""
+Test suite for health_check.py
+Checks that one /stats/requests fetch serves every sub-check of a cycle,
+that latency is measured, and that many masters are polled concurrently.
+
+This uses a fake session and does NOT need a running Locust master.
+
+Run with: pytest test_health_check.py
+"""
+# Patch like locust does before requests/ssl are imported, or later test modules that import locust break
+from gevent import monkey
+
+monkey.patch_all()
+
+import asyncio
+import importlib.util
+import time
+from pathlib import Path
+
+import pytest
+import requests
+
+MODULE_PATH = Path(__file__).parent.parent / "health_check.py"
+
+
+@pytest.fixture
+def health_check():
+    spec = importlib.util.spec_from_file_location("health_check", MODULE_PATH)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+class FakeResponse:
+    def __init__(self, data, status_code=200):
+        self.data = data
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+
+class FakeSession:
+    def __init__(self, data=None, delay=0.0, error=None, timing=None):
+        self.data = data if data is not None else {"workers": [{"id": "w1"}, {"id": "w2"}]}
+        self.delay = delay
+        self.error = error
+        self.timing = timing  # /workers; None answers 404 like a master without worker_health.py
+        self.urls = []
+
+    def get(self, url, timeout, headers):
+        self.urls.append(url)
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        if url.endswith("/workers"):
+            return FakeResponse(self.timing, 200 if self.timing is not None else 404)
+        return FakeResponse(self.data)
+
+    def close(self):
+        pass
+
+
+def test_one_fetch_per_cycle(health_check):
+    now = [0.0]
+    session = FakeSession()
+    checker = health_check.LocustHealthChecker(
+        "http://master:8089", expected_workers=2, cache_ttl=1.0, session=session, clock=lambda: now[0]
+    )
+
+    report = checker.full_health_check()
+    assert session.urls == ["http://master:8089/stats/requests", "http://master:8089/workers"]
+    assert report["master"]["healthy"] and not report["master"]["cached"]
+    assert report["workers"] == {"connected": 2, "expected": 2, "worker_ids": ["w1", "w2"]}
+
+    assert checker.check_master_health()["cached"]
+    now[0] = 1.5
+    assert not checker.check_master_health()["cached"]
+    # /workers answered 404, so it is not asked again
+    assert session.urls[2:] == ["http://master:8089/stats/requests"]
+
+
+def test_response_time_is_measured(health_check):
+    checker = health_check.LocustHealthChecker("http://master:8089", session=FakeSession(delay=0.05))
+
+    assert checker.check_master_health()["details"]["response_time"] >= 0.05
+
+
+def test_unreachable_master(health_check):
+    session = FakeSession(error=requests.ConnectionError("refused"))
+    checker = health_check.LocustHealthChecker("http://master:8089", expected_workers=1, session=session)
+
+    report = checker.full_health_check()
+    assert not report["master"]["healthy"]
+    assert "refused" in report["master"]["details"]["error"]
+    assert report["workers"] == {"connected": 0, "expected": 1}
+    assert len(session.urls) == 1
+
+
+def test_check_masters_concurrently(health_check):
+    checkers = [
+        health_check.LocustHealthChecker(f"http://master-{i}:8089", session=FakeSession(delay=0.2))
+        for i in range(50)
+    ]
+
+    started = time.perf_counter()
+    reports = asyncio.run(health_check.check_masters(checkers))
+    assert time.perf_counter() - started < 1.0
+    assert [report["environment"]["url"] for report in reports] == [checker.master_url for checker in checkers]
+    assert all(report["master"]["healthy"] for report in reports)
+
+
+def stats(state="running", requests=0, **workers):
+    return {
+        "state": state,
+        "stats": [{"name": "Aggregated", "num_requests": requests}],
+        "workers": [{"id": worker, "state": worker_state} for worker, worker_state in workers.items()],
+    }
+
+
+def test_diff_snapshot_emits_only_transitions(health_check):
+    cluster = health_check.ClusterState()
+    diff = health_check.diff_snapshot
+
+    assert diff(cluster, stats(w1="ready"), 0) == [
+        {"event": "master_up", "state": "running", "workers": 1},
+        {"event": "worker_joined", "worker": "w1", "state": "ready"},
+    ]
+    assert diff(cluster, stats(requests=5, w1="ready"), 1) == []
+    assert diff(cluster, stats(requests=9, w1="missing", w2="running"), 2) == [
+        {"event": "worker_missing", "worker": "w1", "from": "ready", "to": "missing"},
+        {"event": "worker_joined", "worker": "w2", "state": "running"},
+    ]
+    assert diff(cluster, stats(requests=9, w2="running"), 3) == [{"event": "worker_left", "worker": "w1"}]
+    assert diff(cluster, None, 4, error="refused") == [{"event": "master_down", "error": "refused"}]
+    assert diff(cluster, None, 5) == []
+
+
+def test_diff_snapshot_detects_stall(health_check):
+    cluster = health_check.ClusterState()
+    diff = health_check.diff_snapshot
+
+    diff(cluster, stats(state="ready"), 0, stall_after=30)
+    # The stall clock starts with the run, not at master_up
+    diff(cluster, stats(requests=10), 50, stall_after=30)
+    assert diff(cluster, stats(requests=10), 70, stall_after=30) == []
+    assert diff(cluster, stats(requests=10), 81, stall_after=30) == [
+        {"event": "master_stalled", "requests": 10, "seconds": 31}
+    ]
+    assert diff(cluster, stats(requests=10), 90, stall_after=30) == []
+    assert diff(cluster, stats(requests=12), 91, stall_after=30) == [{"event": "master_resumed", "requests": 12}]
+    # A stopped test is not stalled
+    assert diff(cluster, stats(state="stopped", requests=12), 92, stall_after=30) == [
+        {"event": "master_state", "from": "running", "to": "stopped"}
+    ]
+    assert diff(cluster, stats(state="stopped", requests=12), 100, stall_after=30) == []
+
+
+def test_watcher_polls_every_master(health_check):
+    sessions = [FakeSession(stats(w1="ready")), FakeSession(error=requests.ConnectionError("refused"))]
+    checkers = [
+        health_check.LocustHealthChecker(f"http://master-{i}:8089", cache_ttl=0, session=session)
+        for i, session in enumerate(sessions)
+    ]
+    emitted = []
+    watcher = health_check.HealthWatcher(checkers, emit=emitted.append)
+
+    events = asyncio.run(watcher.poll())
+    assert events == emitted
+    assert [(event["cluster"], event["event"]) for event in events] == [
+        ("http://master-0:8089", "master_up"),
+        ("http://master-0:8089", "worker_joined"),
+        ("http://master-1:8089", "master_down"),
+    ]
+    assert asyncio.run(watcher.poll()) == []
+    assert len(sessions[0].urls) == 3
+    watcher.close()
+
+
+def test_worker_timing_from_master(health_check):
+    timing = {
+        "workers": [
+            {"id": "w1", "late": False, "stats_age_s": 1.0, "heartbeat_age_s": 0.5, "late_reports": 0},
+            {"id": "w2", "late": True, "stats_age_s": 10.0, "heartbeat_age_s": 0.5, "late_reports": 2},
+        ],
+        "late": ["w2"],
+    }
+    checker = health_check.LocustHealthChecker("http://master:8089", session=FakeSession(timing=timing))
+
+    workers = checker.check_worker_health()
+    assert workers["late"] == ["w2"]
+    assert workers["timing"]["w2"]["stats_age_s"] == 10.0
+    assert workers["timing"]["w2"]["late_reports"] == 2
+
+
+def test_diff_snapshot_reports_late_workers(health_check):
+    cluster = health_check.ClusterState()
+    diff = health_check.diff_snapshot
+
+    def timing(*late):
+        return {"workers": [{"id": w, "late": w in late, "stats_age_s": 9.0, "heartbeat_age_s": 1.0} for w in ("w1", "w2")]}
+
+    diff(cluster, stats(w1="running", w2="running"), 0, timing=timing())
+    assert diff(cluster, stats(w1="running", w2="running"), 1, timing=timing("w2")) == [
+        {"event": "worker_late", "worker": "w2", "stats_age_s": 9.0, "heartbeat_age_s": 1.0}
+    ]
+    assert diff(cluster, stats(w1="running", w2="running"), 2, timing=timing("w2")) == []
+    assert diff(cluster, stats(w1="running", w2="running"), 3, timing=timing()) == [
+        {"event": "worker_on_time", "worker": "w2"}
+    ]
@@ -0,0 +1,157 @@
+"""
+Test suite for histogram.py
+Checks the relative error bound, merging across workers and the compact
+state sent in report_to_master.
+
+Run with: pytest test_histogram.py
+"""
+import importlib
+import math
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+PACKAGE_ROOT = Path(__file__).parent.parent
+
+
+@pytest.fixture
+def histogram(tmp_path, monkeypatch):
+    # The module imports stats_window as app.core.locust_load_test.stats_window, so lay the tree out like the app does
+    (tmp_path / "app" / "core").mkdir(parents=True)
+    (tmp_path / "app" / "__init__.py").touch()
+    (tmp_path / "app" / "core" / "__init__.py").touch()
+    (tmp_path / "app" / "core" / "locust_load_test").symlink_to(PACKAGE_ROOT, target_is_directory=True)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    for name in [name for name in sys.modules if name == "app" or name.startswith("app.")]:
+        monkeypatch.delitem(sys.modules, name)
+    return importlib.import_module("app.core.locust_load_test.histogram")
+
+
+def exact(values, q):
+    values = sorted(values)
+    return values[max(1, math.ceil(q * len(values))) - 1]
+
+
+@pytest.mark.parametrize("digits", [2, 3])
+def test_percentiles_within_relative_error(histogram, digits):
+    rng = random.Random(7)
+    values = [int(rng.lognormvariate(10, 1.5)) for _ in range(50000)]
+    h = histogram.LatencyHistogram(digits)
+    for value in values:
+        h.record(value)
+
+    for q, got in h.percentiles((0.5, 0.99, 0.999, 0.9999)).items():
+        assert got == h.percentile(q)
+        assert abs(got - exact(values, q)) <= exact(values, q) / 10 ** digits
+    assert h.count == len(values)
+    assert h.max == max(values)
+
+
+def test_small_values_are_exact(histogram):
+    h = histogram.LatencyHistogram(3)
+    for value in range(1, 101):
+        h.record(value)
+
+    assert h.percentile(0.5) == 50
+    assert h.percentile(0.99) == 99
+    assert h.min == 1
+
+
+def test_merged_workers_match_single_histogram(histogram):
+    rng = random.Random(11)
+    values = [rng.randrange(1, 10_000_000) for _ in range(30000)]
+    single = histogram.LatencyHistogram()
+    workers = [histogram.LatencyHistogram() for _ in range(3)]
+    for i, value in enumerate(values):
+        single.record(value)
+        workers[i % 3].record(value)
+
+    merged = histogram.LatencyHistogram()
+    for worker in workers:
+        merged.merge(histogram.LatencyHistogram.from_dict(worker.to_dict()))
+
+    assert merged.counts == single.counts
+    assert merged.percentiles() == single.percentiles()
+    assert (merged.min, merged.max, merged.total) == (single.min, single.max, single.total)
+
+
+def test_recorder_ships_deltas_to_master(histogram):
+    worker = histogram.HistogramRecorder()
+    master = histogram.HistogramRecorder()
+    for _ in range(2):
+        for ms in (1.5, 2.5, 100.0):
+            worker.on_request("GET", "/items", ms)
+        worker.on_request("POST", "/login", 30.0)
+        data = {}
+        worker.on_report_to_master("worker-1", data)
+        master.on_worker_report("worker-1", data)
+        assert worker.histograms == {}
+
+    assert master.histograms[("GET", "/items")].count == 6
+    aggregated = master.summary()[-1]
+    assert aggregated["name"] == "Aggregated"
+    assert aggregated["num_requests"] == 8
+    assert aggregated["max_response_time"] == 100.0
+
+
+def test_mismatched_precision_cannot_merge(histogram):
+    with pytest.raises(ValueError):
+        histogram.LatencyHistogram(2).merge(histogram.LatencyHistogram(3))
+
+
+def test_corrected_recording_backfills_stalled_requests(histogram):
+    h = histogram.LatencyHistogram()
+    h.record_corrected_ms(1000.0, 100.0)
+
+    # The stalled request plus the 9 that were due every 100 ms behind it
+    assert h.count == 10
+    assert h.min == 100_000
+    assert h.max == 1_000_000
+
+    fast = histogram.LatencyHistogram()
+    fast.record_corrected_ms(50.0, 100.0)
+    assert fast.count == 1
+
+
+def test_recorder_keeps_raw_and_corrected_side_by_side(histogram):
+    lag = {"ms": 0.0}
+    worker = histogram.HistogramRecorder(expected_interval_ms=0, start_lag=lambda: lag["ms"])
+    master = histogram.HistogramRecorder()
+    worker.on_request("GET", "/items", 10.0)
+    lag["ms"] = 490.0  # the next task started half a second after its arrival
+    worker.on_request("GET", "/items", 10.0)
+
+    data = {}
+    worker.on_report_to_master("worker-1", data)
+    master.on_worker_report("worker-1", data)
+
+    items, aggregated = master.summary()
+    assert items["max_response_time"] == 10.0
+    assert items["corrected"]["max_response_time"] == 500.0
+    assert aggregated["corrected"]["num_requests"] == 2
+    assert worker.corrected == {}
+
+
+def test_missed_arrivals_are_backfilled_into_corrected_only(histogram):
+    missed = [[300.0, 200.0]]
+    recorder = histogram.HistogramRecorder(start_lag=lambda: 100.0, missed_lags=lambda: missed.pop() if missed else [])
+    recorder.on_request("GET", "/items", 10.0)
+    recorder.on_request("GET", "/items", 10.0)
+
+    items, _ = recorder.summary()
+    assert items["num_requests"] == 2
+    assert items["corrected"]["num_requests"] == 4
+    assert items["corrected"]["max_response_time"] == 300.0
+
+
+def test_recorder_without_correction_reports_raw_only(histogram):
+    recorder = histogram.HistogramRecorder(expected_interval_ms=0)
+    recorder.on_request("GET", "/items", 10.0)
+
+    data = {}
+    recorder.on_report_to_master("worker-1", data)
+
+    assert histogram.CORRECTED_REPORT_KEY not in data
+    assert "corrected" not in recorder.summary()[-1]
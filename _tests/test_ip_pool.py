@@ -0,0 +1,80 @@
+"""
+Test suite for custom/ip_pool.py
+Checks address ranges, seeding, and that users get disjoint strides of the
+pool, both with NumPy and with the stdlib array fallback, and that the two
+build the same pool for a seed.
+
+Run with: pytest test_ip_pool.py
+"""
+import importlib.util
+import ipaddress
+from pathlib import Path
+
+import pytest
+
+MODULE_PATH = Path(__file__).parent.parent / "custom" / "ip_pool.py"
+
+
+@pytest.fixture(params=["numpy", "array"])
+def ip_pool(request):
+    spec = importlib.util.spec_from_file_location("ip_pool", MODULE_PATH)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    if request.param == "numpy":
+        if mod.np is None:
+            pytest.skip("numpy not installed")
+    else:
+        mod.np = None
+    return mod
+
+
+def test_addresses_fall_inside_configured_ranges(ip_pool):
+    ranges = ["10.0.0.0/8", "192.168.0.0/16"]
+    pool = ip_pool.IPPool(1000, ranges, seed=1)
+    networks = [ipaddress.IPv4Network(r) for r in ranges]
+
+    for index in range(len(pool)):
+        address = ipaddress.IPv4Address(pool.address(index))
+        assert any(address in net for net in networks)
+    assert pool.nbytes == 4000
+
+
+def test_same_seed_builds_same_pool(ip_pool):
+    first = ip_pool.IPPool(100, seed=42)
+    second = ip_pool.IPPool(100, seed=42)
+
+    assert [first.address(i) for i in range(100)] == [second.address(i) for i in range(100)]
+
+
+def test_slot_slices_are_disjoint(ip_pool):
+    pool = ip_pool.IPPool(20, seed=3)
+    slices = [pool.slice_for(slot, 5) for slot in range(4)]
+
+    positions = [s.start + i for s in slices for i in range(len(s))]
+    assert sorted(positions) == list(range(20))
+
+
+def test_numpy_and_fallback_build_the_same_pool(ip_pool):
+    ranges = ["10.0.0.0/8", "172.16.0.0/12", "192.168.0.0/16"]
+    pool = ip_pool.IPPool(2000, ranges, seed=2**63 + 7)
+    without_numpy = importlib.util.module_from_spec(importlib.util.spec_from_file_location("ip_pool", MODULE_PATH))
+    without_numpy.__spec__.loader.exec_module(without_numpy)
+    without_numpy.np = None
+
+    fallback = without_numpy.IPPool(2000, ranges, seed=2**63 + 7)
+
+    assert [pool.address(i) for i in range(2000)] == [fallback.address(i) for i in range(2000)]
+    assert len({pool.address(i) for i in range(2000)}) > 1900
+
+
+def test_slice_rotation_wraps(ip_pool):
+    pool = ip_pool.IPPool(10, seed=5)
+    user_ips = pool.slice_for(1, 3)
+
+    rotated = [user_ips.next() for _ in range(3)]
+    assert rotated == [pool.address(4), pool.address(5), pool.address(3)]
+
+
+def test_empty_pool_is_rejected(ip_pool):
+    with pytest.raises(ValueError):
+        ip_pool.IPPool(0)
@@ -0,0 +1,134 @@
+"""
+Test suite for launcher.py
+Drives LocalCluster with fake processes: worker environment and commands,
+restarts with backoff, and ordered shutdown with escalation.
+
+This does NOT start real Locust processes.
+
+Run with: pytest test_launcher.py
+"""
+import importlib.util
+import signal
+from pathlib import Path
+
+import pytest
+
+MODULE_PATH = Path(__file__).parent.parent / "launcher.py"
+
+
+@pytest.fixture
+def launcher():
+    spec = importlib.util.spec_from_file_location("launcher", MODULE_PATH)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+class FakeProcess:
+    def __init__(self, pid, command, env):
+        self.pid = pid
+        self.command = command
+        self.env = env
+        self.returncode = None
+        self.signals = []
+
+    def poll(self):
+        return self.returncode
+
+    def send_signal(self, sig):
+        self.signals.append(sig)
+
+    def terminate(self):
+        self.signals.append("terminate")
+
+    def kill(self):
+        self.signals.append("kill")
+
+
+class FakeCluster:
+    def __init__(self, launcher, **kwargs):
+        self.now = 0.0
+        self.spawned = []
+
+        def popen(command, env, start_new_session):
+            process = FakeProcess(len(self.spawned), command, env)
+            self.spawned.append(process)
+            return process
+
+        self.cluster = launcher.LocalCluster(
+            "locustfile.py", env={"PATH": "/bin"}, popen=popen, clock=lambda: self.now, **kwargs
+        )
+
+
+def test_starts_master_and_indexed_workers(launcher):
+    fake = FakeCluster(launcher, processes=3, master_args=["--headless"])
+    fake.cluster.start()
+
+    master, *workers = fake.spawned
+    assert "--master" in master.command and master.command[-1] == "--headless"
+    assert master.command[master.command.index("--expect-workers") + 1] == "3"
+    assert [w.env["LOCUST_WORKER_INDEX"] for w in workers] == ["0", "1", "2"]
+    assert all(w.env["LOCUST_WORKER_COUNT"] == "3" and "--worker" in w.command for w in workers)
+
+
+def test_crashed_worker_restarts_with_backoff(launcher):
+    fake = FakeCluster(launcher, processes=2, max_restarts=1)
+    fake.cluster.start()
+    crashed = fake.spawned[2]
+    crashed.returncode = -9
+
+    assert fake.cluster.supervise()
+    assert len(fake.spawned) == 3
+    fake.now = launcher.RESTART_BACKOFF
+    fake.cluster.supervise()
+    assert len(fake.spawned) == 4
+    assert fake.spawned[3].env["LOCUST_WORKER_INDEX"] == "1"
+
+    # Out of restarts
+    fake.spawned[3].returncode = 1
+    fake.now += 100
+    fake.cluster.supervise()
+    fake.cluster.supervise()
+    assert len(fake.spawned) == 4
+
+
+def test_clean_worker_exit_is_not_restarted(launcher):
+    fake = FakeCluster(launcher, processes=1)
+    fake.cluster.start()
+    fake.spawned[1].returncode = 0
+    fake.now = 100
+
+    fake.cluster.supervise()
+
+    assert len(fake.spawned) == 2
+
+
+def test_stop_signals_master_then_escalates(launcher):
+    fake = FakeCluster(launcher, processes=1, grace=5)
+    fake.cluster.start()
+    master, worker = fake.spawned
+
+    fake.cluster.stop(signal.SIGINT)
+    assert master.signals == [signal.SIGTERM]
+    assert fake.cluster.supervise()
+    assert worker.signals == []
+
+    master.returncode = 0
+    fake.now = 5
+    assert fake.cluster.supervise()
+    assert worker.signals == ["terminate"]
+    fake.now = 10
+    fake.cluster.supervise()
+    assert worker.signals == ["terminate", "kill"]
+
+    worker.returncode = -9
+    assert not fake.cluster.supervise()
+
+
+def test_master_exit_stops_supervision(launcher):
+    fake = FakeCluster(launcher, processes=1)
+    fake.cluster.start()
+    fake.spawned[0].returncode = 0
+    fake.spawned[1].returncode = 0
+
+    assert not fake.cluster.supervise()
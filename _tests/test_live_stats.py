@@ -0,0 +1,135 @@
+"""
+Test suite for custom/live_stats.py
+Checks that report endpoints are fetched concurrently, that retries come
+out of one shared budget, that missing endpoints and unchanged responses
+are not fetched again, and how snapshots map onto history points.
+
+This uses a fake session and does NOT need a running Locust master.
+
+Run with: pytest test_live_stats.py
+"""
+# Patch like locust does before requests/ssl are imported, or later test modules that import locust break
+from gevent import monkey
+
+monkey.patch_all()
+
+import importlib.util
+import time
+from pathlib import Path
+
+import pytest
+import requests
+
+MODULE_PATH = Path(__file__).parent.parent / "custom" / "live_stats.py"
+
+
+@pytest.fixture
+def live_stats():
+    spec = importlib.util.spec_from_file_location("live_stats", MODULE_PATH)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+class FakeResponse:
+    def __init__(self, status_code, data=None, headers=None):
+        self.status_code = status_code
+        self.data = data
+        self.headers = headers or {}
+
+    def json(self):
+        return self.data
+
+
+class FakeSession:
+    """Answers each path from `routes`: a response, an exception, or a list of them in turn."""
+
+    def __init__(self, routes, delay=0.0):
+        self.routes = routes
+        self.delay = delay
+        self.calls = []
+
+    def get(self, url, timeout, headers):
+        path = url.split("8089", 1)[1]
+        self.calls.append((path, dict(headers)))
+        time.sleep(self.delay)
+        answer = self.routes.get(path, FakeResponse(404))
+        if isinstance(answer, list):
+            answer = answer.pop(0) if len(answer) > 1 else answer[0]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    def close(self):
+        pass
+
+
+def fetcher(live_stats, session, **kwargs):
+    return live_stats.StatsFetcher("http://master:8089", session=session, sleep=lambda seconds: None, **kwargs)
+
+
+def test_fetches_all_endpoints_concurrently(live_stats):
+    routes = {path: FakeResponse(200, {"path": path}) for path in live_stats.REPORT_ENDPOINTS.values()}
+    session = FakeSession(routes, delay=0.2)
+
+    started = time.perf_counter()
+    results = fetcher(live_stats, session).fetch()
+    assert time.perf_counter() - started < 0.6
+    assert results == {name: {"path": path} for name, path in live_stats.REPORT_ENDPOINTS.items()}
+
+
+def test_retry_budget_is_shared(live_stats):
+    session = FakeSession({
+        "/stats/requests": [FakeResponse(503), FakeResponse(200, {"state": "running"})],
+        "/stats/hdr": requests.ConnectionError("refused"),
+        "/stats/saturation": FakeResponse(500),
+    })
+
+    results = fetcher(live_stats, session, retries=3).fetch(["stats", "hdr", "saturation"])
+    assert results["stats"] == {"state": "running"}
+    assert "refused" in results["hdr"]["error"]
+    assert results["saturation"] == {"error": "Status code: 500"}
+    # Three first attempts plus exactly three retries between them
+    assert len(session.calls) == 6
+
+
+def test_missing_endpoints_are_not_fetched_again(live_stats):
+    session = FakeSession({"/stats/requests": FakeResponse(200, {})})
+    stats_fetcher = fetcher(live_stats, session)
+
+    assert stats_fetcher.fetch(["hdr"]) == {"hdr": {"error": "Status code: 404"}}
+    assert stats_fetcher.fetch(["hdr"]) == {"hdr": {"error": "Status code: 404"}}
+    assert len(session.calls) == 1
+
+
+def test_conditional_requests_reuse_unchanged_bodies(live_stats):
+    session = FakeSession({
+        "/exceptions": [FakeResponse(200, {"exceptions": [1]}, {"ETag": '"v1"'}), FakeResponse(304)],
+    })
+    stats_fetcher = fetcher(live_stats, session)
+
+    assert stats_fetcher.fetch(["exceptions"]) == {"exceptions": {"exceptions": [1]}}
+    assert stats_fetcher.fetch(["exceptions"]) == {"exceptions": {"exceptions": [1]}}
+    assert "If-None-Match" not in session.calls[0][1]
+    assert session.calls[1][1]["If-None-Match"] == '"v1"'
+
+
+def test_snapshot_point(live_stats):
+    stats = {
+        "state": "running",
+        "user_count": 50,
+        "current_rps": 120.5,
+        "current_fail_per_sec": 1.5,
+        "current_response_time_percentiles": {"response_time_percentile_0.5": 40, "response_time_percentile_0.95": None},
+    }
+
+    assert live_stats.snapshot_point(stats, timestamp=1000.7) == {
+        "timestamp": 1000,
+        "state": "running",
+        "user_count": 50,
+        "rps": 120.5,
+        "fail_per_sec": 1.5,
+        "p50": 40,
+        "p95": 0,
+    }
+    assert live_stats.snapshot_point({"error": "refused"}) is None
@@ -0,0 +1,148 @@
+"""
+Test suite for custom/load_shapes.py
+Checks interpolation, time compression, RPS series and the O(1) step lookup
+behind ReplayShape.tick().
+
+Run with: pytest test_load_shapes.py
+"""
+import importlib
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+PACKAGE_ROOT = Path(__file__).parent.parent
+
+
+@pytest.fixture
+def load_shapes(tmp_path, monkeypatch):
+    # The module imports stats_window as app.core.locust_load_test.stats_window, so lay the tree out like the app does
+    (tmp_path / "app" / "core").mkdir(parents=True)
+    (tmp_path / "app" / "__init__.py").touch()
+    (tmp_path / "app" / "core" / "__init__.py").touch()
+    (tmp_path / "app" / "core" / "locust_load_test").symlink_to(PACKAGE_ROOT, target_is_directory=True)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    for name in [name for name in sys.modules if name == "app" or name.startswith("app.")]:
+        monkeypatch.delitem(sys.modules, name)
+    return importlib.import_module("app.core.locust_load_test.custom.load_shapes")
+
+
+def test_users_are_interpolated_between_points(load_shapes, tmp_path):
+    path = tmp_path / "shape.csv"
+    path.write_text("time,users\n0,0\n10,100\n20,100\n")
+
+    table = load_shapes.ShapeTable(load_shapes.load_points(str(path)))
+
+    assert len(table) == 21
+    assert table.users[5] == 50
+    assert table.users[15] == 100
+    assert table.spawn_rates[0] == 10.0  # default, the ramp is 10 users/s
+    assert table.step(10.7) == 10
+    assert table.step(1e9) == len(table)
+
+
+def test_time_and_load_scale(load_shapes, tmp_path):
+    path = tmp_path / "day.jsonl"
+    day = [{"time": f"2026-10-01T{hour:02d}:00:00Z", "users": 10 * hour} for hour in range(24)]
+    path.write_text("\n".join(json.dumps(point) for point in day))
+
+    # 23 hours of traffic replayed in 23 minutes, at half the load
+    table = load_shapes.ShapeTable(load_shapes.load_points(str(path)), time_scale=60, load_scale=0.5, resolution=60)
+
+    assert len(table) == 24
+    assert list(table.users) == [5 * hour for hour in range(24)]
+
+
+def test_explicit_spawn_rate_is_interpolated(load_shapes):
+    points = [
+        {"time": 0, "users": 10, "spawn_rate": 1, "rps": None},
+        {"time": 4, "users": 10, "spawn_rate": 5, "rps": None},
+    ]
+
+    table = load_shapes.ShapeTable(points)
+
+    assert list(table.spawn_rates) == [1, 2, 3, 4, 5]
+
+
+def test_rps_series_sizes_user_pool(load_shapes):
+    points = [{"time": t, "users": None, "spawn_rate": None, "rps": rps} for t, rps in ((0, 10), (2, 30))]
+
+    table = load_shapes.ShapeTable(points, users_per_rps=1.5)
+
+    assert list(table.rps) == [10, 20, 30]
+    assert list(table.users) == [15, 30, 45]
+
+
+def test_rps_series_needs_the_open_model_when_the_shape_is_created(load_shapes, tmp_path, monkeypatch):
+    path = tmp_path / "rps.csv"
+    path.write_text("time,rps\n0,10\n2,30\n")
+    shape_class = type("Replay", (load_shapes.ReplayShape,), {"path": str(path)})
+
+    monkeypatch.setattr(load_shapes.arrival, "schedule", None)
+    with pytest.raises(ValueError, match="ARRIVAL_RATE"):
+        shape_class()
+
+    monkeypatch.setattr(load_shapes.arrival, "schedule", load_shapes.arrival.ArrivalSchedule(10))
+    assert list(shape_class().table.rps) == [10, 20, 30]
+
+
+def test_points_without_users_or_rps_are_rejected(load_shapes):
+    points = [{"time": 0, "users": 1, "spawn_rate": None, "rps": None}, {"time": 1, "users": None, "spawn_rate": None, "rps": None}]
+
+    with pytest.raises(ValueError):
+        load_shapes.ShapeTable(points)
+
+
+def run_search(search, capacity):
+    while not search.done:
+        search.record(search.level <= capacity)
+    return search
+
+
+@pytest.mark.parametrize("capacity", [1, 7, 64, 137, 999])
+def test_capacity_search_converges_on_users(load_shapes, capacity):
+    search = run_search(load_shapes.CapacitySearch(1, 1000, 1), capacity)
+
+    assert search.passing == capacity
+    assert len(search.probes) <= 2 * 10 + 1
+
+
+def test_capacity_search_reports_bounds(load_shapes):
+    assert run_search(load_shapes.CapacitySearch(5, 100, 1), 1000).passing == 100
+    below_minimum = run_search(load_shapes.CapacitySearch(5, 100, 1), 2)
+    assert below_minimum.passing is None
+    assert below_minimum.failing == 5
+
+
+def test_capacity_search_rps_within_tolerance(load_shapes):
+    search = run_search(load_shapes.CapacitySearch(10, 5000, 2.5, integer=False), 431.7)
+
+    assert search.passing <= 431.7 < search.failing
+    assert search.failing - search.passing <= 2.5
+
+
+def test_capacity_search_needs_a_positive_tolerance(load_shapes):
+    for tolerance in (0, -1):
+        with pytest.raises(ValueError):
+            load_shapes.CapacitySearch(10, 5000, tolerance, integer=False)
+
+
+class FakeEntry:
+    def __init__(self, num_requests, num_failures, response_times):
+        self.num_requests = num_requests
+        self.num_failures = num_failures
+        self.num_none_requests = 0
+        self.total_response_time = sum(time * count for time, count in response_times.items())
+        self.response_times = response_times
+
+
+def test_measurement_only_counts_new_requests(load_shapes):
+    baseline = load_shapes.snapshot([FakeEntry(100, 0, {10: 100})])
+
+    measurement = load_shapes.measure_since(baseline, FakeEntry(200, 5, {10: 110, 500: 90}), seconds=10)
+
+    assert measurement["requests"] == 100
+    assert measurement["failure_rate"] == 0.05
+    assert measurement["p95_ms"] == 500
+    assert measurement["rps"] == 10
@@ -0,0 +1,97 @@
+"""
+Test suite for mcp_server_load_test.py
+Checks check_add_response's verdicts and that MCPAgentUser reports one
+FANOUT event per turn, named after its fan-out level, that fails when any
+of its tool calls failed.
+
+This does NOT start Locust or send requests.
+
+Run with: pytest test_mcp_server_load_test.py
+"""
+# Patch like locust does before requests/ssl are imported, or later test modules that import locust break
+from gevent import monkey
+
+monkey.patch_all()
+
+import importlib
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+PACKAGE_ROOT = Path(__file__).parent.parent
+
+
+@pytest.fixture
+def mcp(tmp_path, monkeypatch):
+    # The module imports its helpers as app.core.locust_load_test.*, so lay the tree out like the app does
+    (tmp_path / "app" / "core").mkdir(parents=True)
+    (tmp_path / "app" / "__init__.py").touch()
+    (tmp_path / "app" / "core" / "__init__.py").touch()
+    (tmp_path / "app" / "core" / "locust_load_test").symlink_to(PACKAGE_ROOT, target_is_directory=True)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    for name in [name for name in sys.modules if name == "app" or name.startswith("app.")]:
+        monkeypatch.delitem(sys.modules, name)
+    return importlib.import_module("app.core.locust_load_test.mcp_server_load_test")
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, body=None):
+        self.status_code = status_code
+        self.body = body
+        self.outcome = None
+
+    def json(self):
+        if self.body is None:
+            raise ValueError("no JSON")
+        return self.body
+
+    def success(self):
+        self.outcome = "success"
+
+    def failure(self, message):
+        self.outcome = message
+
+
+def test_check_add_response_verdicts(mcp):
+    good = FakeResponse(body=[{"info": {"sum": 5}}])
+    wrong = FakeResponse(body=[{"info": {"sum": 6}}])
+    empty = FakeResponse(body=[])
+    error = FakeResponse(status_code=500)
+
+    assert mcp.check_add_response(good, 5) is True and good.outcome == "success"
+    assert mcp.check_add_response(wrong, 5) is False and wrong.outcome == "Incorrect sum: expected 5"
+    assert mcp.check_add_response(empty, 5) is False and empty.outcome == "Invalid tool response format"
+    assert mcp.check_add_response(error, 5) is False and error.outcome == "Add tool failed: 500"
+
+
+def run_turn(mcp, monkeypatch, fanout, results):
+    monkeypatch.setattr(mcp, "MCP_AGENT_FANOUT", [fanout])
+    events = []
+    calls = iter(results)
+    request_event = SimpleNamespace(fire=lambda **kwargs: events.append(kwargs))
+    user = SimpleNamespace(
+        call_add_tool=lambda level: next(calls),
+        environment=SimpleNamespace(events=SimpleNamespace(request=request_event)),
+    )
+    mcp.MCPAgentUser.fan_out_tool_calls(user)
+    return events
+
+
+def test_turn_fires_one_fanout_event(mcp, monkeypatch):
+    events = run_turn(mcp, monkeypatch, 3, [True, True, True])
+
+    assert len(events) == 1
+    assert events[0]["request_type"] == "FANOUT"
+    assert events[0]["name"] == "tools/call x3"
+    assert events[0]["exception"] is None
+    assert events[0]["response_time"] >= 0
+
+
+def test_failed_call_fails_the_turn(mcp, monkeypatch):
+    events = run_turn(mcp, monkeypatch, 4, [True, False, True, False])
+
+    assert len(events) == 1
+    assert isinstance(events[0]["exception"], RuntimeError)
+    assert str(events[0]["exception"]) == "2/4 tool calls failed"
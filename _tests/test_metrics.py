@@ -0,0 +1,89 @@
+"""
+Test suite for metrics.py
+Checks that request stats are folded into running counters and histogram
+buckets, from local requests and from worker report deltas, and how the
+collector exports them.
+
+Run with: pytest test_metrics.py
+"""
+import importlib.util
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+MODULE_PATH = Path(__file__).parent.parent / "metrics.py"
+
+
+@pytest.fixture
+def metrics():
+    spec = importlib.util.spec_from_file_location("metrics", MODULE_PATH)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def test_parse_buckets(metrics):
+    assert metrics.parse_buckets("100, 10,50") == (10.0, 50.0, 100.0)
+    with pytest.raises(ValueError):
+        metrics.parse_buckets("")
+
+
+def test_observe_buckets_by_upper_bound(metrics):
+    state = metrics.MetricsState(buckets=(10, 100))
+    for response_time in (5, 10, 11, 100, 5000):
+        state.observe("GET", "/items", response_time)
+    state.on_request("GET", "/items", 50, exception=RuntimeError("boom"))
+
+    endpoint = state.endpoints[("GET", "/items")]
+    assert endpoint.requests == 6
+    assert endpoint.failures == 1
+    assert endpoint.sum_ms == 5176
+    assert endpoint.buckets == [2, 3, 1]
+
+
+def test_worker_report_deltas_accumulate(metrics):
+    state = metrics.MetricsState(buckets=(10, 100))
+    entry = {
+        "method": "POST",
+        "name": "Login",
+        "num_requests": 3,
+        "num_failures": 1,
+        "total_response_time": 120.0,
+        "response_times": {8: 1, 56: 2},
+    }
+    state.on_worker_report("w1", {"stats": [entry], metrics.REPORT_KEY: {"cpu_percent": 42.0}})
+    state.on_worker_report("w2", {"stats": [entry]})
+
+    endpoint = state.endpoints[("POST", "Login")]
+    assert (endpoint.requests, endpoint.failures, endpoint.sum_ms) == (6, 2, 240.0)
+    assert endpoint.buckets == [2, 4, 0]
+    assert state.workers == {"w1": {"cpu_percent": 42.0}}
+
+
+def test_collector_exports_current_totals(metrics):
+    pytest.importorskip("prometheus_client")
+    pytest.importorskip("locust")
+    from prometheus_client import CollectorRegistry, generate_latest
+
+    runner = SimpleNamespace(
+        user_greenlets=[1, 2],
+        greenlet=[1],
+        user_count=2,
+        stats=SimpleNamespace(total=SimpleNamespace(current_rps=7.0, current_fail_per_sec=0.5)),
+    )
+    state = metrics.MetricsState(buckets=(10, 100))
+    state.observe("GET", "/items", 50)
+    registry = CollectorRegistry()
+    counters = lambda: {"token_pool_size": 4, "login_attempts_total": 9}
+    registry.register(metrics.MetricsCollector(state, SimpleNamespace(runner=runner), counters))
+
+    text = generate_latest(registry).decode()
+
+    assert 'locust_requests_total{method="GET",name="/items"} 1.0' in text
+    assert 'locust_response_time_milliseconds_bucket{le="10",method="GET",name="/items"} 0.0' in text
+    assert 'locust_response_time_milliseconds_bucket{le="+Inf",method="GET",name="/items"} 1.0' in text
+    assert "locust_current_rps 7.0" in text
+    assert 'locust_process_greenlets{worker="local"} 3.0' in text
+    assert 'locust_token_pool_size{worker="local"} 4.0' in text
+    assert 'locust_login_attempts_total{worker="local"} 9.0' in text
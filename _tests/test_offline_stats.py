@@ -0,0 +1,77 @@
+"""
+Test suite for custom/offline_stats.py
+Checks that Locust --csv files map onto the live /stats JSON shape and that
+history downsampling stays within its point budget.
+
+Run with: pytest test_offline_stats.py
+"""
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+MODULE_PATH = Path(__file__).parent.parent / "custom" / "offline_stats.py"
+
+STATS_CSV = """Type,Name,Request Count,Failure Count,Median Response Time,Average Response Time,Min Response Time,Max Response Time,Average Content Size,Requests/s,Failures/s,50%,66%,75%,80%,90%,95%,98%,99%,99.9%,99.99%,100%
+GET,/health,229,3,46,46.5,3.7,68.8,16.0,45.8,0.6,46,46,48,48,51,53,60,64,69,69,69
+,Aggregated,229,3,46,46.5,3.7,68.8,16.0,45.8,0.6,46,46,48,48,51,53,60,64,69,69,69
+"""
+
+FAILURES_CSV = """Method,Name,Error,Occurrences,First Seen,Last Seen
+GET,/health,HTTPError('500 Server Error'),3,1792184286,1792184290
+"""
+
+HISTORY_HEADER = (
+    "Timestamp,User Count,Type,Name,Requests/s,Failures/s,50%,66%,75%,80%,90%,95%,98%,99%,99.9%,99.99%,100%,"
+    "Total Request Count,Total Failure Count,Total Median Response Time,Total Average Response Time,"
+    "Total Min Response Time,Total Max Response Time,Total Average Content Size\n"
+)
+
+
+@pytest.fixture
+def offline_stats():
+    spec = importlib.util.spec_from_file_location("offline_stats", MODULE_PATH)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def test_csv_results_match_live_shape(offline_stats, tmp_path):
+    (tmp_path / "run_stats.csv").write_text(STATS_CSV)
+    (tmp_path / "run_failures.csv").write_text(FAILURES_CSV)
+
+    results = offline_stats.load_csv_results(str(tmp_path / "run"))
+
+    health = results["stats"]["stats"][0]
+    assert health["name"] == "/health"
+    assert health["num_requests"] == 229
+    assert health["num_failures"] == 3
+    assert health["avg_response_time"] == 46.5
+    assert health["response_time_percentile_0.95"] == 53
+    assert results["stats"]["total_rps"] == 45.8
+    assert results["errors"]["failures"][0]["occurrences"] == 3
+    assert results["exceptions"]["exceptions"] == []
+
+
+def test_missing_stats_file_is_an_error(offline_stats, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        offline_stats.load_csv_results(str(tmp_path / "missing"))
+
+
+def test_history_is_downsampled_within_budget(offline_stats, tmp_path):
+    path = tmp_path / "run_stats_history.csv"
+    with open(path, "w") as f:
+        f.write(HISTORY_HEADER)
+        for second in range(1000):
+            f.write(f"{1000 + second},{second},GET,/health,1,0,1,1,1,1,1,1,1,1,1,1,1,0,0,0,0,0,0,0\n")
+            f.write(f"{1000 + second},{second},,Aggregated,10,0,N/A,1,1,1,1,{second},1,1,1,1,1,0,0,0,0,0,0,0\n")
+
+    history = offline_stats.read_history(str(path), max_points=64)
+    points = history.points()
+
+    assert history.rows == 1000
+    assert len(points) <= 64
+    assert points[0]["timestamp"] == 1000
+    assert all(point["rps"] == 10 for point in points)
+    assert points[-1]["p95"] == 999
+    assert points[-1]["user_count"] == 999
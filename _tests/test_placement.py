@@ -0,0 +1,136 @@
+"""
+Test suite for placement.py
+Checks how the master ranks and shards its workers, that placements are
+sent before users start and again when workers join or leave, and how a
+worker takes them.
+
+This uses fake runners and does NOT start real Locust processes.
+
+Run with: pytest test_placement.py
+"""
+import importlib.util
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from locust.event import Events
+from locust.runners import STATE_MISSING, MasterRunner, WorkerRunner
+
+MODULE_PATH = Path(__file__).parent.parent / "placement.py"
+
+
+@pytest.fixture
+def placement():
+    spec = importlib.util.spec_from_file_location("placement", MODULE_PATH)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+class FakeMaster(MasterRunner):
+    greenlet = None
+    state = "running"
+
+    def __init__(self, *client_ids):
+        self.clients = {client_id: SimpleNamespace(id=client_id, state="ready") for client_id in client_ids}
+        self.custom_messages = {}
+        self.sent = []
+
+    def register_message(self, msg_type, listener, concurrent=False):
+        self.custom_messages[msg_type] = listener
+
+    def send_message(self, msg_type, data=None, client_id=None):
+        self.sent.append((client_id, data))
+
+
+class FakeWorker(WorkerRunner):
+    greenlet = None
+
+    def __init__(self):
+        self.custom_messages = {}
+        self.sent = []
+
+    def register_message(self, msg_type, listener, concurrent=False):
+        self.custom_messages[msg_type] = listener
+
+    def send_message(self, msg_type, data=None, client_id=None):
+        self.sent.append(msg_type)
+
+
+def environment(runner, expect_workers=1):
+    return SimpleNamespace(runner=runner, events=Events(), parsed_options=SimpleNamespace(expect_workers=expect_workers))
+
+
+def test_slot_table_ranks_and_keeps_shards(placement):
+    table = placement.SlotTable(reserved=4)
+    table.restart(["c", "a", "b"])
+    assert table.placements()["c"] == {"index": 2, "count": 3, "shard": 2, "shards": 4}
+
+    # "a" leaves and "d" joins: "d" takes the freed shard, the others keep theirs
+    table.update(["b", "c", "d"])
+    assert {client_id: data["shard"] for client_id, data in table.placements().items()} == {"d": 0, "b": 1, "c": 2}
+    assert [table.placements()[client_id]["index"] for client_id in "dbc"] == [0, 1, 2]
+
+
+def test_slot_table_grows_past_reservation(placement, caplog):
+    table = placement.SlotTable()
+    table.update(["a", "b"], running=False)
+    assert not caplog.text
+
+    table.restart(["a"])
+    table.update(["a", "b"])
+
+    assert table.placements()["b"] == {"index": 1, "count": 2, "shard": 1, "shards": 2}
+    assert "may share test data" in caplog.text
+
+
+def test_master_places_workers_before_users_start(placement):
+    runner = FakeMaster("w2", "w1")
+    env = environment(runner, expect_workers=3)
+    placement.install_placement(env)
+
+    env.events.test_start.fire(environment=env)
+    assert sorted(runner.sent, key=lambda sent: sent[0]) == [
+        ("w1", {"index": 0, "count": 2, "shard": 0, "shards": 3}),
+        ("w2", {"index": 1, "count": 2, "shard": 1, "shards": 3}),
+    ]
+
+    # A worker joining mid-run moves the others over as it connects, and gets its own placement once it asks
+    runner.sent.clear()
+    env.events.worker_connect.fire(client_id="w3")
+    assert runner.sent == [("w1", {"index": 0, "count": 3, "shard": 0, "shards": 3}),
+                           ("w2", {"index": 1, "count": 3, "shard": 1, "shards": 3})]
+    runner.sent.clear()
+    runner.custom_messages[placement.PLACEMENT_MESSAGE](environment=env, msg=SimpleNamespace(node_id="w3"))
+    assert runner.sent == [("w3", {"index": 2, "count": 3, "shard": 2, "shards": 3})]
+
+    # On the next heartbeat a missing worker's shard is freed and only changed placements are sent
+    runner.clients["w3"] = SimpleNamespace(id="w3", state="running")
+    runner.clients["w1"].state = STATE_MISSING
+    runner.sent.clear()
+    env.events.heartbeat_sent.fire(client_id="w2", timestamp=0)
+    assert runner.sent == [("w2", {"index": 0, "count": 2, "shard": 1, "shards": 3}),
+                           ("w3", {"index": 1, "count": 2, "shard": 2, "shards": 3})]
+
+
+def test_worker_takes_placement_from_master(placement, monkeypatch):
+    monkeypatch.delenv("LOCUST_WORKER_INDEX", raising=False)
+    runner = FakeWorker()
+    changes = []
+    place = placement.install_placement(environment(runner))
+    place.subscribe(lambda changed: changes.append((changed.index, changed.count)))
+    assert runner.sent == [placement.PLACEMENT_MESSAGE]
+    assert not place.known and not place.wait(timeout=0.01)
+
+    message = SimpleNamespace(data={"index": 1, "count": 3, "shard": 4, "shards": 6})
+    runner.custom_messages[placement.PLACEMENT_MESSAGE](environment=None, msg=message)
+    runner.custom_messages[placement.PLACEMENT_MESSAGE](environment=None, msg=message)
+
+    assert place.wait(timeout=0.01)
+    assert (place.index, place.count, place.shard, place.shards) == (1, 3, 4, 6)
+    assert changes == [(1, 3)]  # Listeners only hear about changes
+
+
+def test_local_runner_is_worker_zero_of_one(placement):
+    place = placement.install_placement(environment(SimpleNamespace()))
+    assert place.known and (place.index, place.count) == (0, 1)
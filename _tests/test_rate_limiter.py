@@ -0,0 +1,68 @@
+"""
+Test suite for custom/rate_limiter.py
+Checks bursts, debt-based waits served in reservation order, the disabled
+limiter, and the wait counters exported for the login throttle.
+
+Run with: pytest test_rate_limiter.py
+"""
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+MODULE_PATH = Path(__file__).parent.parent / "custom" / "rate_limiter.py"
+
+
+@pytest.fixture
+def rate_limiter():
+    spec = importlib.util.spec_from_file_location("rate_limiter", MODULE_PATH)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_burst_then_waits_in_reservation_order(rate_limiter):
+    bucket = rate_limiter.TokenBucket(rate=2, burst=2, clock=FakeClock())
+
+    waits = [bucket.reserve() for _ in range(5)]
+
+    assert waits == pytest.approx([0.0, 0.0, 0.5, 1.0, 1.5])
+
+
+def test_tokens_refill_up_to_burst(rate_limiter):
+    clock = FakeClock()
+    bucket = rate_limiter.TokenBucket(rate=2, burst=2, clock=clock)
+    bucket.reserve()
+    bucket.reserve()
+
+    clock.now = 10.0  # long idle: refills to the burst, not 20 tokens
+    assert [bucket.reserve() for _ in range(3)] == pytest.approx([0.0, 0.0, 0.5])
+
+
+def test_zero_rate_disables_limiting(rate_limiter):
+    bucket = rate_limiter.TokenBucket(rate=0, clock=FakeClock())
+
+    assert [bucket.acquire() for _ in range(100)] == [0.0] * 100
+    assert bucket.waits == 0
+
+
+def test_acquire_sleeps_and_counts_waits(rate_limiter, monkeypatch):
+    slept = []
+    monkeypatch.setattr(rate_limiter.gevent, "sleep", slept.append)
+    bucket = rate_limiter.TokenBucket(rate=4, burst=1, clock=FakeClock())
+
+    assert bucket.acquire() == 0.0
+    assert bucket.acquire() == pytest.approx(0.25)
+    assert bucket.acquire() == pytest.approx(0.5)
+
+    assert slept == pytest.approx([0.25, 0.5])
+    assert bucket.waits == 2
+    assert bucket.wait_seconds == pytest.approx(0.75)
@@ -0,0 +1,105 @@
+"""
+Test suite for request_log.py
+Checks the JSON Lines records, that stopping flushes everything queued,
+backpressure drops, size rotation, and that a restarted test gets a new
+file instead of truncating the previous run's.
+
+Run with: pytest test_request_log.py
+"""
+# Patch like locust does before requests/ssl are imported, or later test modules that import locust break
+from gevent import monkey
+
+monkey.patch_all()
+
+import importlib.util
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from locust.event import Events
+
+MODULE_PATH = Path(__file__).parent.parent / "request_log.py"
+
+
+@pytest.fixture
+def request_log():
+    spec = importlib.util.spec_from_file_location("request_log", MODULE_PATH)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def fire(sink, name="/items", status=200, exception=None):
+    sink.on_request(
+        request_type="GET",
+        name=name,
+        response_time=12.5,
+        response_length=100,
+        response=SimpleNamespace(status_code=status),
+        context={"token_id": "t1", "ip": "10.0.0.1"},
+        exception=exception,
+        start_time=1000.0,
+    )
+
+
+def read_lines(path):
+    return [json.loads(line) for line in Path(path).read_text().splitlines()]
+
+
+def test_records_are_flushed_on_stop(request_log, tmp_path):
+    sink = request_log.RequestLogWriter(tmp_path / "log.jsonl", flush_interval=60)
+    sink.start()
+    for _ in range(2500):  # more than one batch
+        fire(sink)
+    fire(sink, name="/fail", status=500, exception=ValueError("boom"))
+    sink.stop()
+
+    lines = read_lines(tmp_path / "log.jsonl")
+    assert len(lines) == sink.written == 2501
+    assert lines[0] == {
+        "ts": 1000.0, "method": "GET", "name": "/items", "status": 200, "latency_ms": 12.5,
+        "bytes": 100, "token_id": "t1", "ip": "10.0.0.1", "error": None,
+    }
+    assert lines[-1]["error"] == "ValueError('boom')"
+
+
+def test_full_queue_drops_and_counts(request_log, tmp_path):
+    sink = request_log.RequestLogWriter(tmp_path / "log.jsonl", max_queue=3)
+
+    assert [sink.submit(i) for i in range(5)] == [True, True, True, False, False]
+    assert sink.dropped == 2
+
+
+def test_files_rotate_by_size(request_log, tmp_path):
+    sink = request_log.RequestLogWriter(tmp_path / "log.jsonl", batch_size=10, max_bytes=2000, backups=2)
+    sink.start()
+    for _ in range(100):
+        fire(sink)
+    sink.stop()
+
+    files = sorted(path.name for path in tmp_path.iterdir())
+    assert files == ["log.jsonl", "log.jsonl.1", "log.jsonl.2"]
+    assert all(path.stat().st_size <= 2000 for path in tmp_path.iterdir())
+
+
+def test_each_run_gets_its_own_file(request_log, tmp_path):
+    sink = request_log.RequestLogWriter(tmp_path / "log.jsonl")
+    environment = SimpleNamespace(runner=None, events=Events())
+    request_log.attach_sink(environment, sink)
+
+    for run in range(2):
+        environment.events.test_start.fire(environment=environment)
+        environment.events.request.fire(
+            request_type="GET", name=f"/run{run}", response_time=1, response_length=0,
+            exception=None, context={},
+        )
+        environment.events.test_stop.fire(environment=environment)
+
+    assert [line["name"] for line in read_lines(tmp_path / "log.jsonl")] == ["/run0"]
+    assert [line["name"] for line in read_lines(tmp_path / "log.run2.jsonl")] == ["/run1"]
+
+
+def test_sinks_must_implement_encode(request_log, tmp_path):
+    with pytest.raises(TypeError):
+        request_log.BufferedEventSink(tmp_path / "log.bin")
@@ -0,0 +1,139 @@
+"""
+Test suite for request_trace.py
+Checks the fixed-width record format and header, endpoint IDs and the
+overflow bucket, the header rewrite as endpoints show up, and (with NumPy)
+TraceReader and exact_percentiles against a brute-force sort.
+
+This writes real trace files but does NOT start Locust.
+
+Run with: pytest test_request_trace.py
+"""
+# Patch like locust does before requests/ssl are imported, or later test modules that import locust break
+from gevent import monkey
+
+monkey.patch_all()
+
+import importlib
+import math
+import random
+import struct
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+PACKAGE_ROOT = Path(__file__).parent.parent
+
+
+@pytest.fixture
+def request_trace(tmp_path, monkeypatch):
+    # The module imports request_log as app.core.locust_load_test.request_log, so lay the tree out like the app does
+    (tmp_path / "app" / "core").mkdir(parents=True)
+    (tmp_path / "app" / "__init__.py").touch()
+    (tmp_path / "app" / "core" / "__init__.py").touch()
+    (tmp_path / "app" / "core" / "locust_load_test").symlink_to(PACKAGE_ROOT, target_is_directory=True)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    for name in [name for name in sys.modules if name == "app" or name.startswith("app.")]:
+        monkeypatch.delitem(sys.modules, name)
+    return importlib.import_module("app.core.locust_load_test.request_trace")
+
+
+def fire(writer, name, latency_ms, status=200, failed=False, method="GET"):
+    writer.on_request(
+        request_type=method,
+        name=name,
+        response_time=latency_ms,
+        response_length=512,
+        response=SimpleNamespace(status_code=status),
+        exception=RuntimeError("failed") if failed else None,
+        start_time=1000.0,
+    )
+
+
+def write_trace(request_trace, path, requests):
+    writer = request_trace.TraceWriter(path, flush_interval=60)
+    writer.start()
+    for request in requests:
+        fire(writer, *request)
+    writer.stop()
+    return writer
+
+
+def test_records_and_header_layout(request_trace, tmp_path):
+    path = tmp_path / "trace.bin"
+    write_trace(request_trace, path, [("/a", 1.5), ("/b", 2000.0, 500, True), ("/a", 0.25)])
+
+    data = path.read_bytes()
+    assert request_trace.RECORD.size == 20
+    assert request_trace.decode_header(data[:request_trace.HEADER_SIZE]) == ["GET /a", "GET /b"]
+    records = list(request_trace.RECORD.iter_unpack(data[request_trace.HEADER_SIZE:]))
+    assert records == [
+        (1000.0, 0, 200, 1500, 512),
+        (1000.0, 1, 500 | request_trace.FAILURE_FLAG, 2_000_000, 512),
+        (1000.0, 0, 200, 250, 512),
+    ]
+
+
+def test_header_is_rejected_when_not_a_trace(request_trace):
+    with pytest.raises(ValueError):
+        request_trace.decode_header(b"\0" * request_trace.HEADER_SIZE)
+    header = bytearray(request_trace.encode_header(["GET /a"]))
+    struct.pack_into("<H", header, 8, 99)  # version
+    with pytest.raises(ValueError):
+        request_trace.decode_header(bytes(header))
+
+
+def test_header_follows_endpoints_added_between_writes(request_trace, tmp_path):
+    path = tmp_path / "trace.bin"
+    writer = request_trace.TraceWriter(path, flush_interval=60)
+    writer.start()
+    fire(writer, "/a", 1)
+    writer.flush()
+    fire(writer, "/b", 1)  # only known once the second batch is written
+    writer.stop()
+
+    header = path.read_bytes()[:request_trace.HEADER_SIZE]
+    assert request_trace.decode_header(header) == ["GET /a", "GET /b"]
+
+
+def test_endpoint_ids_stop_below_the_overflow_bucket(request_trace, tmp_path):
+    writer = request_trace.TraceWriter(tmp_path / "trace.bin")
+    writer.endpoints = [f"GET /{i}" for i in range(request_trace.MAX_U16 - 1)]
+
+    assert writer.endpoint_id("GET", "/last") == request_trace.MAX_U16 - 1
+    assert writer.endpoint_id("GET", "/overflow") == request_trace.MAX_U16
+    assert writer.endpoint_id("GET", "/more") == request_trace.MAX_U16
+    assert len(writer.endpoints) == request_trace.MAX_U16
+
+
+def nearest_rank(values, q):
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(q * len(ordered))) - 1]
+
+
+def test_reader_and_exact_percentiles_match_a_sort(request_trace, tmp_path):
+    pytest.importorskip("numpy")
+    rng = random.Random(3)
+    # Latencies (µs) spread over several 65 ms coarse buckets, in two files with different endpoint IDs
+    first = [("/a", rng.randint(1, 300_000) / 1000) for _ in range(3000)]
+    second = [("/b", rng.randint(1, 90_000) / 1000) for _ in range(2000)] + [("/a", 5.0, 500, True)]
+    write_trace(request_trace, tmp_path / "w0.bin", first)
+    write_trace(request_trace, tmp_path / "w1.bin", second)
+
+    readers = [request_trace.TraceReader(tmp_path / name) for name in ("w0.bin", "w1.bin")]
+    assert [len(reader) for reader in readers] == [3000, 2001]
+    assert readers[1].endpoints == ["GET /b", "GET /a"]
+
+    summary = request_trace.exact_percentiles(readers, quantiles=(0.5, 0.99), chunk_size=700)
+    latencies = {
+        "GET /a": [int(ms * 1000) for _, ms, *_ in first] + [5000],
+        "GET /b": [int(ms * 1000) for _, ms, *_ in second[:-1]],
+    }
+    latencies["Aggregated"] = latencies["GET /a"] + latencies["GET /b"]
+    for name, values in latencies.items():
+        assert summary[name]["num_requests"] == len(values)
+        for q in (0.5, 0.99):
+            assert summary[name]["percentiles"][q] == nearest_rank(values, q) / 1000
+    assert summary["GET /a"]["num_failures"] == 1
+    assert summary["Aggregated"]["max_response_time"] == max(latencies["Aggregated"]) / 1000
@@ -0,0 +1,118 @@
+"""
+Test suite for saturation.py
+Checks how report intervals are flagged as saturated, how rejected
+intervals are stripped from worker reports, and the master's verdict.
+
+Run with: pytest test_saturation.py
+"""
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+MODULE_PATH = Path(__file__).parent.parent / "saturation.py"
+
+
+@pytest.fixture
+def saturation():
+    spec = importlib.util.spec_from_file_location("saturation", MODULE_PATH)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def monitor_with_cpu(saturation, values, **kwargs):
+    values = iter(values)
+    return saturation.SaturationMonitor(cpu=lambda: next(values), **kwargs)
+
+
+def test_idle_interval_is_not_saturated(saturation):
+    monitor = monitor_with_cpu(saturation, [20.0])
+    monitor.record_loop_lag(3.0)
+
+    sample = monitor.sample()
+
+    assert sample["reasons"] == []
+    assert sample["loop_lag_ms"] == 3.0
+
+
+def test_each_threshold_flags_the_interval(saturation):
+    lag = iter([400.0, 100.0])
+    monitor = monitor_with_cpu(
+        saturation, [95.0, 10.0], cpu_percent=90, loop_lag_ms=100, send_delay_ms=200, start_lag=lambda: next(lag)
+    )
+    monitor.record_loop_lag(150.0)
+    monitor.on_request()
+    monitor.on_request()
+
+    assert monitor.sample()["reasons"] == ["CPU 95%", "event loop lag 150 ms", "send delay 250 ms"]
+    # Everything starts over with the next interval
+    assert monitor.sample()["reasons"] == []
+
+
+def test_first_interval_after_start_is_warmup(saturation, monkeypatch):
+    monkeypatch.setattr(saturation.gevent, "spawn", lambda *args: None)
+    monitor = monitor_with_cpu(saturation, [0.0, 99.0, 99.0])
+    monitor.start()
+    monitor.record_loop_lag(500.0)
+
+    warmup = monitor.sample()
+    assert warmup["reasons"] == [] and warmup["warmup"] is True
+    assert monitor.sample()["reasons"] == ["CPU 99%"]
+
+
+def test_rejected_interval_keeps_counts_and_errors(saturation):
+    monitor = monitor_with_cpu(saturation, [99.0], reject=True)
+    entry = {
+        "name": "/items", "start_time": 1.0, "num_requests": 7, "num_none_requests": 0, "num_failures": 1,
+        "total_response_time": 280, "max_response_time": 40, "min_response_time": 40, "response_times": {40: 7},
+    }
+    data = {
+        "stats": [entry],
+        "stats_total": {**entry, "name": "Aggregated"},
+        "errors": {"key": {"occurrences": 1}},
+        "hdr_histograms": [["GET", "/items", {}]],
+        "user_count": 5,
+    }
+
+    monitor.on_report_to_master("w1", data)
+
+    assert data["errors"] == {"key": {"occurrences": 1}}
+    for stripped in (data["stats"][0], data["stats_total"]):
+        assert (stripped["num_requests"], stripped["num_failures"], stripped["start_time"]) == (7, 1, 1.0)
+        assert stripped["num_none_requests"] == 7
+        assert stripped["response_times"] == {} and stripped["total_response_time"] == 0
+        assert stripped["min_response_time"] is None
+    assert "hdr_histograms" not in data
+    assert data["user_count"] == 5
+    assert data[saturation.REPORT_KEY]["rejected"] is True
+    assert data[saturation.REPORT_KEY]["requests"] == 7
+
+
+def test_flagged_interval_keeps_stats_without_reject(saturation):
+    monitor = monitor_with_cpu(saturation, [99.0])
+    data = {"stats": [{"name": "/items"}], "stats_total": {"num_requests": 3}}
+
+    monitor.on_report_to_master("w1", data)
+
+    assert data["stats"] == [{"name": "/items"}]
+    assert data[saturation.REPORT_KEY]["rejected"] is False
+
+
+def test_verdict_names_saturated_workers(saturation):
+    stats = saturation.SaturationStats()
+    assert "never saturated" not in stats.verdict()
+
+    stats.on_worker_report("w1", {saturation.REPORT_KEY: {"requests": 10, "reasons": [], "cpu_percent": 40.0}})
+    stats.on_worker_report("w2", {saturation.REPORT_KEY: {"requests": 10, "reasons": []}})
+    assert "never saturated" in stats.verdict()
+    assert stats.summary()["saturated"] is False
+
+    stats.on_worker_report("w2", {saturation.REPORT_KEY: {"requests": 30, "reasons": ["CPU 98%"], "cpu_percent": 98.0}})
+    summary = stats.summary()
+
+    assert summary["saturated"] is True
+    assert "1 of 3 report intervals (w2: CPU 98%)" in summary["verdict"]
+    assert "inflated by the load generator" in summary["verdict"]
+    assert summary["workers"]["w2"]["saturated_requests"] == 30
+    assert summary["workers"]["w2"]["peak_cpu_percent"] == 98.0
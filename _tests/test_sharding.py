@@ -0,0 +1,66 @@
+"""
+Test suite for custom/sharding.py
+Checks that user slots are disjoint across workers, that per-user RNGs and
+ID blocks are replayable, and that a plan is only built from a placement
+the master sent.
+
+Run with: pytest test_sharding.py
+"""
+import importlib.util
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+MODULE_PATH = Path(__file__).parent.parent / "custom" / "sharding.py"
+
+
+@pytest.fixture
+def sharding():
+    spec = importlib.util.spec_from_file_location("sharding", MODULE_PATH)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def placed(shard, shards, known=True):
+    return SimpleNamespace(shard=shard, shards=shards, wait=lambda timeout=None: known)
+
+
+def test_slots_are_disjoint_and_dense_across_workers(sharding):
+    plans = [sharding.ShardPlan(seed=7, worker_index=index, worker_count=3) for index in range(3)]
+
+    slots = [plan.next_slot() for plan in plans for _ in range(4)]
+
+    assert sorted(slots) == list(range(12))
+    assert [plans[1].next_slot() for _ in range(2)] == [13, 16]
+
+
+def test_worker_index_outside_count_is_rejected(sharding):
+    with pytest.raises(ValueError):
+        sharding.ShardPlan(seed=7, worker_index=2, worker_count=2)
+    with pytest.raises(ValueError):
+        sharding.ShardPlan(seed=7, worker_count=0)
+
+
+def test_rng_and_id_blocks_replay_per_slot(sharding):
+    first = sharding.ShardPlan(seed=7)
+    again = sharding.ShardPlan(seed=7, worker_index=1, worker_count=2)
+
+    assert [first.rng(5).random() for _ in range(3)] == [again.rng(5).random() for _ in range(3)]
+    assert first.rng(5).random() != first.rng(6).random()
+    assert sharding.ShardPlan.id_range(3, 100) == (300, 400)
+    assert sharding.ShardPlan.pick(4, ["a", "b", "c"]) == "b"
+
+
+def test_plan_uses_the_masters_placement(sharding):
+    plan = sharding.ShardPlan.from_placement(placed(shard=2, shards=4), seed=None)
+
+    assert (plan.worker_index, plan.worker_count) == (2, 4)
+    assert isinstance(plan.seed, int)
+    assert [plan.next_slot() for _ in range(3)] == [2, 6, 10]
+
+
+def test_plan_without_placement_raises(sharding):
+    with pytest.raises(RuntimeError):
+        sharding.ShardPlan.from_placement(placed(0, 1, known=False), seed=7, timeout=0)
@@ -0,0 +1,115 @@
+"""
+Test suite for slo.py
+Checks rule parsing, the sustained-breach detection that stops a run
+early and that lower bounds wait for the ramp-up to leave the window.
+
+Run with: pytest test_slo.py
+"""
+import importlib
+import sys
+from pathlib import Path
+
+import pytest
+
+PACKAGE_ROOT = Path(__file__).parent.parent
+
+
+@pytest.fixture
+def slo(tmp_path, monkeypatch):
+    # The module imports stats_window as app.core.locust_load_test.stats_window, so lay the tree out like the app does
+    (tmp_path / "app" / "core").mkdir(parents=True)
+    (tmp_path / "app" / "__init__.py").touch()
+    (tmp_path / "app" / "core" / "__init__.py").touch()
+    (tmp_path / "app" / "core" / "locust_load_test").symlink_to(PACKAGE_ROOT, target_is_directory=True)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    for name in [name for name in sys.modules if name == "app" or name.startswith("app.")]:
+        monkeypatch.delitem(sys.modules, name)
+    return importlib.import_module("app.core.locust_load_test.slo")
+
+
+class FakeEntry:
+    def __init__(self):
+        self.num_requests = 0
+        self.num_failures = 0
+        self.num_none_requests = 0
+        self.total_response_time = 0.0
+        self.response_times = {}
+
+    def log(self, response_time, count=1, failed=False):
+        self.num_requests += count
+        self.num_failures += count if failed else 0
+        self.total_response_time += response_time * count
+        self.response_times[response_time] = self.response_times.get(response_time, 0) + count
+
+
+class FakeStats:
+    def __init__(self):
+        self.total = FakeEntry()
+        self.entries = {}
+
+    def log(self, name, method, response_time, count=1, failed=False):
+        self.entries.setdefault((name, method), FakeEntry()).log(response_time, count, failed)
+        self.total.log(response_time, count, failed)
+
+
+def test_parse_rules(slo):
+    rules = slo.parse_rules("p99[Read Items] < 300; failure_ratio<0.01\n# comment\nrps >= 50")
+
+    assert [str(rule) for rule in rules] == ["p99[Read Items] < 300", "failure_ratio < 0.01", "rps >= 50"]
+    assert rules[0].name == "Read Items"
+    assert rules[1].name is None
+    with pytest.raises(ValueError):
+        slo.parse_rules("p99 ~ 300")
+
+
+def test_sustained_breach_is_reported(slo):
+    stats = FakeStats()
+    monitor = slo.SLOMonitor(slo.parse_rules("p99[Read Items] < 300"), window=5, breach_duration=3, min_requests=1)
+
+    for _ in range(5):
+        stats.log("Read Items", "GET", 100, count=10)
+        assert monitor.sample(stats) == []
+    breached = []
+    for _ in range(3):
+        stats.log("Read Items", "GET", 900, count=10)
+        stats.log("Health Check", "GET", 5, count=100)
+        breached.append(monitor.sample(stats))
+
+    assert breached[0] == breached[1] == []
+    assert breached[2] == ["p99[Read Items] < 300 (now 900)"]
+
+
+def test_short_breach_resets(slo):
+    stats = FakeStats()
+    monitor = slo.SLOMonitor(slo.parse_rules("failure_ratio < 0.5"), window=1, breach_duration=2, min_requests=1)
+
+    stats.log("Login", "POST", 10, count=10, failed=True)
+    assert monitor.sample(stats) == []
+    stats.log("Login", "POST", 10, count=10)
+    assert monitor.sample(stats) == []
+    assert monitor.breached_for["failure_ratio < 0.5"] == 0
+
+
+def test_lower_bounds_wait_for_the_ramp_up_to_leave_the_window(slo):
+    stats = FakeStats()
+    monitor = slo.SLOMonitor(slo.parse_rules("rps >= 50"), window=2, breach_duration=1, min_requests=1)
+
+    stats.log("Read Items", "GET", 100, count=10)
+    assert monitor.sample(stats, running=False) == []
+    stats.log("Read Items", "GET", 100, count=10)
+    assert monitor.sample(stats) == []  # the spawning second is still in the window
+    stats.log("Read Items", "GET", 100, count=10)
+    assert monitor.sample(stats) == ["rps >= 50 (now 10)"]
+
+
+def test_verdict_covers_whole_run(slo):
+    stats = FakeStats()
+    monitor = slo.SLOMonitor(slo.parse_rules("p50 < 200; rps >= 5"), window=1, min_requests=1)
+    for response_time in (100, 100, 500):
+        stats.log("Read Items", "GET", response_time, count=10)
+        monitor.sample(stats)
+
+    verdict = {str(rule): (value, passed) for rule, value, passed in monitor.verdict(stats)}
+
+    assert verdict["p50 < 200"] == (100.0, True)
+    assert verdict["rps >= 5"] == (10.0, True)
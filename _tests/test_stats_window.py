@@ -0,0 +1,85 @@
+"""
+Test suite for stats_window.py
+Checks the nearest-rank percentile, differences between cumulative
+snapshots, the incrementally maintained sliding window and that intervals
+rejected by saturation.py leave the average alone.
+
+Run with: pytest test_stats_window.py
+"""
+import importlib.util
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+PACKAGE_ROOT = Path(__file__).parent.parent
+
+
+def load(name):
+    spec = importlib.util.spec_from_file_location(name, PACKAGE_ROOT / f"{name}.py")
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+@pytest.fixture
+def stats_window():
+    return load("stats_window")
+
+
+def entry(requests, failures, response_times):
+    total_time = sum(response_time * count for response_time, count in response_times.items())
+    return SimpleNamespace(
+        num_requests=requests,
+        num_failures=failures,
+        num_none_requests=0,
+        total_response_time=total_time,
+        response_times=response_times,
+    )
+
+
+def test_nearest_rank_percentile(stats_window):
+    counts = [(30, 1), (10, 2), (20, 1)]
+
+    assert stats_window.percentile_from_counts(counts, 4, 0.5) == 10
+    assert stats_window.percentile_from_counts(counts, 4, 0.75) == 20
+    assert stats_window.percentile_from_counts(counts, 4, 1.0) == 30
+    assert stats_window.percentile_from_counts(counts, 4, 0.0, value_of=lambda index: index * 2) == 20
+    with pytest.raises(ValueError):
+        stats_window.percentile_from_counts(counts, 5, 1.0)
+
+
+def test_difference_only_counts_new_requests(stats_window):
+    before = stats_window.snapshot([entry(100, 0, {10: 100})])
+    after = stats_window.snapshot([entry(150, 5, {10: 110}), entry(50, 0, {500: 50})])
+
+    assert stats_window.difference(after, before) == (100, 5, 0, 100 + 25000, {10: 10, 500: 50})
+
+
+def test_window_drops_old_seconds(stats_window):
+    window = stats_window.StatsWindow(2)
+    window.push((10, 0, 0, 1000.0, {100: 10}))
+    window.push((10, 5, 0, 500.0, {50: 10}))
+    window.push((10, 0, 0, 100.0, {10: 10}))
+
+    assert window.requests == 20
+    assert window.failure_ratio == 0.25
+    assert window.counts == {50: 10, 10: 10}
+    assert window.percentile(0.99) == 50
+    assert window.avg == 30
+    assert window.rps == 10
+
+
+def test_rejected_interval_does_not_pull_the_average_down(stats_window):
+    saturation = load("saturation")
+    healthy = vars(entry(10, 0, {100: 10}))
+    report = {"stats": [], "stats_total": vars(entry(30, 1, {900: 30}))}
+    saturation.reject_stats(report)
+    window = stats_window.StatsWindow(2)
+
+    window.push(stats_window.snapshot([SimpleNamespace(**healthy)]))
+    window.push(stats_window.snapshot([SimpleNamespace(**report["stats_total"])]))
+
+    assert window.requests == 40 and window.failures == 1
+    assert window.avg == 100
+    assert window.percentile(0.99) == 100
@@ -0,0 +1,134 @@
+"""
+Test suite for custom/token_manager.py
+Checks the JWT expiry decoding, that the refresher renews tokens in expiry
+order with the credentials each was issued for, and that invalidated
+(rejected) tokens leave the pool and are not refreshed.
+
+Run with: pytest test_token_manager.py
+"""
+import base64
+import importlib
+import json
+import sys
+from pathlib import Path
+
+import gevent
+import pytest
+
+PACKAGE_ROOT = Path(__file__).parent.parent
+
+
+@pytest.fixture
+def token_manager(tmp_path, monkeypatch):
+    # The module imports its neighbours as app.core.locust_load_test.custom.*, so lay the tree out like the app does
+    (tmp_path / "app" / "core").mkdir(parents=True)
+    (tmp_path / "app" / "__init__.py").touch()
+    (tmp_path / "app" / "core" / "__init__.py").touch()
+    (tmp_path / "app" / "core" / "locust_load_test").symlink_to(PACKAGE_ROOT, target_is_directory=True)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    for name in [name for name in sys.modules if name == "app" or name.startswith("app.")]:
+        monkeypatch.delitem(sys.modules, name)
+    return importlib.import_module("app.core.locust_load_test.custom.token_manager")
+
+
+def jwt(claims):
+    def encode(part):
+        return base64.urlsafe_b64encode(json.dumps(part).encode()).rstrip(b"=").decode()
+
+    return f"{encode({'alg': 'HS256'})}.{encode(claims)}.signature"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def manager_with(token_manager, clock, **kwargs):
+    from app.core.locust_load_test.custom.token_pool import TokenPool
+
+    return token_manager.TokenManager(TokenPool(max_size=8), clock=clock, **kwargs)
+
+
+def run_refresher(manager, login):
+    manager.start(login)
+    gevent.sleep(0.01)
+    manager.stop()
+
+
+def test_decode_jwt_exp(token_manager):
+    assert token_manager.decode_jwt_exp(jwt({"sub": "a", "exp": 1700000000})) == 1700000000.0
+    assert token_manager.decode_jwt_exp(jwt({"sub": "a"})) is None
+    assert token_manager.decode_jwt_exp("opaque-token") is None
+    assert token_manager.decode_jwt_exp("a.!!!.c") is None
+
+
+def test_tokens_are_refreshed_in_expiry_order_with_their_credentials(token_manager):
+    clock = FakeClock()
+    manager = manager_with(token_manager, clock, refresh_margin=60)
+    late = jwt({"sub": "late", "exp": 1100})
+    early = jwt({"sub": "early", "exp": 1050})
+    never = jwt({"sub": "never"})
+    manager.add(late, ("late@example.com", "pw2"))
+    manager.add(early, ("early@example.com", "pw1"))
+    manager.add(never, ("never@example.com", "pw3"))
+    logins = []
+
+    def login(credentials):
+        logins.append(credentials)
+        return jwt({"sub": credentials[0], "exp": 5000 + len(logins)})
+
+    clock.now = 1045  # both are within the refresh margin, the earlier expiry goes first
+    run_refresher(manager, login)
+
+    assert logins == [("early@example.com", "pw1"), ("late@example.com", "pw2")]
+    assert manager.refresh_count == 2
+    assert early not in manager and late not in manager and never in manager
+    renewed = jwt({"sub": "early@example.com", "exp": 5001})
+    assert renewed in manager
+    assert manager._credentials[renewed] == ("early@example.com", "pw1")
+
+
+def test_failed_refresh_retries_then_drops_expired_token(token_manager):
+    clock = FakeClock()
+    manager = manager_with(token_manager, clock, refresh_margin=60)
+    token = jwt({"exp": 1030})
+    manager.add(token)
+
+    run_refresher(manager, lambda credentials: None)
+    assert token in manager and manager.refresh_failures == 1
+
+    clock.now = 1040  # past the retry delay and the expiry
+    run_refresher(manager, lambda credentials: None)
+    assert token not in manager and manager.refresh_failures == 2
+
+
+def test_invalidated_token_leaves_the_pool_and_is_not_refreshed(token_manager):
+    clock = FakeClock()
+    manager = manager_with(token_manager, clock)
+    token = jwt({"exp": 1030})
+    manager.add(token, ("user@example.com", "pw"))
+    assert manager.headers(token) is not None
+
+    manager.invalidate(token)  # what a 401 does
+
+    assert token not in manager and len(manager) == 0
+    assert manager.headers(token) is None
+    assert manager.acquire() is None
+    logins = []
+    run_refresher(manager, logins.append)
+    assert logins == []
+
+
+def test_expired_tokens_are_not_handed_out(token_manager):
+    clock = FakeClock()
+    manager = manager_with(token_manager, clock)
+    expired = jwt({"exp": 999})
+    fresh = jwt({"exp": 2000})
+    manager.add(expired)
+    manager.add(fresh)
+
+    assert [manager.acquire() for _ in range(2)] == [fresh, fresh]
+    assert expired not in manager
@@ -0,0 +1,76 @@
+"""
+Test suite for custom/token_pool.py
+Checks least-used hand-out order, eviction and removal bookkeeping.
+
+Run with: pytest test_token_pool.py
+"""
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+MODULE_PATH = Path(__file__).parent.parent / "custom" / "token_pool.py"
+
+
+@pytest.fixture
+def TokenPool():
+    spec = importlib.util.spec_from_file_location("token_pool", MODULE_PATH)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod.TokenPool
+
+
+def test_acquire_hands_out_least_used_first(TokenPool):
+    pool = TokenPool(max_size=3)
+    for token in ("a", "b", "c"):
+        pool.add(token)
+
+    handed_out = [pool.acquire() for _ in range(6)]
+
+    assert handed_out == ["a", "b", "c", "a", "b", "c"]
+    assert pool.usage() == {"a": 2, "b": 2, "c": 2}
+
+
+def test_acquire_on_empty_pool_returns_none(TokenPool):
+    assert TokenPool().acquire() is None
+
+
+def test_add_evicts_most_used_when_full(TokenPool):
+    pool = TokenPool(max_size=2)
+    pool.add("a")
+    pool.add("b")
+    pool.acquire()  # a -> 1
+
+    evicted = pool.add("c")
+
+    assert evicted == "a"
+    assert "a" not in pool
+    assert len(pool) == 2
+
+
+def test_new_token_joins_at_lowest_level(TokenPool):
+    pool = TokenPool(max_size=3)
+    pool.add("a")
+    for _ in range(5):
+        pool.acquire()
+    pool.add("b")
+
+    # "b" must not be handed out five times in a row while "a" catches up
+    assert [pool.acquire() for _ in range(4)] == ["a", "b", "a", "b"]
+
+
+def test_remove_keeps_pool_consistent(TokenPool):
+    pool = TokenPool(max_size=4)
+    for token in ("a", "b", "c"):
+        pool.add(token)
+    pool.acquire()  # a -> 1
+    pool.acquire()  # b -> 1
+
+    assert pool.remove("c") is True
+    assert pool.remove("missing") is False
+    assert pool.acquire() == "a"
+    assert pool.evict() == "a"
+    assert pool.usage_stats() == (1, 1, 1.0)
+    assert pool.remove("b") is True
+    assert pool.usage_stats() is None
+    assert pool.acquire() is None
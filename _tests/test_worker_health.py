@@ -0,0 +1,105 @@
+"""
+Test suite for worker_health.py
+Checks the heartbeat and report timing the master keeps per worker and
+how late workers show up at /workers.
+
+This does NOT start real Locust processes.
+
+Run with: pytest test_worker_health.py
+"""
+import importlib.util
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+MODULE_PATH = Path(__file__).parent.parent / "worker_health.py"
+
+
+@pytest.fixture
+def worker_health():
+    spec = importlib.util.spec_from_file_location("worker_health", MODULE_PATH)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def client(state="running"):
+    return SimpleNamespace(state=state, user_count=10, cpu_usage=40.0, memory_usage=1000)
+
+
+def report(sent_at, entries=2):
+    return {
+        "stats": [{"name": f"/e{i}"} for i in range(entries)],
+        "errors": {},
+        "report_timing": {"sent_at": sent_at},
+    }
+
+
+def test_report_intervals_lag_and_queue(worker_health):
+    now = [100.0]
+    stats = worker_health.WorkerTimingStats(heartbeat_interval=1, report_interval=3, clock=lambda: now[0])
+
+    stats.on_worker_report("w1", report(sent_at=99.9))
+    now[0] = 103.0
+    stats.on_worker_report("w1", report(sent_at=102.95, entries=5))
+    now[0] = 113.0
+    stats.on_worker_report("w1", report(sent_at=112.0, entries=40))
+
+    timing = stats.workers["w1"]
+    assert timing.reports == 3
+    assert timing.report_interval_s == 10.0
+    assert timing.max_report_interval_s == 10.0
+    assert timing.late_reports == 1  # Only the 10 s gap is over 2 x 3 s
+    assert timing.report_lag_ms == pytest.approx(1000)
+    assert timing.queued_entries == 40
+    assert timing.max_queued_entries == 40
+
+
+def test_heartbeat_intervals(worker_health):
+    now = [0.0]
+    stats = worker_health.WorkerTimingStats(heartbeat_interval=1, report_interval=3, clock=lambda: now[0])
+
+    for now[0] in (0.0, 1.0, 2.0, 5.5):
+        stats.on_heartbeat(client_id="w1", timestamp=now[0])
+
+    timing = stats.workers["w1"]
+    assert timing.heartbeats == 4
+    assert timing.heartbeat_interval_s == 3.5
+    assert timing.max_heartbeat_interval_s == 3.5
+
+
+def test_summary_marks_stale_workers_late(worker_health):
+    now = [0.0]
+    stats = worker_health.WorkerTimingStats(heartbeat_interval=1, report_interval=3, clock=lambda: now[0])
+    for worker in ("w1", "w2"):
+        stats.on_heartbeat(client_id=worker)
+        stats.on_worker_report(worker, report(sent_at=0.0))
+    now[0] = 7.0
+    stats.on_heartbeat(client_id="w1")
+    stats.on_heartbeat(client_id="w2")
+    stats.on_worker_report("w1", report(sent_at=7.0))
+
+    summary = stats.summary({"w1": client(), "w2": client(), "w3": client("ready")})
+    assert summary["late"] == ["w2"]
+    workers = {worker["id"]: worker for worker in summary["workers"]}
+    assert workers["w2"]["stats_age_s"] == 7.0
+    assert workers["w2"]["heartbeat_age_s"] == 0.0
+    assert workers["w1"]["user_count"] == 10
+    # No timing yet for a worker that just connected
+    assert workers["w3"] == {"id": "w3", "state": "ready", "user_count": 10, "cpu_usage": 40.0, "memory_usage": 1000}
+
+
+def test_reset_keeps_timestamps(worker_health):
+    now = [0.0]
+    stats = worker_health.WorkerTimingStats(heartbeat_interval=1, report_interval=3, clock=lambda: now[0])
+    stats.on_worker_report("w1", report(sent_at=0.0))
+    now[0] = 10.0
+    stats.on_worker_report("w1", report(sent_at=10.0))
+
+    stats.reset()
+    timing = stats.workers["w1"]
+    assert timing.late_reports == 0 and timing.max_report_interval_s == 0.0
+    now[0] = 13.0
+    stats.on_worker_report("w1", report(sent_at=13.0))
+    assert timing.report_interval_s == 3.0 and timing.late_reports == 0
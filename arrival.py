@@ -0,0 +1,302 @@
+"""
+Open-model (arrival-rate) pacing for Locust users.
+
+With `between(...)` wait times each user only starts its next task after the
+previous one finished, so a slow target quietly lowers the offered load.
+ArrivalSchedule instead lays task starts out on one timeline per worker,
+at a constant rate or as a Poisson process, independent of response times.
+Users act as a pool of executors: a free user claims the next arrival and
+sleeps until it is due. Arrivals that no user picked up within
+ARRIVAL_MAX_LAG seconds are dropped and counted as missed, which means the
+worker needs more users (or more workers) to sustain the rate.
+
+ARRIVAL_RATE is the cluster-wide rate. Each worker runs rate / worker_count,
+with constant-rate timelines phase-shifted by worker index so arrivals
+interleave across workers. Index and count are the placement the master
+hands out (placement.py) and follow workers joining or leaving; users on a
+worker the master hasn't placed hold off instead of running the whole
+cluster's rate. A load shape can change the rate mid-test with
+set_arrival_rate(), which the master forwards to its workers. Missed
+arrival counts are sent to the master with the regular stats report and
+logged when the master exits.
+
+How late each task started relative to its arrival is kept per greenlet;
+task_start_lag_ms() feeds it to the coordinated-omission corrected
+histograms in histogram.py. Greenlets a task spawns for concurrent
+requests take the lag along with carry_task_lag(). Dropped arrivals never
+send a request, so the user that claimed past them also keeps how late
+each one was when it was dropped; take_missed_lags_ms() hands those to the
+corrected histograms, which record them with the user's next request.
+"""
+
+import logging
+import os
+import random
+import time
+from typing import Any, Callable, List, Optional
+
+from gevent.local import local
+
+logger = logging.getLogger(__name__)
+
+ARRIVAL_RATE = float(os.getenv("ARRIVAL_RATE", "0"))  # Cluster-wide task starts per second; 0 keeps closed-loop wait times
+ARRIVAL_MODE = os.getenv("ARRIVAL_MODE", "constant").lower()  # "constant" or "poisson"
+ARRIVAL_MAX_LAG = float(os.getenv("ARRIVAL_MAX_LAG", "1.0"))  # Seconds an arrival may wait for a free user before it counts as missed
+UNPLACED_WAIT = 1.0  # Seconds a user waits before asking again while its worker has no placement
+REPORT_KEY = "arrivals"
+RATE_MESSAGE = "arrival_rate"
+MODES = ("constant", "poisson")
+
+
+class ArrivalSchedule:
+    """
+    Per-worker timeline of task start times.
+
+    claim() never yields to the gevent hub, so concurrent users can share
+    one schedule without a lock.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        mode: str = "constant",
+        max_lag: float = 1.0,
+        worker_index: int = 0,
+        worker_count: int = 1,
+        seed: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {', '.join(MODES)}")
+        self.rate = rate
+        self.mode = mode
+        self.max_lag = max_lag
+        self.clock = clock
+        self.seed = seed
+        self.reset()
+        self.place(worker_index, worker_count)
+
+    def place(self, worker_index: int, worker_count: int) -> None:
+        """Take this worker's share of the cluster-wide rate and restart the timeline; counts are kept."""
+        self.worker_index = worker_index
+        self.worker_count = max(worker_count, 1)
+        self.worker_rate = self.rate / self.worker_count
+        self._rng = random.Random(f"{self.seed}:{worker_index}" if self.seed is not None else None)
+        self._next = None
+        self.placed = True
+
+    def set_rate(self, rate: float) -> None:
+        """Change the cluster-wide rate; arrivals already claimed keep their times."""
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.worker_rate = rate / self.worker_count
+
+    def reset(self) -> None:
+        """Forget the timeline and the counts; the timeline restarts at the next claim."""
+        self._next: Optional[float] = None
+        self.started = 0
+        self.missed = 0
+        # Seconds late each arrival dropped by the last claim() was
+        self.dropped_lags: List[float] = []
+
+    def _interval(self) -> float:
+        if self.mode == "poisson":
+            return self._rng.expovariate(self.worker_rate)
+        return 1.0 / self.worker_rate
+
+    def claim(self) -> float:
+        """Reserve the next arrival that is still on time and return its (monotonic) start time."""
+        now = self.clock()
+        if self._next is None:
+            # Constant-rate workers start one cluster interval apart; Poisson streams merge on their own
+            offset = self.worker_index / self.rate if self.mode == "constant" else self._interval()
+            self._next = now + offset
+        self.dropped_lags = []
+        while self._next < now - self.max_lag:
+            self.missed += 1
+            self.dropped_lags.append(now - self._next)
+            self._next += self._interval()
+        due = self._next
+        self._next += self._interval()
+        self.started += 1
+        return due
+
+    def wait_time(self, user: Any = None) -> float:
+        """Seconds until the claimed arrival; usable directly as a User's `wait_time`."""
+        return max(0.0, self.claim() - self.clock())
+
+    def take_counts(self) -> dict:
+        """Counts since the last call, for report_to_master."""
+        counts = {"started": self.started, "missed": self.missed}
+        self.started = 0
+        self.missed = 0
+        return counts
+
+
+class ArrivalStats:
+    """Scheduled and missed arrival totals, summed across workers on the master."""
+
+    def __init__(self):
+        self.started = 0
+        self.missed = 0
+
+    def add(self, counts: dict) -> None:
+        self.started += counts.get("started", 0)
+        self.missed += counts.get("missed", 0)
+
+    def reset(self, **kwargs: Any) -> None:
+        self.started = 0
+        self.missed = 0
+
+    def log_summary(self) -> None:
+        total = self.started + self.missed
+        if not total:
+            return
+        message = f"Arrivals: {self.started} started, {self.missed} missed ({self.missed / total:.2%})"
+        if self.missed:
+            logger.warning(f"{message}; add users or workers to sustain ARRIVAL_RATE")
+        else:
+            logger.info(message)
+
+
+# One timeline per worker process, shared by every user class that opts in
+schedule = ArrivalSchedule(ARRIVAL_RATE, ARRIVAL_MODE, ARRIVAL_MAX_LAG) if ARRIVAL_RATE > 0 else None
+
+# Lateness of the task each user greenlet is currently running
+_current_task = local()
+
+
+def task_start_lag_ms() -> float:
+    """Milliseconds between the calling user's scheduled arrival and the start of its current task."""
+    return getattr(_current_task, "lag_ms", 0.0)
+
+
+def take_missed_lags_ms() -> List[float]:
+    """Milliseconds late the arrivals the calling user skipped were when dropped; cleared by the call."""
+    missed = getattr(_current_task, "missed_lags_ms", [])
+    _current_task.missed_lags_ms = []
+    return missed
+
+
+def carry_task_lag(function: Callable) -> Callable:
+    """Wrap `function` to run in a spawned greenlet with the calling user's task lag."""
+    lag_ms = task_start_lag_ms()
+
+    def with_task_lag(*args: Any, **kwargs: Any) -> Any:
+        _current_task.lag_ms = lag_ms
+        return function(*args, **kwargs)
+
+    return with_task_lag
+
+
+def start_lag_source() -> Optional[Callable[[], float]]:
+    """`start_lag` for install_histograms: task_start_lag_ms in the open model, otherwise None."""
+    return task_start_lag_ms if schedule is not None else None
+
+
+def missed_lags_source() -> Optional[Callable[[], List[float]]]:
+    """`missed_lags` for install_histograms: take_missed_lags_ms in the open model, otherwise None."""
+    return take_missed_lags_ms if schedule is not None else None
+
+
+def open_model_wait_time(closed_wait_time: Callable) -> Callable:
+    """
+    `wait_time` for a User class: pace by the shared arrival schedule when
+    ARRIVAL_RATE is set, otherwise keep `closed_wait_time`.
+    """
+    if schedule is None:
+        return closed_wait_time
+
+    def wait_time(user: Any) -> float:
+        if not schedule.placed:
+            return UNPLACED_WAIT
+        due = schedule.claim()
+        now = schedule.clock()
+        _current_task.lag_ms = max(0.0, now - due) * 1000
+        if schedule.dropped_lags:
+            _current_task.missed_lags_ms = getattr(_current_task, "missed_lags_ms", []) + [
+                lag * 1000 for lag in schedule.dropped_lags
+            ]
+        return max(0.0, due - now)
+
+    return wait_time
+
+
+def set_arrival_rate(environment: Any, rate: float) -> None:
+    """
+    Change the cluster-wide arrival rate mid-test, e.g. from a LoadTestShape.
+    On the master this is sent to every connected worker.
+    """
+    if schedule is None:
+        raise RuntimeError("Set ARRIVAL_RATE to enable the open model before changing the arrival rate")
+    environment.runner.send_message(RATE_MESSAGE, rate)
+
+
+def install_arrivals(environment: Any) -> Optional[ArrivalStats]:
+    """Place the schedule for this worker and collect missed arrivals. Call from an `init` listener."""
+    if schedule is None:
+        return None
+    from locust.runners import STATE_RUNNING, STATE_SPAWNING, MasterRunner, WorkerRunner
+
+    from app.core.locust_load_test.placement import placement
+
+    stats = ArrivalStats()
+    runner = environment.runner
+    events = environment.events
+
+    def log_share() -> None:
+        logger.info(
+            f"Open model: {schedule.mode} arrivals at {schedule.worker_rate:.2f}/s on worker "
+            f"{schedule.worker_index} of {schedule.worker_count} ({schedule.rate:.2f}/s cluster-wide)"
+        )
+
+    def on_test_start(**kwargs: Any) -> None:
+        seed = os.getenv("LOAD_TEST_SEED")
+        schedule.seed = int(seed) if seed else None
+        schedule.reset()
+        if isinstance(runner, WorkerRunner) and not placement.known:
+            # Running the full cluster-wide rate on every worker would multiply the load
+            schedule.placed = False
+            logger.error("Open model: no worker placement from the master yet; users wait for it (install_placement)")
+            return
+        schedule.place(placement.index, placement.count)
+        log_share()
+
+    def on_placement(changed: Any) -> None:
+        schedule.place(changed.index, changed.count)
+        if runner.state in (STATE_RUNNING, STATE_SPAWNING):
+            # Workers joined or left mid-run
+            log_share()
+
+    def on_rate(msg: Any, **kwargs: Any) -> None:
+        schedule.set_rate(msg.data)
+
+    def on_report_to_master(client_id: str, data: dict) -> None:
+        data[REPORT_KEY] = schedule.take_counts()
+
+    def on_worker_report(client_id: str, data: dict) -> None:
+        stats.add(data.get(REPORT_KEY, {}))
+
+    def on_test_stop(**kwargs: Any) -> None:
+        stats.add(schedule.take_counts())
+        stats.log_summary()
+
+    events.test_start.add_listener(stats.reset)
+    if isinstance(runner, MasterRunner):
+        # Workers only send their last report when told to quit, so summarize after that
+        events.worker_report.add_listener(on_worker_report)
+        events.quit.add_listener(lambda **kwargs: stats.log_summary())
+        return stats
+    events.test_start.add_listener(on_test_start)
+    placement.subscribe(on_placement)
+    if isinstance(runner, WorkerRunner) and not placement.known:
+        schedule.placed = False
+    runner.register_message(RATE_MESSAGE, on_rate)
+    if isinstance(runner, WorkerRunner):
+        events.report_to_master.add_listener(on_report_to_master)
+    else:
+        events.test_stop.add_listener(on_test_stop)
+    return stats
@@ -0,0 +1,78 @@
+"""
+Prebuilt, shared request headers for the FastAPI load test users.
+
+Building a fresh dict (and f-string) for every request adds up at high RPS.
+HeaderCache builds the headers for each token / spoofed IP combination once
+and hands out the same read-only mapping to every task that needs it.
+Entries for a token are dropped when the token rotates out of the pool.
+"""
+
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
+
+# Headers used by common proxies/load balancers to carry the client IP
+IP_SPOOFING_HEADERS = (
+    "X-Forwarded-For",
+    "X-Real-IP",
+    "X-Client-IP",
+    "X-Originating-IP",
+    "CF-Connecting-IP",  # Cloudflare
+)
+
+
+class HeaderCache:
+    """
+    Cache of immutable header mappings keyed by (token, ip).
+
+    The mappings are MappingProxyType views, so a task cannot accidentally
+    mutate headers that other users share. Both requests and geventhttpclient
+    copy the headers they are given, so they accept these views as-is.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries: Dict[Tuple[str, Optional[str]], Mapping[str, str]] = {}
+        self._keys_by_token: Dict[str, List[Tuple[str, Optional[str]]]] = {}
+        self._ip_headers: Dict[str, Mapping[str, str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def ip_headers(self, ip: str) -> Mapping[str, str]:
+        """Spoofing headers for a single IP."""
+        headers = self._ip_headers.get(ip)
+        if headers is None:
+            headers = MappingProxyType(dict.fromkeys(IP_SPOOFING_HEADERS, ip))
+            self._ip_headers[ip] = headers
+        return headers
+
+    def get(self, token: str, ip: Optional[str] = None) -> Mapping[str, str]:
+        """Auth headers for `token`, plus spoofing headers when `ip` is given."""
+        key = (token, ip)
+        headers = self._entries.get(key)
+        if headers is not None:
+            return headers
+
+        if len(self._entries) >= self.max_entries:
+            self.clear()
+
+        built = {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json",
+        }
+        if ip is not None:
+            built.update(self.ip_headers(ip))
+        headers = MappingProxyType(built)
+        self._entries[key] = headers
+        self._keys_by_token.setdefault(token, []).append(key)
+        return headers
+
+    def invalidate_token(self, token: str) -> None:
+        """Drop every cached mapping built for `token`."""
+        for key in self._keys_by_token.pop(token, ()):
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._keys_by_token.clear()
+        self._ip_headers.clear()
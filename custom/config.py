@@ -2,8 +2,9 @@
 Configuration settings for custom FastAPI Locust load tests.
 Uses environment variables or default values.
 """
+import csv
 import os
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
 
 # Base URL for the FastAPI application
 BASE_URL = os.getenv("BASE_URL", "https://full-stack-fastapi-template-bvfx.onrender.com")
@@ -12,6 +13,19 @@ BASE_URL = os.getenv("BASE_URL", "https://full-stack-fastapi-template-bvfx.onren
 TEST_USER_EMAIL = os.getenv("TEST_USER_EMAIL", "test@example.com")
 TEST_USER_PASSWORD = os.getenv("TEST_USER_PASSWORD", "password123")
 
+
+def _load_credentials(path: str) -> List[Tuple[str, str]]:
+    """Read `email,password` rows from a CSV file (no header)."""
+    with open(path, newline="") as f:
+        return [(row[0].strip(), row[1].strip()) for row in csv.reader(f) if len(row) >= 2]
+
+
+# Optional pool of test accounts; each simulated user gets its own slice of it
+TEST_USER_CREDENTIALS_FILE = os.getenv("TEST_USER_CREDENTIALS_FILE")
+TEST_USER_CREDENTIALS = (
+    _load_credentials(TEST_USER_CREDENTIALS_FILE) if TEST_USER_CREDENTIALS_FILE else []
+) or [(TEST_USER_EMAIL, TEST_USER_PASSWORD)]
+
 # Locust settings - optimized for free-tier servers
 LOCUST_WAIT_TIME_MIN = int(os.getenv("LOCUST_WAIT_TIME_MIN", 3))  # Increased from 1 to 3
 LOCUST_WAIT_TIME_MAX = int(os.getenv("LOCUST_WAIT_TIME_MAX", 8))  # Increased from 3 to 8
@@ -22,6 +36,52 @@ LOCUST_SPAWN_RATE = int(os.getenv("LOCUST_SPAWN_RATE", 1))  # Reduced from 5 to
 LOCUST_RUN_TIME = os.getenv("LOCUST_RUN_TIME", "5m")  # Increased from 1m to 5m for longer, gentler tests
 LOCUST_EXPECT_WORKERS = int(os.getenv("LOCUST_EXPECT_WORKERS", 1))
 
+# HTTP client for the simulated users: "requests" (HttpUser) or "fast" (FastHttpUser, geventhttpclient)
+LOCUST_CLIENT = os.getenv("LOCUST_CLIENT", "requests").lower()
+
+# Traffic replay - replaces StepLoadShape when SHAPE_FILE is set (see load_shapes.py)
+SHAPE_FILE = os.getenv("SHAPE_FILE")  # CSV or JSONL points: time plus users[, spawn_rate] or rps
+SHAPE_TIME_SCALE = float(os.getenv("SHAPE_TIME_SCALE", 1))  # 24 replays 24h of traffic in 1h
+SHAPE_LOAD_SCALE = float(os.getenv("SHAPE_LOAD_SCALE", 1))  # Multiplies the users / RPS in the file
+SHAPE_RESOLUTION = float(os.getenv("SHAPE_RESOLUTION", 1))  # Seconds of run time per precomputed step
+SHAPE_SPAWN_RATE = float(os.getenv("SHAPE_SPAWN_RATE", 10))  # Minimum spawn rate when the file has none
+SHAPE_USERS_PER_RPS = float(os.getenv("SHAPE_USERS_PER_RPS", 1))  # User pool size per request/s for RPS series
+
+# Service level objective used to judge load levels
+SLO_P95_MS = float(os.getenv("SLO_P95_MS", 1000))  # 95th percentile response time limit
+SLO_MAX_FAILURE_RATE = float(os.getenv("SLO_MAX_FAILURE_RATE", 0.01))  # Fraction of requests allowed to fail
+
+# Capacity search - replaces the other shapes when CAPACITY_SEARCH is true (see load_shapes.py)
+CAPACITY_SEARCH = os.getenv("CAPACITY_SEARCH", "false").lower() == "true"
+SEARCH_UNIT = os.getenv("SEARCH_UNIT", "users").lower()  # "users" or "rps" (open model, needs ARRIVAL_RATE)
+SEARCH_MIN = float(os.getenv("SEARCH_MIN", 1))  # First load level probed
+SEARCH_MAX = float(os.getenv("SEARCH_MAX", 1000))  # Never probe above this level
+SEARCH_TOLERANCE = float(os.getenv("SEARCH_TOLERANCE", 1))  # Stop once the passing and failing levels are this close; must be positive
+SEARCH_STEP_DURATION = float(os.getenv("SEARCH_STEP_DURATION", 60))  # Seconds spent at each level
+SEARCH_WARMUP = float(os.getenv("SEARCH_WARMUP", 15))  # Seconds at the start of each level left out of the measurement
+SEARCH_RESULT_PATH = os.getenv("SEARCH_RESULT_PATH", "capacity.json")
+
+# Shared auth token pool
+TOKEN_POOL_SIZE = int(os.getenv("TOKEN_POOL_SIZE", 8))  # Kept small for free-tier servers
+TOKEN_REFRESH_MARGIN = float(os.getenv("TOKEN_REFRESH_MARGIN", 60))  # Refresh tokens this many seconds before expiry
+
+# Global login throttle (token bucket shared by all users on a worker)
+LOGIN_RATE_PER_SEC = float(os.getenv("LOGIN_RATE_PER_SEC", 0.5))  # One login every 2 seconds for free-tier
+LOGIN_BURST = int(os.getenv("LOGIN_BURST", 1))
+
+# IP spoofing - each user claims its own stride of a shared, packed IP pool
+ENABLE_IP_SPOOFING = os.getenv("ENABLE_IP_SPOOFING", "false").lower() == "true"
+IP_POOL_SIZE = int(os.getenv("IP_POOL_SIZE", 50))  # Reduced IP pool size for lighter load
+IP_POOL_RANGES = [r.strip() for r in os.getenv(
+    "IP_POOL_RANGES", "10.0.0.0/8,172.16.0.0/12,192.168.0.0/16,100.64.0.0/10,169.254.0.0/16"
+).split(",") if r.strip()]
+IP_ADDRESSES_PER_USER = int(os.getenv("IP_ADDRESSES_PER_USER", 5))
+
+# Deterministic sharding of IPs, credentials and item IDs across workers
+# Set LOAD_TEST_SEED to replay the exact same distribution run after run
+LOAD_TEST_SEED = int(os.environ["LOAD_TEST_SEED"]) if os.getenv("LOAD_TEST_SEED") else None
+ITEM_IDS_PER_USER = int(os.getenv("ITEM_IDS_PER_USER", 1000))
+
 # Test data for creating users and items
 TEST_USER_DATA = {
     "email": "loadtest_user@example.com",
@@ -6,6 +6,7 @@ and verifies that the expected number of workers are connected.
 
 Usage:
     python custom_health_check.py --host=localhost --port=8089
+    python custom_health_check.py --watch --interval=5
 """
 
 import os
@@ -35,6 +36,10 @@ def parse_arguments():
     parser.add_argument("--expect-workers", type=int, default=LOCUST_EXPECT_WORKERS, 
                         help=f"Expected number of worker nodes (default: {LOCUST_EXPECT_WORKERS})")
     parser.add_argument("--json", action="store_true", help="Output in JSON format")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep polling and print only changes (workers joining, leaving, missing; master down or stalled) as JSON lines")
+    parser.add_argument("--interval", type=float, default=5.0,
+                        help="Seconds between polls with --watch (default: 5)")
     
     return parser.parse_args()
 
@@ -57,7 +62,8 @@ def check_master_health(host, port):
 
 def check_workers_health(host, port, expected_workers):
     """
-    Check if the expected number of workers are connected
+    Check if the expected number of workers are connected and none of them
+    sends its stats late (served by the master's worker_health tracking)
     """
     url = f"http://{host}:{port}/workers"
     
@@ -67,13 +73,15 @@ def check_workers_health(host, port, expected_workers):
             data = response.json()
             workers = data.get("workers", [])
             worker_count = len(workers)
+            late = data.get("late", [])
             
-            if worker_count >= expected_workers:
+            if worker_count >= expected_workers and not late:
                 return True, {"count": worker_count, "workers": workers}
             else:
                 return False, {
                     "count": worker_count, 
                     "expected": expected_workers,
+                    "late": late,
                     "workers": workers
                 }
         else:
@@ -84,6 +92,12 @@ def check_workers_health(host, port, expected_workers):
 
 def main():
     args = parse_arguments()
+
+    if args.watch:
+        from app.core.locust_load_test.health_check import watch
+
+        watch([f"http://{args.host}:{args.port}"], interval=args.interval)
+        return 0
     
     health_data = {
         "master": {
@@ -121,6 +135,10 @@ def main():
             worker_details = health_data["workers"]["details"]
             if isinstance(worker_details, dict) and "count" in worker_details:
                 print(f"  Connected workers: {worker_details['count']}/{args.expect_workers}")
+                for worker in worker_details.get("workers", []):
+                    if worker.get("id") in worker_details.get("late", []):
+                        print(f"  Late worker {worker['id']}: last stats {worker.get('stats_age_s') or 0:.1f}s ago, "
+                              f"last heartbeat {worker.get('heartbeat_age_s') or 0:.1f}s ago")
         
         print(f"Overall Health: {'✅ Healthy' if health_data['overall'] else '❌ Unhealthy'}")
     
@@ -10,6 +10,9 @@ Usage:
 
     # Worker mode
     python custom_run_distributed_locust.py --worker --host=localhost
+
+    # Master plus one worker per core on this machine
+    python custom_run_distributed_locust.py --processes --headless
 """
 
 import os
@@ -30,6 +33,7 @@ from app.core.locust_load_test.custom.config import (
     LOCUST_RUN_TIME,
     LOCUST_EXPECT_WORKERS,
 )
+from app.core.locust_load_test.launcher import LocalCluster
 
 
 def parse_arguments():
@@ -39,6 +43,8 @@ def parse_arguments():
     mode_group = parser.add_mutually_exclusive_group(required=True)
     mode_group.add_argument("--master", action="store_true", help="Run in master mode")
     mode_group.add_argument("--worker", action="store_true", help="Run in worker mode")
+    mode_group.add_argument("--processes", type=int, nargs="?", const=0, default=None,
+                            help="Run a master plus N local workers (default N: one per core)")
     
     # Master mode arguments
     parser.add_argument("--users", type=int, default=LOCUST_USERS, 
@@ -61,10 +67,39 @@ def parse_arguments():
                         help=f"Target host to load test (default: {BASE_URL})")
     parser.add_argument("--headless", action="store_true", 
                         help="Run in headless mode without web UI")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Seed for deterministic user/IP/data sharding (sets LOAD_TEST_SEED)")
+    
+    # Local pool arguments
+    parser.add_argument("--pin-cpus", action="store_true",
+                        help="Pin each local worker to its own core (--processes only)")
+    parser.add_argument("--max-restarts", type=int, default=5,
+                        help="Times a crashed local worker is restarted (--processes only, default: 5)")
     
     return parser.parse_args()
 
 
+def locust_env(args):
+    """Environment for the locust process, passing the sharding seed through"""
+    env = os.environ.copy()
+    if args.seed is not None:
+        env["LOAD_TEST_SEED"] = str(args.seed)
+    return env
+
+
+def master_options(args):
+    """Target host and, when headless, the load settings for the master"""
+    options = ["--host", args.target_host]
+    if args.headless:
+        options.extend([
+            "--headless",
+            "--users", str(args.users),
+            "--spawn-rate", str(args.spawn_rate),
+            "--run-time", args.run_time,
+        ])
+    return options
+
+
 def run_master(args):
     """Run Locust in master mode"""
     print(f"Starting Locust master with {args.users} users at {args.spawn_rate} users/sec")
@@ -74,20 +109,11 @@ def run_master(args):
         "locust",
         "-f", "app/core/locust_load_test/custom/locustfile.py",
         "--master",
-        "--host", args.target_host,
         "--expect-workers", str(args.expect_workers),
-    ]
-    
-    if args.headless:
-        cmd.extend([
-            "--headless",
-            "--users", str(args.users),
-            "--spawn-rate", str(args.spawn_rate),
-            "--run-time", args.run_time,
-        ])
+    ] + master_options(args)
     
     print(f"Running command: {' '.join(cmd)}")
-    subprocess.run(cmd)
+    subprocess.run(cmd, env=locust_env(args))
 
 
 def run_worker(args):
@@ -105,13 +131,31 @@ def run_worker(args):
     ]
     
     print(f"Running command: {' '.join(cmd)}")
-    subprocess.run(cmd)
+    subprocess.run(cmd, env=locust_env(args))
+
+
+def run_local_pool(args):
+    """Run a master plus a supervised worker per core on this machine"""
+    cluster = LocalCluster(
+        "app/core/locust_load_test/custom/locustfile.py",
+        processes=args.processes,
+        master_args=master_options(args),
+        worker_args=["--host", args.target_host],
+        pin_cpus=args.pin_cpus,
+        max_restarts=args.max_restarts,
+        env=locust_env(args),
+    )
+    print(f"Starting Locust master with {cluster.processes} local workers")
+    print(f"Target host: {args.target_host}")
+    return cluster.run()
 
 
 def main():
     args = parse_arguments()
     
-    if args.master:
+    if args.processes is not None:
+        sys.exit(run_local_pool(args))
+    elif args.master:
         run_master(args)
     else:
         run_worker(args)
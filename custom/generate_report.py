@@ -2,17 +2,21 @@
 Utility script to generate a load test report from Locust results.
 
 This script connects to a running Locust instance, retrieves test statistics,
-and generates a report with analysis of the results.
+and generates a report with analysis of the results. It can also build the
+report offline from the files written by `locust --csv=<prefix>`, or take
+snapshots while the test runs to chart how it changed over time.
 
 Usage:
     python generate_report.py --host=localhost --port=8089 --output=report.html
+    python generate_report.py --snapshot-interval=5 --output=report.html
+    python generate_report.py --csv=mcp_test_results --output=report.html
 """
 
 import os
 import sys
 import json
+import time
 import argparse
-import requests
 import datetime
 from pathlib import Path
 
@@ -23,6 +27,11 @@ from app.core.locust_load_test.custom.config import (
     LOCUST_MASTER_HOST,
     LOCUST_MASTER_PORT,
 )
+from app.core.locust_load_test.custom.live_stats import SNAPSHOT_ENDPOINTS, StatsFetcher, snapshot_point
+from app.core.locust_load_test.custom.offline_stats import HistoryBuckets, load_csv_results, read_history
+from app.core.locust_load_test.request_trace import TraceReader, exact_percentiles
+
+TRACE_QUANTILES = (0.5, 0.9, 0.95, 0.99, 0.999, 0.9999)
 
 
 def parse_arguments():
@@ -34,37 +43,291 @@ def parse_arguments():
                         help=f"Locust master port (default: {LOCUST_MASTER_PORT})")
     parser.add_argument("--output", type=str, default="load_test_report.html", 
                         help="Output file for the report (default: load_test_report.html)")
+    parser.add_argument("--csv", type=str, default=None, metavar="PREFIX",
+                        help="Build the report offline from Locust --csv output files instead of a running master")
+    parser.add_argument("--max-points", type=int, default=500,
+                        help="Maximum points per time-series chart when reading stats history (default: 500)")
+    parser.add_argument("--trace", type=str, nargs="+", default=[],
+                        help="Binary request trace file(s) (REQUEST_TRACE_PATH) to compute exact percentiles from")
+    parser.add_argument("--timeout", type=float, default=5.0,
+                        help="Timeout per request to the master in seconds (default: 5)")
+    parser.add_argument("--retries", type=int, default=3,
+                        help="Retries shared by all requests of one fetch, with exponential backoff (default: 3)")
+    parser.add_argument("--snapshot-interval", type=float, default=None, metavar="SECONDS",
+                        help="Snapshot the master every SECONDS until its test stops, then report with charts over time")
+    parser.add_argument("--duration", type=float, default=None, metavar="SECONDS",
+                        help="Stop taking snapshots after SECONDS even if the test is still running")
+    parser.add_argument("--snapshots", type=str, default=None, metavar="FILE",
+                        help="Also append every snapshot to FILE as a JSON line")
     
     return parser.parse_args()
 
 
-def get_locust_stats(host, port):
-    """Retrieve statistics from Locust"""
-    endpoints = {
-        "stats": f"http://{host}:{port}/stats/requests",
-        "errors": f"http://{host}:{port}/stats/failures",
-        "exceptions": f"http://{host}:{port}/exceptions",
-        "workers": f"http://{host}:{port}/workers",
-    }
-    
-    results = {}
-    
-    for name, url in endpoints.items():
-        try:
-            response = requests.get(url, timeout=5)
-            if response.status_code == 200:
-                results[name] = response.json()
-            else:
-                print(f"Warning: Could not retrieve {name}. Status code: {response.status_code}")
-                results[name] = {"error": f"Status code: {response.status_code}"}
-        except requests.exceptions.RequestException as e:
-            print(f"Error retrieving {name}: {e}")
-            results[name] = {"error": str(e)}
+def get_locust_stats(host, port, fetcher=None):
+    """Retrieve statistics from Locust, all endpoints concurrently"""
+    if fetcher is not None:
+        return fetcher.fetch()
+    fetcher = StatsFetcher(f"http://{host}:{port}")
+    try:
+        return fetcher.fetch()
+    finally:
+        fetcher.close()
+
+
+def take_snapshots(fetcher, interval, max_points, duration=None, snapshot_file=None):
+    """Snapshot the master every `interval` seconds until its test stops or the master goes away"""
+    history = HistoryBuckets(max_points)
+    last = {}
+    seen_running = False
+    started = time.monotonic()
+    out = open(snapshot_file, "a") if snapshot_file else None
+    try:
+        while True:
+            snapshot = fetcher.fetch(SNAPSHOT_ENDPOINTS)
+            point = snapshot_point(snapshot["stats"])
+            if point is None:
+                print("Master unreachable, ending snapshots")
+                break
+            last.update(snapshot)
+            history.add(point["timestamp"], point["user_count"], point["rps"], point["fail_per_sec"], point["p50"], point["p95"])
+            if out:
+                out.write(json.dumps(point) + "\n")
+                out.flush()
+            running = point["state"] in ("spawning", "running")
+            seen_running = seen_running or running
+            if seen_running and not running:
+                print(f"Test {point['state']} after {history.rows} snapshots")
+                break
+            if duration is not None and time.monotonic() - started >= duration:
+                break
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print(f"Interrupted after {history.rows} snapshots")
+    finally:
+        if out:
+            out.close()
+    return history, last
+
+
+def get_history_points(prefix, max_points):
+    """Downsampled aggregate time series from <prefix>_stats_history.csv, if it exists"""
+    path = Path(f"{prefix}_stats_history.csv")
+    if not path.exists():
+        return []
+    history = read_history(str(path), max_points=max_points)
+    print(f"Read {history.rows} history rows into {len(history.points())} points ({history.width}s each)")
+    return history.points()
+
+
+def svg_line_chart(points, key, title, unit, color, width=1000, height=220):
+    """Inline SVG line chart of points[key] over time; no JavaScript or external assets"""
+    pad_left, pad_bottom, pad_top = 60, 30, 25
+    plot_width, plot_height = width - pad_left - 10, height - pad_bottom - pad_top
+    values = [point[key] for point in points]
+    t0, t1 = points[0]["timestamp"], points[-1]["timestamp"]
+    span = max(t1 - t0, 1)
+    top = max(values) or 1
     
-    return results
+    coords = " ".join(
+        f"{pad_left + (point['timestamp'] - t0) / span * plot_width:.1f},"
+        f"{pad_top + plot_height - value / top * plot_height:.1f}"
+        for point, value in zip(points, values)
+    )
+    return f"""
+    <svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" viewBox="0 0 {width} {height}">
+        <text x="{pad_left}" y="15" font-size="14" font-weight="bold">{title}</text>
+        <line x1="{pad_left}" y1="{pad_top}" x2="{pad_left}" y2="{pad_top + plot_height}" stroke="#999"/>
+        <line x1="{pad_left}" y1="{pad_top + plot_height}" x2="{width - 10}" y2="{pad_top + plot_height}" stroke="#999"/>
+        <text x="{pad_left - 5}" y="{pad_top + 5}" font-size="11" text-anchor="end">{top:.0f} {unit}</text>
+        <text x="{pad_left - 5}" y="{pad_top + plot_height}" font-size="11" text-anchor="end">0</text>
+        <text x="{pad_left}" y="{height - 8}" font-size="11">0s</text>
+        <text x="{width - 10}" y="{height - 8}" font-size="11" text-anchor="end">{span}s</text>
+        <polyline fill="none" stroke="{color}" stroke-width="1.5" points="{coords}"/>
+    </svg>
+"""
+
+
+def generate_history_section(points):
+    """Time-series charts built from the stats history"""
+    html = """
+    <h2>Over Time</h2>
+"""
+    for key, title, unit, color in (
+        ("user_count", "Users", "users", "#2c3e50"),
+        ("rps", "Requests per Second", "req/s", "#27ae60"),
+        ("fail_per_sec", "Failures per Second", "fail/s", "#c0392b"),
+        ("p50", "Median Response Time", "ms", "#2980b9"),
+        ("p95", "95th Percentile Response Time", "ms", "#8e44ad"),
+    ):
+        html += svg_line_chart(points, key, title, unit, color)
+    return html
+
+
+def get_trace_summary(paths):
+    """Compute exact per-endpoint percentiles from binary trace files (memory-mapped, not loaded)"""
+    readers = [TraceReader(path) for path in paths]
+    print(f"Analyzing {sum(len(r) for r in readers)} traced requests from {len(readers)} file(s)...")
+    return exact_percentiles(readers, TRACE_QUANTILES)
+
+
+def generate_trace_section(trace_summary):
+    """HTML table of exact percentiles computed from request traces"""
+    html = """
+    <h2>Exact Latency Percentiles (from request trace)</h2>
+    <table>
+        <tr>
+            <th>Endpoint</th>
+            <th>Requests</th>
+            <th>Failures</th>
+            <th>Average (ms)</th>
+"""
+    for q in TRACE_QUANTILES:
+        html += f"""            <th>p{q * 100:g} (ms)</th>
+"""
+    html += """            <th>Max (ms)</th>
+        </tr>
+"""
+    for name, entry in trace_summary.items():
+        html += f"""
+        <tr>
+            <td>{name}</td>
+            <td>{entry["num_requests"]}</td>
+            <td>{entry["num_failures"]}</td>
+            <td>{entry["avg_response_time"]:.2f}</td>
+"""
+        for q in TRACE_QUANTILES:
+            html += f"""            <td>{entry["percentiles"][q]:.3f}</td>
+"""
+        html += f"""            <td>{entry["max_response_time"]:.3f}</td>
+        </tr>
+"""
+    html += """
+    </table>
+"""
+    return html
+
+
+def generate_hdr_section(hdr):
+    """HTML table of the cluster-wide HDR histogram percentiles from /stats/hdr"""
+    entries = hdr.get("stats", [])
+    if not entries:
+        return ""
+    quantiles = list(entries[0]["percentiles"])
+    html = f"""
+    <h2>Latency Percentiles (HDR histograms, {hdr.get("significant_digits")} significant digits)</h2>
+    <table>
+        <tr>
+            <th>Endpoint</th>
+            <th>Requests</th>
+            <th>Average (ms)</th>
+"""
+    for q in quantiles:
+        html += f"""            <th>p{float(q) * 100:g} (ms)</th>
+"""
+    html += """            <th>Max (ms)</th>
+        </tr>
+"""
+    for entry in entries:
+        # Coordinated-omission corrected values go in a row right below the raw ones
+        rows = [(f'{entry["method"]} {entry["name"]}', entry)]
+        if "corrected" in entry:
+            rows.append((f'{entry["method"]} {entry["name"]} (corrected)', entry["corrected"]))
+        for label, values in rows:
+            html += f"""
+        <tr>
+            <td>{label}</td>
+            <td>{values["num_requests"]}</td>
+            <td>{values["avg_response_time"]:.2f}</td>
+"""
+            for q in quantiles:
+                html += f"""            <td>{values["percentiles"][q]:.3f}</td>
+"""
+            html += f"""            <td>{values["max_response_time"]:.3f}</td>
+        </tr>
+"""
+    html += """
+    </table>
+"""
+    return html
 
 
-def generate_html_report(stats, output_file):
+def generate_saturation_section(saturation):
+    """HTML table of per-worker load generator saturation from /stats/saturation"""
+    status_class = "critical" if saturation.get("saturated") else "good"
+    html = f"""
+    <h2>Load Generator Saturation</h2>
+    <p class="{status_class}">{saturation.get("verdict", "")}</p>
+    <table>
+        <tr>
+            <th>Worker</th>
+            <th>Saturated Intervals</th>
+            <th>Requests in Saturated Intervals</th>
+            <th>Rejected Requests</th>
+            <th>Peak CPU (%)</th>
+            <th>Peak Event Loop Lag (ms)</th>
+            <th>Peak Send Delay (ms)</th>
+        </tr>
+"""
+    for worker, values in saturation.get("workers", {}).items():
+        row_class = "critical" if values["saturated"] else "good"
+        html += f"""
+        <tr>
+            <td>{worker}</td>
+            <td class="{row_class}">{values["saturated"]} / {values["intervals"]}</td>
+            <td>{values["saturated_requests"]} / {values["requests"]}</td>
+            <td>{values["rejected_requests"]}</td>
+            <td>{values["peak_cpu_percent"]:.0f}</td>
+            <td>{values["peak_loop_lag_ms"]:.0f}</td>
+            <td>{values["peak_send_delay_ms"]:.0f}</td>
+        </tr>
+"""
+    html += """
+    </table>
+"""
+    return html
+
+
+def generate_worker_timing_section(workers, late):
+    """HTML table of per-worker heartbeat and report timing from /workers"""
+    html = """
+    <h2>Worker Reporting</h2>
+    <table>
+        <tr>
+            <th>Worker</th>
+            <th>State</th>
+            <th>Users</th>
+            <th>Heartbeat Interval (s)</th>
+            <th>Report Interval (s)</th>
+            <th>Longest Report Gap (s)</th>
+            <th>Late Reports</th>
+            <th>Report Lag (ms)</th>
+            <th>Queued Entries</th>
+            <th>Stats Age (s)</th>
+        </tr>
+"""
+    for worker in workers:
+        row_class = "critical" if worker["id"] in late else "warning" if worker.get("late_reports") else "good"
+        html += f"""
+        <tr>
+            <td>{worker["id"]}</td>
+            <td>{worker.get("state", "")}</td>
+            <td>{worker.get("user_count", 0)}</td>
+            <td>{worker.get("heartbeat_interval_s", 0):.2f}</td>
+            <td>{worker.get("report_interval_s", 0):.2f}</td>
+            <td class="{row_class}">{worker.get("max_report_interval_s", 0):.2f}</td>
+            <td class="{row_class}">{worker.get("late_reports", 0)} / {worker.get("reports", 0)}</td>
+            <td>{worker.get("report_lag_ms", 0):.0f}</td>
+            <td>{worker.get("queued_entries", 0)} (max {worker.get("max_queued_entries", 0)})</td>
+            <td class="{row_class}">{worker.get("stats_age_s") or 0:.1f}</td>
+        </tr>
+"""
+    html += """
+    </table>
+"""
+    return html
+
+
+def generate_html_report(stats, output_file, trace_summary=None, history_points=None):
     """Generate an HTML report from the statistics"""
     now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
@@ -136,16 +399,18 @@ def generate_html_report(stats, output_file):
     
     # Add summary statistics
     if total_stats:
-        total_requests = sum(stat.get("num_requests", 0) for stat in total_stats)
-        total_failures = sum(stat.get("num_failures", 0) for stat in total_stats)
+        # Locust appends an "Aggregated" row; leave it out so totals aren't counted twice
+        endpoint_stats = [stat for stat in total_stats if stat.get("name") != "Aggregated"] or total_stats
+        total_requests = sum(stat.get("num_requests", 0) for stat in endpoint_stats)
+        total_failures = sum(stat.get("num_failures", 0) for stat in endpoint_stats)
         failure_rate = (total_failures / total_requests * 100) if total_requests > 0 else 0
         
-        # Calculate average response time across all endpoints
-        avg_response_times = [stat.get("avg_response_time", 0) for stat in total_stats if stat.get("avg_response_time")]
-        avg_response_time = sum(avg_response_times) / len(avg_response_times) if avg_response_times else 0
+        # Average response time across all requests, weighting each endpoint by its request count
+        weighted_time = sum(stat.get("avg_response_time", 0) * stat.get("num_requests", 0) for stat in endpoint_stats)
+        avg_response_time = weighted_time / total_requests if total_requests > 0 else 0
         
         # Find max response time
-        max_response_time = max([stat.get("max_response_time", 0) for stat in total_stats]) if total_stats else 0
+        max_response_time = max(stat.get("max_response_time", 0) for stat in endpoint_stats)
         
         # Determine status class based on metrics
         failure_class = "good" if failure_rate < 1 else "warning" if failure_rate < 5 else "critical"
@@ -158,6 +423,16 @@ def generate_html_report(stats, output_file):
         <p><strong>Average Response Time:</strong> <span class="{response_class}">{avg_response_time:.2f} ms</span></p>
         <p><strong>Maximum Response Time:</strong> {max_response_time:.2f} ms</p>
         <p><strong>Active Workers:</strong> {len(workers)}</p>
+"""
+        saturation = stats.get("saturation", {})
+        if saturation.get("workers"):
+            # Say up front whether the numbers above describe the target or the load generator
+            if saturation.get("saturated"):
+                generator, generator_class = "saturated, latencies partly reflect the load generator", "critical"
+            else:
+                generator, generator_class = "not saturated", "good"
+            html += f"""
+        <p><strong>Load Generator:</strong> <span class="{generator_class}">{generator}</span></p>
 """
     else:
         html += "<p>No statistics available</p>"
@@ -211,7 +486,25 @@ def generate_html_report(stats, output_file):
     
     html += """
     </table>
+"""
+    
+    if stats.get("hdr", {}).get("stats"):
+        html += generate_hdr_section(stats["hdr"])
+    
+    if stats.get("saturation", {}).get("workers"):
+        html += generate_saturation_section(stats["saturation"])
+    
+    timed_workers = [worker for worker in workers if "reports" in worker]
+    if timed_workers:
+        html += generate_worker_timing_section(timed_workers, stats["workers"].get("late", []))
+    
+    if history_points:
+        html += generate_history_section(history_points)
     
+    if trace_summary:
+        html += generate_trace_section(trace_summary)
+    
+    html += """
     <h2>Errors</h2>
 """
     
@@ -273,6 +566,16 @@ def generate_html_report(stats, output_file):
     recommendations = []
     
     # Add recommendations based on results
+    if stats.get("saturation", {}).get("saturated"):
+        recommendations.append(stats["saturation"]["verdict"])
+    
+    late_workers = [worker["id"] for worker in workers if worker.get("late_reports")]
+    if late_workers:
+        recommendations.append(
+            f"Stats reports from {', '.join(late_workers)} arrived late. Their requests reached the master in bursts, "
+            "which skews the current RPS and percentiles. Add workers or run fewer users per worker."
+        )
+    
     if total_stats:
         if failure_rate > 5:
             recommendations.append("High failure rate detected. Investigate the errors and exceptions listed above.")
@@ -322,11 +625,32 @@ def generate_html_report(stats, output_file):
 def main():
     args = parse_arguments()
     
-    print(f"Connecting to Locust at {args.host}:{args.port}...")
-    stats = get_locust_stats(args.host, args.port)
+    history_points = None
+    if args.csv:
+        print(f"Reading Locust CSV results from {args.csv}_*.csv...")
+        stats = load_csv_results(args.csv)
+        history_points = get_history_points(args.csv, args.max_points)
+    else:
+        print(f"Connecting to Locust at {args.host}:{args.port}...")
+        fetcher = StatsFetcher(f"http://{args.host}:{args.port}", timeout=args.timeout, retries=args.retries)
+        last_snapshot = {}
+        if args.snapshot_interval:
+            print(f"Taking a snapshot every {args.snapshot_interval:g}s until the test stops (Ctrl+C to stop early)...")
+            history, last_snapshot = take_snapshots(
+                fetcher, args.snapshot_interval, args.max_points, args.duration, args.snapshots
+            )
+            history_points = history.points()
+        stats = get_locust_stats(args.host, args.port, fetcher)
+        fetcher.close()
+        # A master that quit at the end of the test leaves its last snapshot
+        for name, value in last_snapshot.items():
+            if "error" in stats.get(name, {}):
+                stats[name] = value
+    
+    trace_summary = get_trace_summary(args.trace) if args.trace else None
     
     print(f"Generating report to {args.output}...")
-    generate_html_report(stats, args.output)
+    generate_html_report(stats, args.output, trace_summary, history_points)
     
     return 0
 
@@ -0,0 +1,140 @@
+"""
+Packed pool of spoofed IPv4 addresses for the FastAPI load test users.
+
+Addresses are generated in bulk across the configured CIDR ranges and kept
+as a flat uint32 buffer (a NumPy array when NumPy is installed, otherwise
+an `array('I')`). NumPy is optional (`pip install numpy`, included in
+docker/Dockerfile.locust): it builds the pool vectorized, the pure-Python
+fallback computes the same addresses one at a time. Both derive address i
+from a SplitMix64 hash of the seed and i, so workers with and without
+NumPy build the identical pool for a seed.
+
+Each simulated user takes its own disjoint stride of the pool (slice_for),
+which is just a start offset and a length, so per-user memory is a few
+integers.
+"""
+
+import ipaddress
+import random
+import socket
+from array import array
+from typing import Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; the stdlib array fallback is slower to fill
+    np = None
+
+# Private, carrier-grade NAT and link-local ranges
+DEFAULT_IP_RANGES = (
+    "10.0.0.0/8",
+    "172.16.0.0/12",
+    "192.168.0.0/16",
+    "100.64.0.0/10",
+    "169.254.0.0/16",
+)
+
+
+# SplitMix64 constants
+_MASK64 = (1 << 64) - 1
+_GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+_MIX1 = 0xBF58476D1CE4E5B9
+_MIX2 = 0x94D049BB133111EB
+
+
+def _splitmix64(seed: int, counter: int) -> int:
+    """The `counter`-th output of a SplitMix64 stream started at `seed`."""
+    z = (seed + counter * _GOLDEN_GAMMA) & _MASK64
+    z = ((z ^ (z >> 30)) * _MIX1) & _MASK64
+    z = ((z ^ (z >> 27)) * _MIX2) & _MASK64
+    return z ^ (z >> 31)
+
+
+def format_ipv4(value: int) -> str:
+    """Dotted-quad string for an address stored as an integer."""
+    return socket.inet_ntoa(int(value).to_bytes(4, "big"))
+
+
+class IPPool:
+    """
+    Fixed-size pool of random addresses drawn from `ranges`.
+
+    Each address first picks one of the ranges uniformly, then a uniform
+    address inside it. Passing a `seed` makes the pool identical across
+    processes, whether or not they have NumPy.
+    """
+
+    def __init__(self, size: int, ranges: Sequence[str] = DEFAULT_IP_RANGES, seed: Optional[int] = None):
+        if size <= 0:
+            raise ValueError("IP pool size must be positive")
+        networks = [ipaddress.IPv4Network(cidr, strict=False) for cidr in ranges]
+        if not networks:
+            raise ValueError("At least one IP range is required")
+
+        self.size = size
+        self.ranges = tuple(str(net) for net in networks)
+        self._starts = [int(net.network_address) for net in networks]
+        self._spans = [net.num_addresses for net in networks]
+        self._addresses = self._generate(random.getrandbits(64) if seed is None else seed & _MASK64)
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the packed address buffer."""
+        return len(self._addresses) * self._addresses.itemsize
+
+    def _generate(self, seed: int):
+        # Address i takes stream outputs 2i + 1 (range) and 2i + 2 (offset inside it)
+        if np is not None:
+            counters = np.arange(1, 2 * self.size + 1, dtype=np.uint64)
+            with np.errstate(over="ignore"):
+                z = np.uint64(seed) + counters * np.uint64(_GOLDEN_GAMMA)
+                z = (z ^ (z >> np.uint64(30))) * np.uint64(_MIX1)
+                z = (z ^ (z >> np.uint64(27))) * np.uint64(_MIX2)
+            z ^= z >> np.uint64(31)
+            starts = np.array(self._starts, dtype=np.uint64)
+            spans = np.array(self._spans, dtype=np.uint64)
+            choice = z[0::2] % np.uint64(len(starts))
+            offsets = z[1::2] % spans[choice]
+            return (starts[choice] + offsets).astype(np.uint32)
+
+        addresses = array("I")
+        for i in range(self.size):
+            choice = _splitmix64(seed, 2 * i + 1) % len(self._starts)
+            addresses.append(self._starts[choice] + _splitmix64(seed, 2 * i + 2) % self._spans[choice])
+        return addresses
+
+    def address(self, index: int) -> str:
+        """Address at `index`, wrapping around the end of the pool."""
+        return format_ipv4(self._addresses[index % self.size])
+
+    def slice_for(self, slot: int, length: int) -> "IPSlice":
+        """The `slot`-th stride of `length` addresses; strides are disjoint until the pool wraps."""
+        return IPSlice(self, (slot * length) % self.size, max(1, min(length, self.size)))
+
+class IPSlice:
+    """A user's view onto a contiguous run of the pool."""
+
+    __slots__ = ("pool", "start", "length", "_cursor")
+
+    def __init__(self, pool: IPPool, start: int, length: int):
+        self.pool = pool
+        self.start = start
+        self.length = length
+        self._cursor = 0
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, index: int) -> str:
+        return self.pool.address(self.start + index % self.length)
+
+    def next(self) -> str:
+        """Rotate to the next address in the slice."""
+        self._cursor = (self._cursor + 1) % self.length
+        return self[self._cursor]
+
+    def random(self, rng=random) -> str:
+        return self[rng.randrange(self.length)]
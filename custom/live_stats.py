@@ -0,0 +1,159 @@
+"""
+Fetch statistics from a running Locust master for report generation.
+
+`StatsFetcher` gets all the endpoints a report needs concurrently over one
+keep-alive session, so a report costs as long as the slowest endpoint
+(usually /stats/requests on a busy master) instead of the sum of all of
+them. Failed requests (connection errors, timeouts, 5xx and 429) are
+retried with exponential backoff out of a retry budget shared by all the
+endpoints of one fetch, so a master that is down costs a bounded number of
+attempts.
+
+Repeated fetches are cheaper than the first:
+
+- a response with an ETag or Last-Modified header is asked for again with
+  If-None-Match / If-Modified-Since, and a 304 reuses the previous body,
+- an endpoint the master doesn't serve (404, e.g. /stats/hdr without
+  histogram.py) is not asked for again,
+- `fetch(SNAPSHOT_ENDPOINTS)` gets only what a time-series point needs.
+
+`snapshot_point()` turns /stats/requests into the same point format as
+offline_stats.read_history(), so snapshots taken during a run feed the
+report's "Over Time" charts.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+REPORT_ENDPOINTS = {
+    "stats": "/stats/requests",
+    "errors": "/stats/failures",
+    "exceptions": "/exceptions",
+    "workers": "/workers",
+    "hdr": "/stats/hdr",
+    "saturation": "/stats/saturation",
+}
+SNAPSHOT_ENDPOINTS = ("stats",)
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class RetryBudget:
+    """Retries shared by the concurrent requests of one fetch."""
+
+    def __init__(self, retries: int):
+        self.remaining = retries
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+
+class StatsFetcher:
+    """Concurrent, pooled and conditional GETs of a master's stats endpoints."""
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = 5.0,
+        retries: int = 3,
+        backoff: float = 0.5,
+        session: Optional[requests.Session] = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.sleep = sleep
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=len(REPORT_ENDPOINTS))
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+        self.validators: Dict[str, Dict[str, str]] = {}  # path -> conditional request headers
+        self.bodies: Dict[str, Any] = {}  # path -> last body, for 304 responses
+        self.missing: Dict[str, Dict[str, str]] = {}  # path -> error, for endpoints answering 404
+
+    def _conditional_headers(self, path: str) -> Dict[str, str]:
+        headers = {"Accept": "application/json"}
+        headers.update(self.validators.get(path, {}))
+        return headers
+
+    def _remember(self, path: str, response: Any, body: Any) -> None:
+        validators = {}
+        if response.headers.get("ETag"):
+            validators["If-None-Match"] = response.headers["ETag"]
+        if response.headers.get("Last-Modified"):
+            validators["If-Modified-Since"] = response.headers["Last-Modified"]
+        if validators:
+            self.validators[path] = validators
+            self.bodies[path] = body
+
+    def get(self, name: str, path: str, budget: RetryBudget) -> Any:
+        """One endpoint; returns its JSON, or {"error": ...} like the report expects."""
+        if path in self.missing:
+            return self.missing[path]
+        attempt = 0
+        while True:
+            try:
+                response = self.session.get(
+                    f"{self.base_url}{path}", timeout=self.timeout, headers=self._conditional_headers(path)
+                )
+                if response.status_code == 304 and path in self.bodies:
+                    return self.bodies[path]
+                if response.status_code == 200:
+                    body = response.json()
+                    self._remember(path, response, body)
+                    return body
+                error = f"Status code: {response.status_code}"
+                if response.status_code == 404:
+                    print(f"Warning: Could not retrieve {name}. {error}")
+                    self.missing[path] = {"error": error}
+                    return self.missing[path]
+                retry = response.status_code in RETRY_STATUS
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                error, retry = str(e), True
+            except (requests.exceptions.RequestException, ValueError) as e:
+                error, retry = str(e), False
+            if not retry or not budget.take():
+                print(f"Error retrieving {name}: {error}")
+                return {"error": error}
+            self.sleep(self.backoff * 2**attempt)
+            attempt += 1
+
+    def fetch(self, names: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """The named endpoints (default: all of REPORT_ENDPOINTS), fetched concurrently."""
+        names = list(names or REPORT_ENDPOINTS)
+        budget = RetryBudget(self.retries)
+        with ThreadPoolExecutor(max_workers=len(names), thread_name_prefix="report-fetch") as pool:
+            futures = {name: pool.submit(self.get, name, REPORT_ENDPOINTS[name], budget) for name in names}
+            return {name: future.result() for name, future in futures.items()}
+
+    def close(self) -> None:
+        self.session.close()
+
+
+def snapshot_point(stats: Dict[str, Any], timestamp: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """A time-series point from /stats/requests, shaped like offline_stats history points"""
+    if not stats or "error" in stats:
+        return None
+    percentiles = stats.get("current_response_time_percentiles") or {}
+    return {
+        "timestamp": int(time.time() if timestamp is None else timestamp),
+        "state": stats.get("state"),
+        "user_count": stats.get("user_count", 0),
+        "rps": stats.get("current_rps", 0.0),
+        "fail_per_sec": stats.get("current_fail_per_sec", 0.0),
+        "p50": percentiles.get("response_time_percentile_0.5") or 0,
+        "p95": percentiles.get("response_time_percentile_0.95") or 0,
+    }
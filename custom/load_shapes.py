@@ -0,0 +1,372 @@
+"""
+Data-driven load shapes for the FastAPI load tests.
+
+ReplayShape replays a time series of load, for example one exported from
+production access logs. The file is CSV with a header row, or JSONL. Every
+point has a `time` (seconds, or an ISO 8601 timestamp) and either `users`
+(optionally with `spawn_rate`) or `rps`. Times are taken relative to the
+first point.
+
+Points are linearly interpolated and resampled once, when the shape is
+created, into flat arrays with one entry per `resolution` seconds of run time, so
+tick() is a single index lookup however long the series is. `time_scale`
+compresses the series (24 replays a day in an hour) and `load_scale`
+multiplies users and RPS.
+
+An RPS series drives the open-model arrival rate (ARRIVAL_RATE must be set
+to enable it) and keeps `users_per_rps` users per request/s available to
+serve the arrivals. Reading the file up front means a malformed series, or
+an RPS series without the open model, stops Locust at startup rather than
+once the test is running.
+
+CapacitySearchShape finds the highest load that still meets an SLO (p95
+response time and failure rate). It holds each level for `step_duration`
+seconds, judges it on the requests after `warmup`, doubles the level until
+one fails and then bisects between the best passing and the lowest failing
+level. The outcome is written as JSON to `result_path`.
+"""
+
+import csv
+import json
+import logging
+import math
+from array import array
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from locust import LoadTestShape
+
+from app.core.locust_load_test import arrival
+from app.core.locust_load_test.stats_window import Snapshot, StatsWindow, difference, snapshot
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_time(value) -> float:
+    """Seconds as a number, or an ISO 8601 timestamp converted to epoch seconds."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+
+
+def _parse_number(value) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    return float(value)
+
+
+def load_points(path: str) -> List[Dict[str, Optional[float]]]:
+    """Read `time`, `users`, `spawn_rate` and `rps` points from a CSV or JSONL file, sorted by time."""
+    with open(path, newline="") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+    points = [
+        {
+            "time": _parse_time(row["time"]),
+            "users": _parse_number(row.get("users")),
+            "spawn_rate": _parse_number(row.get("spawn_rate")),
+            "rps": _parse_number(row.get("rps")),
+        }
+        for row in rows
+    ]
+    if not points:
+        raise ValueError(f"No load points in {path}")
+    points.sort(key=lambda point: point["time"])
+    return points
+
+
+def _require_open_model(what: str) -> None:
+    if arrival.schedule is None:
+        raise ValueError(f"{what} drives the arrival rate; set ARRIVAL_RATE to enable the open model")
+
+
+class ShapeTable:
+    """
+    Load targets resampled to one entry per `resolution` seconds of run time.
+
+    `users` and `spawn_rates` are always filled; `rps` is None unless the
+    points carry an `rps` column.
+    """
+
+    def __init__(
+        self,
+        points: List[Dict[str, Optional[float]]],
+        time_scale: float = 1.0,
+        load_scale: float = 1.0,
+        resolution: float = 1.0,
+        default_spawn_rate: float = 10.0,
+        users_per_rps: float = 1.0,
+    ):
+        if time_scale <= 0 or resolution <= 0:
+            raise ValueError("time_scale and resolution must be positive")
+        self.resolution = resolution
+        by_rps = all(point["rps"] is not None for point in points)
+        if not by_rps and any(point["users"] is None for point in points):
+            raise ValueError("Every load point needs either users or rps")
+        with_spawn_rate = not by_rps and all(point["spawn_rate"] is not None for point in points)
+
+        start = points[0]["time"]
+        times = [(point["time"] - start) / time_scale for point in points]
+        column = "rps" if by_rps else "users"
+        values = [point[column] * load_scale for point in points]
+        spawn_rates = [point["spawn_rate"] for point in points] if with_spawn_rate else None
+
+        steps = int(times[-1] / resolution) + 1
+        self.users = array("I")
+        self.spawn_rates = array("d")
+        self.rps = array("d") if by_rps else None
+        segment = 0
+        for step in range(steps):
+            t = step * resolution
+            while segment < len(times) - 2 and times[segment + 1] <= t:
+                segment += 1
+            value = self._interpolate(times, values, segment, t)
+            if by_rps:
+                self.rps.append(max(value, 0.0))
+                self.users.append(max(1, math.ceil(value * users_per_rps)))
+            else:
+                self.users.append(max(0, round(value)))
+            if spawn_rates is not None:
+                self.spawn_rates.append(self._interpolate(times, spawn_rates, segment, t))
+
+        if spawn_rates is None:
+            # Spawn fast enough to follow the curve from one step to the next
+            for step in range(steps):
+                following = self.users[min(step + 1, steps - 1)]
+                self.spawn_rates.append(max(default_spawn_rate, abs(following - self.users[step]) / resolution))
+
+    @staticmethod
+    def _interpolate(times: List[float], values: List[float], segment: int, t: float) -> float:
+        if len(times) == 1:
+            return values[0]
+        t0, t1 = times[segment], times[segment + 1]
+        if t1 <= t0:
+            return values[segment + 1]
+        fraction = min(max((t - t0) / (t1 - t0), 0.0), 1.0)
+        return values[segment] + (values[segment + 1] - values[segment]) * fraction
+
+    def __len__(self) -> int:
+        return len(self.users)
+
+    @property
+    def duration(self) -> float:
+        """Run time covered by the table, in seconds."""
+        return len(self.users) * self.resolution
+
+    def step(self, run_time: float) -> int:
+        """Index of the entry for `run_time`; len(self) once the series is over."""
+        return min(int(run_time / self.resolution), len(self.users))
+
+
+class ReplayShape(LoadTestShape):
+    """
+    Replays the load series in `path`. Subclasses set `path` and the scaling
+    attributes; the file is read when Locust creates the shape, in every
+    process, so workers need it too.
+    """
+    abstract = True
+
+    path: Optional[str] = None
+    time_scale = 1.0
+    load_scale = 1.0
+    resolution = 1.0
+    default_spawn_rate = 10.0
+    users_per_rps = 1.0
+
+    def __init__(self):
+        super().__init__()
+        self.table: Optional[ShapeTable] = self.load() if self.path else None
+        self._last_rate: Optional[float] = None
+
+    def load(self) -> ShapeTable:
+        table = ShapeTable(
+            load_points(self.path),
+            time_scale=self.time_scale,
+            load_scale=self.load_scale,
+            resolution=self.resolution,
+            default_spawn_rate=self.default_spawn_rate,
+            users_per_rps=self.users_per_rps,
+        )
+        if table.rps is not None:
+            _require_open_model(f"The RPS series in {self.path}")
+        logger.info(
+            f"Replaying {self.path}: {len(table)} steps over {table.duration:.0f}s, "
+            f"peak {max(table.users)} users" + (f", {max(table.rps):.1f} RPS" if table.rps is not None else "")
+        )
+        return table
+
+    def tick(self):
+        if self.table is None:
+            self.table = self.load()
+        step = self.table.step(self.get_run_time())
+        if step >= len(self.table):
+            return None
+        if self.table.rps is not None:
+            self._set_rate(self.table.rps[step])
+        return self.table.users[step], self.table.spawn_rates[step]
+
+    def _set_rate(self, rate: float) -> None:
+        # Only message the workers when the target actually moves
+        rate = max(round(rate, 2), 0.01)
+        if rate != self._last_rate:
+            arrival.set_arrival_rate(self.runner.environment, rate)
+            self._last_rate = rate
+
+
+def measure_since(baseline: Snapshot, entry: Any, seconds: float, quantile: float = 0.95) -> Dict[str, float]:
+    """Requests, failure rate, percentile and RPS of a Locust StatsEntry since `baseline` was taken."""
+    window = StatsWindow(1)
+    window.push(difference(snapshot([entry]), baseline))
+    return {
+        "requests": window.requests,
+        "failure_rate": window.failure_ratio,
+        "p95_ms": window.percentile(quantile),
+        "rps": window.requests / max(seconds, 1e-9),
+    }
+
+
+class CapacitySearch:
+    """
+    Exponential-then-binary search for the highest passing load level.
+
+    record() takes the verdict for the current level and returns the next
+    level to probe, or None once passing and failing levels are within
+    `tolerance` (or a bound was hit).
+    """
+
+    def __init__(self, minimum: float, maximum: float, tolerance: float, integer: bool = True):
+        if not 0 < minimum <= maximum:
+            raise ValueError("Need 0 < minimum <= maximum")
+        if tolerance <= 0:
+            # Without a gap to stop at, a non-integer bisection would never finish
+            raise ValueError("tolerance must be positive")
+        self.minimum = minimum
+        self.maximum = maximum
+        self.tolerance = max(tolerance, 1 if integer else 0)
+        self.integer = integer
+        self.level = minimum
+        self.passing: Optional[float] = None
+        self.failing: Optional[float] = None
+        self.probes: List[Dict[str, Any]] = []
+        self.done = False
+
+    def _next(self) -> Optional[float]:
+        if self.failing is None:
+            if self.passing >= self.maximum:
+                return None
+            level = min(self.passing * 2, self.maximum)
+        elif self.passing is None:
+            return None  # even the minimum fails
+        elif self.failing - self.passing <= self.tolerance:
+            return None
+        else:
+            level = (self.passing + self.failing) / 2
+        if self.integer:
+            level = math.floor(level)
+            if level in (self.passing, self.failing):
+                return None
+        return level
+
+    def record(self, passed: bool, measurement: Optional[Dict[str, Any]] = None) -> Optional[float]:
+        self.probes.append({"level": self.level, "passed": passed, **(measurement or {})})
+        if passed:
+            self.passing = self.level
+        else:
+            self.failing = self.level
+        level = self._next()
+        if level is None:
+            self.done = True
+        else:
+            self.level = level
+        return level
+
+
+class CapacitySearchShape(LoadTestShape):
+    """
+    Searches for the highest number of users (or arrival rate, with
+    unit = "rps") that still meets the SLO. Subclasses set the attributes.
+    """
+    abstract = True
+
+    unit = "users"
+    minimum = 1.0
+    maximum = 1000.0
+    tolerance = 1.0
+    step_duration = 60.0
+    warmup = 15.0
+    slo_p95_ms = 1000.0
+    slo_max_failure_rate = 0.01
+    spawn_rate = 10.0
+    users_per_rps = 1.0
+    result_path: Optional[str] = None
+
+    def __init__(self):
+        super().__init__()
+        if self.unit == "rps":
+            _require_open_model("A capacity search with unit = \"rps\"")
+        self.search: Optional[CapacitySearch] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self._level_started = 0.0
+        self._baseline: Optional[Snapshot] = None
+        self._measured_from = 0.0
+        self._users = 0
+
+    def _start_level(self, level: float, now: float) -> None:
+        self._level_started = now
+        self._baseline = None
+        if self.unit == "rps":
+            arrival.set_arrival_rate(self.runner.environment, level)
+            self._users = max(1, math.ceil(level * self.users_per_rps))
+        else:
+            self._users = int(level)
+        logger.info(f"Capacity search: probing {level:g} {self.unit}")
+
+    def tick(self):
+        now = self.get_run_time()
+        if self.search is None:
+            self.search = CapacitySearch(self.minimum, self.maximum, self.tolerance, integer=self.unit == "users")
+            self._start_level(self.search.level, now)
+        if self.search.done:
+            return None
+
+        elapsed = now - self._level_started
+        total = self.runner.stats.total
+        if self._baseline is None and elapsed >= self.warmup:
+            self._baseline = snapshot([total])
+            self._measured_from = now
+        if self._baseline is not None and elapsed >= self.step_duration:
+            measurement = measure_since(self._baseline, total, now - self._measured_from)
+            passed = (
+                measurement["requests"] > 0
+                and measurement["p95_ms"] <= self.slo_p95_ms
+                and measurement["failure_rate"] <= self.slo_max_failure_rate
+            )
+            logger.info(
+                f"Capacity search: {self.search.level:g} {self.unit} {'meets' if passed else 'misses'} the SLO "
+                f"(p95 {measurement['p95_ms']:.0f} ms, failures {measurement['failure_rate']:.2%}, "
+                f"{measurement['rps']:.1f} RPS)"
+            )
+            level = self.search.record(passed, measurement)
+            if level is None:
+                self._finish()
+                return None
+            self._start_level(level, now)
+        return self._users, self.spawn_rate
+
+    def _finish(self) -> None:
+        search = self.search
+        self.result = {
+            "unit": self.unit,
+            "capacity": search.passing,
+            "lowest_failing": search.failing,
+            "slo": {"p95_ms": self.slo_p95_ms, "max_failure_rate": self.slo_max_failure_rate},
+            "probes": search.probes,
+        }
+        logger.info(f"Capacity search finished: {search.passing} {self.unit} (lowest failing: {search.failing})")
+        if self.result_path:
+            with open(self.result_path, "w") as f:
+                json.dump(self.result, f, indent=2)
+            logger.info(f"Capacity search result written to {self.result_path}")
@@ -14,12 +14,12 @@ OPTIMIZATIONS FOR FREE-TIER SERVERS:
 import json
 import time
 import random
-import uuid
-import threading
+import itertools
 import gevent
-import ipaddress
-from typing import Dict, Any, Optional, List, ClassVar
-from locust import HttpUser, task, between, events, LoadTestShape
+from typing import Dict, Any, Optional, List, ClassVar, Mapping
+from locust import FastHttpUser, HttpUser, task, between, events, LoadTestShape
+from locust.clients import HttpSession
+from locust.runners import MasterRunner, WorkerRunner
 from datetime import datetime
 
 # Import configuration
@@ -28,12 +28,61 @@ from app.core.locust_load_test.custom.config import (
     LOCUST_WAIT_TIME_MAX,
     TEST_USER_EMAIL,
     TEST_USER_PASSWORD,
+    TEST_USER_CREDENTIALS,
     TEST_USER_DATA,
     TEST_ITEM_DATA,
     ENDPOINTS,
     TASK_WEIGHTS,
     BASE_URL,  # Import BASE_URL for the target server
+    TOKEN_POOL_SIZE,
+    TOKEN_REFRESH_MARGIN,
+    LOGIN_RATE_PER_SEC,
+    LOGIN_BURST,
+    ENABLE_IP_SPOOFING,
+    IP_POOL_SIZE,
+    IP_POOL_RANGES,
+    IP_ADDRESSES_PER_USER,
+    LOAD_TEST_SEED,
+    ITEM_IDS_PER_USER,
+    LOCUST_CLIENT,
+    SHAPE_FILE,
+    SHAPE_TIME_SCALE,
+    SHAPE_LOAD_SCALE,
+    SHAPE_RESOLUTION,
+    SHAPE_SPAWN_RATE,
+    SHAPE_USERS_PER_RPS,
+    SLO_P95_MS,
+    SLO_MAX_FAILURE_RATE,
+    CAPACITY_SEARCH,
+    SEARCH_UNIT,
+    SEARCH_MIN,
+    SEARCH_MAX,
+    SEARCH_TOLERANCE,
+    SEARCH_STEP_DURATION,
+    SEARCH_WARMUP,
+    SEARCH_RESULT_PATH,
 )
+from app.core.locust_load_test.custom.sharding import ShardPlan
+from app.core.locust_load_test.arrival import (
+    install_arrivals,
+    missed_lags_source,
+    open_model_wait_time,
+    start_lag_source,
+)
+from app.core.locust_load_test.elastic import install_elastic
+from app.core.locust_load_test.histogram import HistogramRecorder
+from app.core.locust_load_test.metrics import install_metrics
+from app.core.locust_load_test.placement import install_placement, placement as worker_placement
+from app.core.locust_load_test.request_log import install_request_log
+from app.core.locust_load_test.request_trace import install_trace_writer
+from app.core.locust_load_test.saturation import install_saturation
+from app.core.locust_load_test.slo import install_slo
+from app.core.locust_load_test.worker_health import install_worker_health
+from app.core.locust_load_test.custom.ip_pool import IPPool, IPSlice
+from app.core.locust_load_test.custom.load_shapes import CapacitySearchShape, ReplayShape
+from app.core.locust_load_test.custom.rate_limiter import TokenBucket
+from app.core.locust_load_test.custom.token_manager import TokenManager
+from app.core.locust_load_test.custom.token_pool import TokenPool
 
 # Import logging
 import logging
@@ -45,6 +94,9 @@ class StepLoadShape(LoadTestShape):
     Step load shape: gentle ramp up for free-tier server testing.
     Optimized for Render free-tier limitations.
     """
+    # Replaced by TrafficReplayShape or CapacitySearchShape when they are enabled
+    abstract = bool(SHAPE_FILE) or CAPACITY_SEARCH
+    
     stages = [
         {"duration": 120, "users": 3, "spawn_rate": 1},   # ramp to 3 users over 2 minutes
         {"duration": 300, "users": 5, "spawn_rate": 1},   # ramp to 5 users over 5 minutes
@@ -60,17 +112,54 @@ class StepLoadShape(LoadTestShape):
         return None  # stop test when all stages complete
 
 
+class TrafficReplayShape(ReplayShape):
+    """
+    Replays a recorded traffic curve from SHAPE_FILE (see load_shapes.py),
+    e.g. a day of production load compressed with SHAPE_TIME_SCALE.
+    """
+    abstract = not SHAPE_FILE or CAPACITY_SEARCH
+    path = SHAPE_FILE
+    time_scale = SHAPE_TIME_SCALE
+    load_scale = SHAPE_LOAD_SCALE
+    resolution = SHAPE_RESOLUTION
+    default_spawn_rate = SHAPE_SPAWN_RATE
+    users_per_rps = SHAPE_USERS_PER_RPS
+
+
+class SLOCapacitySearchShape(CapacitySearchShape):
+    """
+    Finds the most users (or RPS with SEARCH_UNIT=rps) the target can take
+    while meeting SLO_P95_MS and SLO_MAX_FAILURE_RATE (CAPACITY_SEARCH=true).
+    """
+    abstract = not CAPACITY_SEARCH
+    unit = SEARCH_UNIT
+    minimum = SEARCH_MIN
+    maximum = SEARCH_MAX
+    tolerance = SEARCH_TOLERANCE
+    step_duration = SEARCH_STEP_DURATION
+    warmup = SEARCH_WARMUP
+    slo_p95_ms = SLO_P95_MS
+    slo_max_failure_rate = SLO_MAX_FAILURE_RATE
+    spawn_rate = SHAPE_SPAWN_RATE
+    users_per_rps = SHAPE_USERS_PER_RPS
+    result_path = SEARCH_RESULT_PATH
+
+
 class FastAPIUser(HttpUser):
     """
     User class that simulates a user interacting with the FastAPI application.
     Includes authentication and interaction with various endpoints.
     Uses IP spoofing to bypass rate limiting.
     """
+    # Only one of FastAPIUser / FastAPIFastHttpUser runs, picked by LOCUST_CLIENT
+    abstract = LOCUST_CLIENT == "fast"
+    
     # Define the target host for HTTP requests
     host = BASE_URL
     
     # Wait time between tasks - increased for free-tier servers
-    wait_time = between(LOCUST_WAIT_TIME_MIN * 3, LOCUST_WAIT_TIME_MAX * 4)  # 3-12 seconds between tasks
+    # (or paced by ARRIVAL_RATE in open-model mode)
+    wait_time = open_model_wait_time(between(LOCUST_WAIT_TIME_MIN * 3, LOCUST_WAIT_TIME_MAX * 4))  # 3-12 seconds between tasks
     
     # User state variables
     access_token: Optional[str] = None
@@ -87,32 +176,35 @@ class FastAPIUser(HttpUser):
     _login_attempts = 0
     _login_successes = 0
     _login_failures = 0
-    _shared_tokens = []  # Shared token pool
-    _token_usage_count = {}  # Track how many times each token is used
-    _lock = None  # Will be initialized in on_start
+    _token_pool: ClassVar[TokenPool] = TokenPool(max_size=TOKEN_POOL_SIZE)  # Shared token pool
+    _token_manager: ClassVar[TokenManager] = TokenManager(_token_pool, refresh_margin=TOKEN_REFRESH_MARGIN)
+    _login_limiter: ClassVar[TokenBucket] = TokenBucket(LOGIN_RATE_PER_SEC, LOGIN_BURST)  # Global login throttle
     
     # IP spoofing configuration - reduced for lighter load
-    _ip_pool = []  # Pool of IPs to use for spoofing
-    _ip_index = 0  # Current index in the IP pool
-    _ip_lock = None  # Lock for IP pool access
-    _ip_pool_size = 50  # Reduced IP pool size for lighter load
+    _ip_pool: ClassVar[Optional[IPPool]] = None  # Packed pool of IPs to use for spoofing
     _ip_rotation_count = 0  # Track how many times IPs have been rotated
     
     # Per-user IP tracking
     _user_ip = None  # IP for this specific user instance
-    _user_ip_pool = None  # Each user gets their own small pool of IPs
-    _user_ip_index = 0  # Track which IP from user's pool is being used
+    _user_ip_pool: Optional[IPSlice] = None  # Each user gets its own disjoint stride of the pool
+    
+    # Deterministic per-user data assignment (same seed + worker count = same run)
+    _shard_plan: ClassVar[Optional[ShardPlan]] = None
+    _slot = 0  # Cluster-wide user slot
+    _rng: random.Random = random  # Per-user RNG seeded from the slot
+    _credentials = (TEST_USER_EMAIL, TEST_USER_PASSWORD)
+    _item_ids = None  # Cycles through this user's reserved block of item IDs
     
     def on_start(self):
         """
         Execute login at the start of each simulated user session
         Initialize authentication
         """
-        # Initialize locks if not already done
-        if FastAPIUser._lock is None:
-            FastAPIUser._lock = threading.RLock()
-            
-        logger.info("User initialized")
+        self._assign_shard()
+        logger.info(f"User initialized in slot {self._slot}")
+        
+        if ENABLE_IP_SPOOFING:
+            self._assign_random_ip()
             
         # Try to get an existing token from the pool first
         if self._get_token_from_pool():
@@ -122,42 +214,42 @@ class FastAPIUser(HttpUser):
         # Otherwise try to login
         self.login()
     
+    def context(self):
+        """
+        Per-request context passed to request event listeners (e.g. the request log)
+        """
+        return {
+            "token_id": FastAPIUser._token_manager.token_id(self.access_token),
+            "ip": self._user_ip,
+        }
+    
+    def _assign_shard(self):
+        """
+        Claim this user's cluster-wide slot and derive its credentials, item IDs
+        and RNG from it; only the master's placement of this worker is needed
+        """
+        if FastAPIUser._shard_plan is None:
+            plan = ShardPlan.from_placement(worker_placement, LOAD_TEST_SEED)
+            # Another user may have built the plan while this one waited for the placement
+            FastAPIUser._shard_plan = FastAPIUser._shard_plan or plan
+        plan = FastAPIUser._shard_plan
+        self._slot = plan.next_slot()
+        self._rng = plan.rng(self._slot)
+        self._credentials = ShardPlan.pick(self._slot, TEST_USER_CREDENTIALS)
+        self._item_ids = itertools.cycle(range(*ShardPlan.id_range(self._slot, ITEM_IDS_PER_USER)))
+    
     @classmethod
     def _generate_ip_pool(cls):
         """
         Generate a pool of random IP addresses for spoofing
         Uses multiple different network ranges for better distribution
+        Addresses are generated in bulk and stored packed, so large pools are cheap
+        Seeded from the shard plan so every worker builds the identical pool
         """
-        if not cls._ip_pool:
-            # Generate a pool of random IPs from various network ranges
-            network_ranges = [
-                # Private network ranges
-                ("10.0.0.0", "10.255.255.255"),  # 10.0.0.0/8
-                ("172.16.0.0", "172.31.255.255"),  # 172.16.0.0/12
-                ("192.168.0.0", "192.168.255.255"),  # 192.168.0.0/16
-                
-                # Additional ranges for more IP diversity
-                ("100.64.0.0", "100.127.255.255"),  # Carrier-grade NAT
-                ("169.254.0.0", "169.254.255.255"),  # Link-local
-            ]
-            
-            for _ in range(cls._ip_pool_size):
-                # Select a random range
-                start_ip, end_ip = random.choice(network_ranges)
-                
-                # Convert to integers for easier random generation
-                start_int = int(ipaddress.IPv4Address(start_ip))
-                end_int = int(ipaddress.IPv4Address(end_ip))
-                
-                # Generate a random IP in the range
-                ip_int = random.randint(start_int, end_int)
-                ip = str(ipaddress.IPv4Address(ip_int))
-                
-                cls._ip_pool.append(ip)
-                
-            # Shuffle for randomness
-            random.shuffle(cls._ip_pool)
-            logger.info(f"Generated pool of {len(cls._ip_pool)} IP addresses for spoofing")
+        if cls._ip_pool is None:
+            seed = FastAPIUser._shard_plan.seed if FastAPIUser._shard_plan else None
+            FastAPIUser._ip_pool = IPPool(IP_POOL_SIZE, IP_POOL_RANGES, seed=seed)
+            logger.info(f"Generated pool of {len(FastAPIUser._ip_pool)} IP addresses for spoofing")
     
     def _get_next_ip(self):
         """
@@ -166,26 +258,18 @@ class FastAPIUser(HttpUser):
         if not self._user_ip_pool:
             self._create_user_ip_pool()
             
-        # Increment the counter and wrap around if needed
-        self._user_ip_index = (self._user_ip_index + 1) % len(self._user_ip_pool)
-        return self._user_ip_pool[self._user_ip_index]
+        return self._user_ip_pool.next()
     
-    def _create_user_ip_pool(self, pool_size=5):
+    def _create_user_ip_pool(self, pool_size=IP_ADDRESSES_PER_USER):
         """
         Create a unique pool of IPs for this user instance
-        Each user gets their own subset of IPs for better distribution
+        Each user gets the disjoint stride of the main pool that belongs to its slot
         """
         # Make sure the class IP pool exists
-        if not FastAPIUser._ip_pool:
+        if FastAPIUser._ip_pool is None:
             self._generate_ip_pool()
             
-        # Create a small pool of IPs for this user
-        with FastAPIUser._ip_lock:
-            # Take random IPs from the main pool
-            self._user_ip_pool = random.sample(FastAPIUser._ip_pool, min(pool_size, len(FastAPIUser._ip_pool)))
-            
-        # Shuffle the user's IP pool
-        random.shuffle(self._user_ip_pool)
+        self._user_ip_pool = FastAPIUser._ip_pool.slice_for(self._slot, pool_size)
         logger.debug(f"Created user IP pool with {len(self._user_ip_pool)} IPs")
     
     def _assign_random_ip(self):
@@ -197,74 +281,34 @@ class FastAPIUser(HttpUser):
             self._create_user_ip_pool()
             
         # Get a random IP from the user's pool
-        self._user_ip = random.choice(self._user_ip_pool)
+        self._user_ip = self._user_ip_pool.random(self._rng)
         
         # Track rotation for metrics
-        with FastAPIUser._ip_lock:
-            FastAPIUser._ip_rotation_count += 1
+        FastAPIUser._ip_rotation_count += 1
             
         return self._user_ip
     
     def _get_token_from_pool(self):
         """
         Try to get a valid token from the shared token pool
-        Uses weighted random selection to distribute token usage
-        """
-        with FastAPIUser._lock:
-            # If there are tokens in the pool, use one
-            if FastAPIUser._shared_tokens:
-                # Use weighted random selection based on usage count
-                # Less used tokens have higher chance of being selected
-                weights = []
-                for token in FastAPIUser._shared_tokens:
-                    # Default to 1 if token not in usage count
-                    count = FastAPIUser._token_usage_count.get(token, 0)
-                    # Inverse weight - less used tokens get higher weight
-                    weight = 1.0 / (count + 1)
-                    weights.append(weight)
-                
-                # Select a token using weighted random choice
-                token_idx = random.choices(
-                    range(len(FastAPIUser._shared_tokens)), 
-                    weights=weights, 
-                    k=1
-                )[0]
-                
-                self.access_token = FastAPIUser._shared_tokens[token_idx]
-                
-                # Update usage count
-                current_count = FastAPIUser._token_usage_count.get(self.access_token, 0)
-                FastAPIUser._token_usage_count[self.access_token] = current_count + 1
-                
-                return True
+        The pool hands out the least-used unexpired token to distribute token usage
+        """
+        token = FastAPIUser._token_manager.acquire()
+        if token is None:
             return False
+        self.access_token = token
+        return True
     
-    def _add_token_to_pool(self, token, max_pool_size=8):  # Reduced pool size for free-tier
+    def _add_token_to_pool(self, token):
         """
         Add a token to the shared pool for other users
-        Reduced pool size for free-tier server efficiency
-        """
-        with FastAPIUser._lock:
-            # Don't add duplicate tokens
-            if token not in FastAPIUser._shared_tokens:
-                FastAPIUser._shared_tokens.append(token)
-                # Initialize usage count
-                FastAPIUser._token_usage_count[token] = 0
-                
-                # Keep pool size limited
-                if len(FastAPIUser._shared_tokens) > max_pool_size:
-                    # Remove the most used token
-                    most_used_token = max(
-                        FastAPIUser._shared_tokens, 
-                        key=lambda t: FastAPIUser._token_usage_count.get(t, 0)
-                    )
-                    FastAPIUser._shared_tokens.remove(most_used_token)
-                    
-                    # Also remove from usage count
-                    if most_used_token in FastAPIUser._token_usage_count:
-                        del FastAPIUser._token_usage_count[most_used_token]
-                
-                logger.info(f"Added token to pool. Pool size: {len(FastAPIUser._shared_tokens)}")
+        The pool evicts its most-used token once it reaches TOKEN_POOL_SIZE
+        The token manager schedules a refresh with this user's credentials shortly before the token expires
+        """
+        if token in FastAPIUser._token_manager:
+            return
+        FastAPIUser._token_manager.add(token, self._credentials)
+        logger.info(f"Added token to pool. Pool size: {len(FastAPIUser._token_pool)}")
     
     def login(self):
         """
@@ -272,24 +316,22 @@ class FastAPIUser(HttpUser):
         """
         logger.info(f"Login attempt without IP spoofing")
         
-        # Check if we need to throttle logins across all users (increased throttling for free-tier)
-        with FastAPIUser._lock:
-            current_time = time.time()
-            # If less than 2 seconds since last login attempt by any user, wait
-            time_since_last_login = current_time - FastAPIUser._last_login_time
-            if time_since_last_login < 2.0:
-                wait_time = 2.0 - time_since_last_login + random.uniform(0, 1.0)
-                logger.info(f"Free-tier rate limiting, waiting {wait_time:.2f}s before login")
-                time.sleep(wait_time)
-            
-            # Update class-level tracking
-            FastAPIUser._last_login_time = time.time()
-            FastAPIUser._login_attempts += 1
+        # Wait for a slot from the global login throttle (yields to other users while waiting)
+        # The wait shows up as its own THROTTLE entry in the stats, apart from the login request
+        wait_time = FastAPIUser._login_limiter.acquire()
+        if wait_time > 0:
+            logger.info(f"Login throttled, waited {wait_time:.2f}s for a login slot")
+            record_login_wait(self.environment.events.request, wait_time)
         
+        # Update class-level tracking
+        FastAPIUser._last_login_time = time.time()
+        FastAPIUser._login_attempts += 1
+        
+        email, password = self._credentials
         login_data = {
             "grant_type": "password",
-            "username": TEST_USER_EMAIL,
-            "password": TEST_USER_PASSWORD,
+            "username": email,
+            "password": password,
         }
         
         # Use simple headers without IP spoofing to start
@@ -319,8 +361,7 @@ class FastAPIUser(HttpUser):
                         self._add_token_to_pool(self.access_token)
                         
                         # Track login success
-                        with FastAPIUser._lock:
-                            FastAPIUser._login_successes += 1
+                        FastAPIUser._login_successes += 1
                         
                         response.success()
                         success = True
@@ -342,7 +383,7 @@ class FastAPIUser(HttpUser):
                     
                     # If not the last attempt, wait before retrying with increased backoff
                     if attempt < self.MAX_LOGIN_RETRIES:
-                        time.sleep(backoff_time)
+                        gevent.sleep(backoff_time)
                 else:
                     logger.warning(f"Login failed (attempt {attempt}/{self.MAX_LOGIN_RETRIES}): Status {response.status_code}, Response: {response.text}")
                     response.failure(f"Login failed with status code: {response.status_code}")
@@ -350,7 +391,7 @@ class FastAPIUser(HttpUser):
                     # If not the last attempt, wait before retrying with longer delay for free-tier
                     if attempt < self.MAX_LOGIN_RETRIES:
                         logger.info(f"Retrying login in {self.MIN_RETRY_DELAY} seconds...")
-                        time.sleep(self.MIN_RETRY_DELAY)  # Use full delay for free-tier
+                        gevent.sleep(self.MIN_RETRY_DELAY)  # Use full delay for free-tier
         
         # Before giving up, check if a token has appeared in the pool while we were trying
         if not success and self._get_token_from_pool():
@@ -360,17 +401,22 @@ class FastAPIUser(HttpUser):
         if not success:
             logger.error(f"All login attempts failed after {self.MAX_LOGIN_RETRIES} retries")
             # Track login failure
-            with FastAPIUser._lock:
-                FastAPIUser._login_failures += 1
+            FastAPIUser._login_failures += 1
             
         return success
     
-    def get_auth_headers(self) -> Dict[str, str]:
+    def get_auth_headers(self) -> Optional[Mapping[str, str]]:
         """
         Return headers with authorization token.
+        The mapping is built once per token and IP, shared read-only between tasks
+        and rebuilt when the token rotates.
         Tries to get a valid token from the pool first, then tries login if needed.
         Returns None if unable to obtain a valid token.
         """
+        # Drop our token if it expired or the refresher rotated it out of the pool
+        if self.access_token and self.access_token not in FastAPIUser._token_manager:
+            self.access_token = None
+        
         # First check if we already have a token
         if not self.access_token:
             # Try to get one from the pool
@@ -385,27 +431,28 @@ class FastAPIUser(HttpUser):
                         logger.error("Cannot get auth headers: No valid token available")
                         return None
         
-        # Simple headers without IP spoofing
-        headers = {
-            "Authorization": f"Bearer {self.access_token}",
-            "Content-Type": "application/json",
-        }
-        
+        # Spoofing headers are only added once this user has been assigned an IP
+        headers = FastAPIUser._token_manager.headers(self.access_token, self._user_ip)
+        if headers is None:
+            logger.error("Cannot get auth headers: Token is no longer pooled")
         return headers
     
+    def _on_unauthorized(self, response, task_name):
+        """
+        Handle a 401: the token was rejected, so drop it from the pool
+        and record the request as a failure instead of hiding it
+        """
+        logger.warning(f"Token rejected (401) for {task_name}; dropping it from the pool")
+        FastAPIUser._token_manager.invalidate(self.access_token)
+        self.access_token = None
+        response.failure("Token rejected (401)")
+    
     def _get_ip_spoofing_headers(self):
         """
         Get headers with IP spoofing information
-        Uses the current user IP
+        Uses the current user IP; the mapping is cached per IP and read-only
         """
-        return {
-            "X-Forwarded-For": self._user_ip,
-            "X-Real-IP": self._user_ip,
-            # Add additional headers used by common proxies/load balancers
-            "X-Client-IP": self._user_ip,
-            "X-Originating-IP": self._user_ip,
-            "CF-Connecting-IP": self._user_ip,  # Cloudflare
-        }
+        return FastAPIUser._token_manager.header_cache.ip_headers(self._user_ip)
     
     @task(TASK_WEIGHTS["login"])
     def login_task(self):
@@ -414,21 +461,11 @@ class FastAPIUser(HttpUser):
         """
         logger.info("Login task without IP spoofing")
         
-        # Skip if we already have a valid token and token pool has enough tokens
-        with FastAPIUser._lock:
-            if self.access_token and len(FastAPIUser._shared_tokens) >= 3:  # Reduced threshold for free-tier
-                if random.random() < 0.8:  # 80% chance to skip if we already have tokens
-                    logger.info("Skipping login_task: Already have tokens")
-                    return
-                    
-            # More conservative throttling for free-tier
-            if FastAPIUser._login_attempts > 10:  # Lower threshold for free-tier
-                # Reset counter periodically
-                if time.time() - FastAPIUser._last_login_time > 120:  # Longer reset period
-                    FastAPIUser._login_attempts = 0
-                elif random.random() < 0.6:  # 60% chance to skip if high login rate
-                    logger.info("Skipping login task due to high login attempt rate")
-                    return
+        # Once the pool is full the token manager keeps it fresh, so logins
+        # happen roughly once per token lifetime rather than per task weight
+        if self.access_token and len(FastAPIUser._token_manager) >= FastAPIUser._token_pool.max_size:
+            logger.info("Skipping login_task: Token pool is full and kept fresh by the refresher")
+            return
         
         # Try to login
         self.login()
@@ -492,10 +529,7 @@ class FastAPIUser(HttpUser):
                 print("Not authorized to read users (expected for non-superusers)")
                 response.success()
             elif response.status_code == 401:
-                # Auth failure but continue test
-                logger.warning("Authentication failed for read_users but continuing test")
-                print("Authentication failed for read_users but continuing test")
-                response.success()
+                self._on_unauthorized(response, "read_users")
             else:
                 response.failure(f"Failed to read users. Status: {response.status_code}")
     
@@ -526,7 +560,9 @@ class FastAPIUser(HttpUser):
                     logger.warning(f"Could not parse items response: {e}")
                     print(f"Received response but could not parse JSON: {e}")
                     response.success()
-            elif response.status_code in (401, 403):
+            elif response.status_code == 401:
+                self._on_unauthorized(response, "read_items")
+            elif response.status_code == 403:
                 # Auth issues but continue test
                 logger.warning(f"Auth issue ({response.status_code}) for read_items but continuing test")
                 print(f"Auth issue ({response.status_code}) for read_items but continuing test")
@@ -546,7 +582,7 @@ class FastAPIUser(HttpUser):
         
         # Create unique item data for testing
         item_data = {
-            "title": f"Load Test Item {uuid.uuid4().hex[:8]}",
+            "title": f"Load Test Item {next(self._item_ids)}",
             "description": f"Created during load testing at {datetime.now().isoformat()}"
         }
         
@@ -571,7 +607,9 @@ class FastAPIUser(HttpUser):
                     logger.warning(f"Could not parse create item response: {e}")
                     print(f"Item may have been created but could not parse response: {e}")
                     response.success()
-            elif response.status_code in (401, 403):
+            elif response.status_code == 401:
+                self._on_unauthorized(response, "create_item")
+            elif response.status_code == 403:
                 # Auth issues but continue test
                 logger.warning(f"Auth issue ({response.status_code}) for create_item but continuing test")
                 print(f"Auth issue ({response.status_code}) for create_item but continuing test")
@@ -593,9 +631,9 @@ class FastAPIUser(HttpUser):
             logger.info("Skipping update_item task: No items to update")
             return  # no items to update
             
-        item = random.choice(self.items)
+        item = self._rng.choice(self.items)
         update_data = {
-            "title": f"Updated Load Test {uuid.uuid4().hex[:8]}",
+            "title": f"Updated Load Test {self._rng.getrandbits(32):08x}",
             "description": f"Updated during load testing at {datetime.now().isoformat()}"
         }
         with self.client.put(
@@ -607,6 +645,8 @@ class FastAPIUser(HttpUser):
         ) as response:
             if response.status_code == 200 or response.status_code == 404 or response.status_code == 403:
                 response.success()
+            elif response.status_code == 401:
+                self._on_unauthorized(response, "update_item")
             else:
                 response.failure(f"Failed to update item ({response.status_code})")
     
@@ -633,12 +673,23 @@ class FastAPIUser(HttpUser):
         ) as response:
             if response.status_code == 200 or response.status_code == 404 or response.status_code == 403:
                 response.success()
+            elif response.status_code == 401:
+                self._on_unauthorized(response, "delete_item")
             else:
                 response.failure(f"Failed to delete item ({response.status_code})")
     
     # More tasks can be added here as needed
 
 
+class FastAPIFastHttpUser(FastHttpUser, FastAPIUser):
+    """
+    FastAPIUser on geventhttpclient instead of requests (LOCUST_CLIENT=fast).
+    Same tasks, weights, token pool and response validation; class-level state
+    is shared with FastAPIUser since it is always accessed through that class.
+    """
+    abstract = LOCUST_CLIENT != "fast"
+
+
 # Event hooks
 @events.test_start.add_listener
 def on_test_start(environment, **kwargs):
@@ -647,6 +698,70 @@ def on_test_start(environment, **kwargs):
     """
     logger.info("Starting FastAPI load test optimized for free-tier servers")
     logger.info("Configuration: Max 10 users, 3-12s wait times, gentle ramp-up")
+    
+    # Slots follow this run's worker placement, which the master sends before any user starts
+    FastAPIUser._shard_plan = None
+    
+    # Refresh pooled tokens before they expire from one background greenlet per worker
+    if not isinstance(environment.runner, MasterRunner):
+        session = HttpSession(
+            base_url=environment.host or BASE_URL,
+            request_event=environment.events.request,
+            user=None,
+        )
+        FastAPIUser._token_manager.start(lambda credentials: refresh_access_token(session, credentials))
+
+
+def record_login_wait(request_event, wait_time):
+    """
+    Report a login throttle wait as its own "THROTTLE login wait" entry in the Locust stats
+    It never counts as a failure; login_throttle_* counters in auth_counters() add up the same waits
+    """
+    request_event.fire(
+        request_type="THROTTLE",
+        name="login wait",
+        response_time=wait_time * 1000,
+        response_length=0,
+        exception=None,
+        context={},
+    )
+
+
+def refresh_access_token(client, credentials=None) -> Optional[str]:
+    """
+    Log in once on behalf of the token manager and return the new access token
+    Uses the (email, password) the expiring token was issued for, so sharded users keep their own account
+    Shares the global login throttle with the simulated users
+    """
+    wait_time = FastAPIUser._login_limiter.acquire()
+    if wait_time > 0:
+        record_login_wait(client.request_event, wait_time)
+    FastAPIUser._login_attempts += 1
+    
+    email, password = credentials or (TEST_USER_EMAIL, TEST_USER_PASSWORD)
+    login_data = {
+        "grant_type": "password",
+        "username": email,
+        "password": password,
+    }
+    with client.post(
+        ENDPOINTS["login"],
+        data=login_data,
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+        catch_response=True,
+        name="Token Refresh"
+    ) as response:
+        if response.status_code != 200:
+            response.failure(f"Token refresh failed with status code: {response.status_code}")
+            return None
+        try:
+            token = response.json()["access_token"]
+        except Exception as e:
+            response.failure(f"Failed to parse token refresh response: {e}")
+            return None
+        response.success()
+        FastAPIUser._login_successes += 1
+        return token
 
 
 @events.test_stop.add_listener
@@ -655,34 +770,56 @@ def on_test_stop(environment, **kwargs):
     Execute when the load test finishes
     """
     logger.info("FastAPI load test completed")
+    FastAPIUser._token_manager.stop()
     
-    # Print statistics summary
-    logger.info("Test Statistics:")
-    stats = environment.stats.total
-    logger.info(f"  Requests: {stats.num_requests}")
-    logger.info(f"  Failures: {stats.num_failures}")
-    if stats.num_requests > 0:
-        logger.info(f"  Failure Rate: {(stats.num_failures / stats.num_requests) * 100:.2f}%")
-    logger.info(f"  Median Response Time: {stats.median_response_time} ms")
-    logger.info(f"  95th Percentile: {stats.get_response_time_percentile(0.95)} ms")
-    logger.info(f"  99th Percentile: {stats.get_response_time_percentile(0.99)} ms")
+    # Print statistics summary; a worker resets its stats and histograms after every report,
+    # so only the master (or a local runner) has the totals
+    if not isinstance(environment.runner, WorkerRunner):
+        logger.info("Test Statistics:")
+        stats = environment.stats.total
+        logger.info(f"  Requests: {stats.num_requests}")
+        logger.info(f"  Failures: {stats.num_failures}")
+        if stats.num_requests > 0:
+            logger.info(f"  Failure Rate: {(stats.num_failures / stats.num_requests) * 100:.2f}%")
+        if latency_histograms.histograms:
+            # Unrounded percentiles from the merged HDR histograms
+            aggregated = latency_histograms.aggregated()
+            quantiles = ((0.5, "Median Response Time"), (0.95, "95th Percentile"), (0.99, "99th Percentile"), (0.999, "99.9th Percentile"))
+            percentiles = aggregated.percentiles(q for q, _ in quantiles)
+            # Coordinated-omission corrected values side by side with the raw ones
+            corrected = latency_histograms.aggregated(corrected=True) if latency_histograms.corrected else None
+            corrected_percentiles = corrected.percentiles(q for q, _ in quantiles) if corrected else {}
+            line = f"  Average Response Time: {aggregated.mean / 1000:.2f} ms"
+            logger.info(line + (f" (corrected: {corrected.mean / 1000:.2f} ms)" if corrected else ""))
+            for q, label in quantiles:
+                line = f"  {label}: {percentiles[q] / 1000:.2f} ms"
+                logger.info(line + (f" (corrected: {corrected_percentiles[q] / 1000:.2f} ms)" if corrected else ""))
+        else:
+            logger.info(f"  Median Response Time: {stats.median_response_time} ms")
+            logger.info(f"  95th Percentile: {stats.get_response_time_percentile(0.95)} ms")
+            logger.info(f"  99th Percentile: {stats.get_response_time_percentile(0.99)} ms")
     
     # Token and IP statistics
     logger.info("IP and Authentication Statistics:")
-    logger.info(f"  Token Pool Size: {len(FastAPIUser._shared_tokens)}")
+    logger.info(f"  Token Pool Size: {len(FastAPIUser._token_pool)}")
     logger.info(f"  Total Login Attempts: {FastAPIUser._login_attempts}")
     logger.info(f"  Total Login Successes: {FastAPIUser._login_successes}")
     logger.info(f"  Total Login Failures: {FastAPIUser._login_failures}")
+    logger.info(f"  Token Refreshes: {FastAPIUser._token_manager.refresh_count} ({FastAPIUser._token_manager.refresh_failures} failed)")
     logger.info(f"  IP Rotation Count: {FastAPIUser._ip_rotation_count}")
     
     # Token usage distribution
-    if FastAPIUser._token_usage_count:
-        min_usage = min(FastAPIUser._token_usage_count.values())
-        max_usage = max(FastAPIUser._token_usage_count.values())
-        avg_usage = sum(FastAPIUser._token_usage_count.values()) / len(FastAPIUser._token_usage_count)
+    usage_stats = FastAPIUser._token_pool.usage_stats()
+    if usage_stats:
+        min_usage, max_usage, avg_usage = usage_stats
         logger.info(f"  Token Usage - Min: {min_usage}, Max: {max_usage}, Avg: {avg_usage:.2f}")
 
 
+# Per-endpoint HDR histograms; on the master they hold the merged worker data.
+# Corrected histograms are kept in the open model or with CO_EXPECTED_INTERVAL_MS.
+latency_histograms = HistogramRecorder(start_lag=start_lag_source(), missed_lags=missed_lags_source())
+
+
 # Periodic report on token pool status
 @events.init.add_listener
 def on_locust_init(environment, **kwargs):
@@ -690,18 +827,44 @@ def on_locust_init(environment, **kwargs):
     Initialize any background tasks before the test starts
     Reduced reporting frequency for free-tier optimization
     """
+    # Opt-in per-request JSONL log (REQUEST_LOG_PATH) and binary trace (REQUEST_TRACE_PATH)
+    install_request_log(environment)
+    install_trace_writer(environment)
+    latency_histograms.install(environment)
+    install_placement(environment)
+    install_arrivals(environment)
+    install_slo(environment)
+    install_metrics(environment, counters=auth_counters)
+    install_saturation(environment, start_lag=start_lag_source())
+    install_elastic(environment)
+    install_worker_health(environment)
+    
     # Report token pool status every 60 seconds (reduced from 30)
     if environment.runner:
         gevent.spawn(report_token_pool_stats, environment)
         
+def auth_counters():
+    """Token pool and login counters of this process, exported per worker by install_metrics"""
+    return {
+        "token_pool_size": len(FastAPIUser._token_pool),
+        "login_attempts_total": FastAPIUser._login_attempts,
+        "login_successes_total": FastAPIUser._login_successes,
+        "login_failures_total": FastAPIUser._login_failures,
+        "login_throttle_waits_total": FastAPIUser._login_limiter.waits,
+        "login_throttle_wait_seconds_total": FastAPIUser._login_limiter.wait_seconds,
+        "token_refreshes_total": FastAPIUser._token_manager.refresh_count,
+        "ip_rotations_total": FastAPIUser._ip_rotation_count,
+    }
+
+
 def report_token_pool_stats(environment):
     """
     Periodically report on token pool status
     Less frequent reporting for free-tier servers
     """
     while True:
-        if hasattr(FastAPIUser, '_shared_tokens'):
-            token_count = len(FastAPIUser._shared_tokens)
+        if hasattr(FastAPIUser, '_token_pool'):
+            token_count = len(FastAPIUser._token_pool)
             ip_rotations = getattr(FastAPIUser, '_ip_rotation_count', 0)
             login_attempts = getattr(FastAPIUser, '_login_attempts', 0)
             logger.info(f"Token pool status: {token_count} tokens available, {ip_rotations} IP rotations, {login_attempts} login attempts")
@@ -0,0 +1,208 @@
+"""
+Read Locust `--csv` output files for offline report generation.
+
+`load_csv_results(prefix)` turns `<prefix>_stats.csv`, `<prefix>_failures.csv`
+and `<prefix>_exceptions.csv` into the same structure generate_report.py gets
+from a running master's /stats/requests, /stats/failures and /exceptions, so
+the report can be rebuilt after the master has exited.
+
+`read_history()` streams `<prefix>_stats_history.csv` one row at a time into
+a fixed number of time buckets, merging neighbouring buckets whenever the
+limit is reached. Memory stays bounded however long the test ran.
+"""
+
+import csv
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+STATS_COLUMNS = {
+    "Type": "method",
+    "Name": "name",
+    "Request Count": "num_requests",
+    "Failure Count": "num_failures",
+    "Median Response Time": "median_response_time",
+    "Average Response Time": "avg_response_time",
+    "Min Response Time": "min_response_time",
+    "Max Response Time": "max_response_time",
+    "Average Content Size": "avg_content_length",
+    "Requests/s": "current_rps",
+    "Failures/s": "current_fail_per_sec",
+    "90%": "ninetieth_response_time",
+    "99%": "ninety_ninth_response_time",
+}
+
+
+def _number(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:  # "N/A" before the first request completes
+        return 0.0
+
+
+def _rows(path: Path) -> Iterator[Dict[str, str]]:
+    if not path.exists():
+        return
+    with open(path, newline="") as f:
+        yield from csv.DictReader(f)
+
+
+def read_stats(path: Path) -> List[Dict[str, Any]]:
+    """Rows of a `_stats.csv` file, keyed like the /stats/requests JSON entries."""
+    stats = []
+    for row in _rows(path):
+        entry: Dict[str, Any] = {}
+        for column, key in STATS_COLUMNS.items():
+            if column in row:
+                entry[key] = row[column] if key in ("method", "name") else _number(row[column])
+        entry["num_requests"] = int(entry.get("num_requests", 0))
+        entry["num_failures"] = int(entry.get("num_failures", 0))
+        # Keep every percentile column, e.g. "95%" -> response_time_percentile_0.95
+        for column, value in row.items():
+            if column and column.endswith("%"):
+                entry[f"response_time_percentile_{float(column[:-1]) / 100:g}"] = _number(value)
+        stats.append(entry)
+    return stats
+
+
+def read_failures(path: Path) -> List[Dict[str, Any]]:
+    return [
+        {
+            "method": row.get("Method", ""),
+            "name": row.get("Name", ""),
+            "error": row.get("Error", ""),
+            "occurrences": int(_number(row.get("Occurrences", "0"))),
+        }
+        for row in _rows(path)
+    ]
+
+
+def read_exceptions(path: Path) -> List[Dict[str, Any]]:
+    exceptions = []
+    for row in _rows(path):
+        exc_type, _, exc_message = row.get("Message", "").partition(":")
+        exceptions.append({
+            "count": int(_number(row.get("Count", "0"))),
+            "exc_type": exc_type,
+            "exc_message": exc_message.strip(),
+            "traceback": row.get("Traceback", ""),
+            "nodes": row.get("Nodes", ""),
+        })
+    return exceptions
+
+
+def load_csv_results(prefix: str) -> Dict[str, Any]:
+    """
+    Build the report input from the files written by `locust --csv=<prefix>`.
+    Missing files yield empty sections, like an unreachable endpoint does live.
+    """
+    base = Path(prefix)
+    stats_path = base.with_name(f"{base.name}_stats.csv")
+    if not stats_path.exists():
+        raise FileNotFoundError(f"No Locust stats file at {stats_path}")
+
+    stats = read_stats(stats_path)
+    aggregated = next((s for s in stats if s.get("name") == "Aggregated"), {})
+    return {
+        "stats": {
+            "stats": stats,
+            "total_rps": aggregated.get("current_rps", 0.0),
+            "total_fail_per_sec": aggregated.get("current_fail_per_sec", 0.0),
+        },
+        "errors": {"failures": read_failures(base.with_name(f"{base.name}_failures.csv"))},
+        "exceptions": {"exceptions": read_exceptions(base.with_name(f"{base.name}_exceptions.csv"))},
+        "workers": {"workers": []},
+        "source": str(stats_path),
+    }
+
+
+class HistoryBuckets:
+    """
+    Downsamples a time series into at most `max_points` buckets of equal width.
+
+    Buckets start one second wide; when a new bucket would exceed the limit,
+    the width doubles and neighbouring buckets are merged. Each bucket keeps
+    sums for averages and the maximum of `p95` and `user_count`.
+    """
+
+    def __init__(self, max_points: int = 500):
+        if max_points < 2:
+            raise ValueError("max_points must be at least 2")
+        self.max_points = max_points
+        self.width = 1
+        self.start: Optional[int] = None
+        self.rows = 0
+        self._buckets: Dict[int, List[float]] = {}
+
+    def add(self, timestamp: int, user_count: float, rps: float, fail_per_sec: float, p50: float, p95: float) -> None:
+        if self.start is None:
+            self.start = timestamp
+        self.rows += 1
+        key = (timestamp - self.start) // self.width
+        while key not in self._buckets and len(self._buckets) >= self.max_points:
+            self._widen()
+            key = (timestamp - self.start) // self.width
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            self._buckets[key] = [1, user_count, rps, fail_per_sec, p50, p95]
+        else:
+            self._merge(bucket, [1, user_count, rps, fail_per_sec, p50, p95])
+
+    @staticmethod
+    def _merge(bucket: List[float], other: List[float]) -> None:
+        bucket[0] += other[0]
+        bucket[1] = max(bucket[1], other[1])
+        bucket[2] += other[2]
+        bucket[3] += other[3]
+        bucket[4] += other[4]
+        bucket[5] = max(bucket[5], other[5])
+
+    def _widen(self) -> None:
+        self.width *= 2
+        merged: Dict[int, List[float]] = {}
+        for key, bucket in self._buckets.items():
+            target = merged.get(key // 2)
+            if target is None:
+                merged[key // 2] = bucket
+            else:
+                self._merge(target, bucket)
+        self._buckets = merged
+
+    def points(self) -> List[Dict[str, float]]:
+        """One dict per bucket, in time order; rates and p50 are averaged, p95 and users are maxima."""
+        points = []
+        for key in sorted(self._buckets):
+            count, users, rps, fails, p50, p95 = self._buckets[key]
+            points.append({
+                "timestamp": self.start + key * self.width,
+                "user_count": users,
+                "rps": rps / count,
+                "fail_per_sec": fails / count,
+                "p50": p50 / count,
+                "p95": p95,
+            })
+        return points
+
+
+def read_history(path: str, name: str = "Aggregated", max_points: int = 500) -> HistoryBuckets:
+    """Stream the rows for `name` from a `_stats_history.csv` file into HistoryBuckets."""
+    buckets = HistoryBuckets(max_points)
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return buckets
+        column = {title: index for index, title in enumerate(header)}
+        ts, users, row_name = column["Timestamp"], column["User Count"], column["Name"]
+        rps, fails, p50, p95 = column["Requests/s"], column["Failures/s"], column["50%"], column["95%"]
+        for row in reader:
+            if row[row_name] != name:
+                continue
+            buckets.add(
+                int(row[ts]),
+                _number(row[users]),
+                _number(row[rps]),
+                _number(row[fails]),
+                _number(row[p50]),
+                _number(row[p95]),
+            )
+    return buckets
@@ -0,0 +1,56 @@
+"""
+Cooperative token-bucket rate limiter for login traffic.
+
+Each caller reserves the next free slot and then sleeps with gevent until
+that slot comes up. Reserving never yields to the hub, so it is atomic with
+respect to other simulated users and no lock is held while anyone waits.
+How often callers had to wait, and for how long in total, is kept on the
+bucket for counters (see install_metrics), not reported as requests.
+"""
+
+import time
+from typing import Callable
+
+import gevent
+
+
+class TokenBucket:
+    """
+    Token bucket allowing `rate` acquisitions per second with bursts of up to `burst`.
+
+    The bucket is allowed to go into debt: a caller that finds it empty takes
+    a token anyway and is told how long to wait for it, so waiters are served
+    in reservation order without queueing on a lock. A rate of 0 disables
+    limiting.
+    """
+
+    def __init__(self, rate: float, burst: int = 1, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._clock = clock
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self.waits = 0  # Acquisitions that had to wait
+        self.wait_seconds = 0.0  # Total time spent waiting
+
+    def reserve(self) -> float:
+        """Take a token and return how many seconds the caller must wait before using it."""
+        if self.rate <= 0:
+            return 0.0
+
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return 0.0
+        return -self._tokens / self.rate
+
+    def acquire(self) -> float:
+        """Reserve a token and cooperatively sleep until it is usable. Returns the wait in seconds."""
+        wait_time = self.reserve()
+        if wait_time > 0:
+            self.waits += 1
+            self.wait_seconds += wait_time
+            gevent.sleep(wait_time)
+        return wait_time
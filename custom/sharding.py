@@ -0,0 +1,79 @@
+"""
+Deterministic, coordination-free partitioning of test data across workers.
+
+Every simulated user in the cluster gets a global slot number derived from
+its worker's shard and the order it was spawned in on that worker. IPs,
+credentials and item IDs are then picked from the slot, and per-user random
+choices come from an RNG seeded with (seed, slot). With a fixed seed and the
+same worker count, each run replays the same load distribution, and no two
+users share a slice. The only message involved is the placement the master
+hands every worker before its users start (placement.py).
+"""
+
+import hashlib
+import itertools
+import logging
+import random
+from typing import Any, Optional, Sequence, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+PLACEMENT_TIMEOUT = 30.0  # Seconds a worker's first user waits for the master's placement
+
+T = TypeVar("T")
+
+
+class ShardPlan:
+    """
+    Maps (worker index, local user index) to a cluster-wide user slot.
+
+    Slots are interleaved: worker w of n hands out w, w + n, w + 2n, ...
+    so slots stay dense (and small) however many users each worker runs.
+    """
+
+    def __init__(self, seed: int, worker_index: int = 0, worker_count: int = 1):
+        if worker_count < 1:
+            raise ValueError("worker_count must be at least 1")
+        if not 0 <= worker_index < worker_count:
+            raise ValueError(f"worker_index {worker_index} is outside the {worker_count} workers; slots would overlap")
+        self.seed = seed
+        self.worker_index = worker_index
+        self.worker_count = worker_count
+        self._local_users = itertools.count()
+
+    @classmethod
+    def from_placement(cls, placement: Any, seed: Optional[int], timeout: float = PLACEMENT_TIMEOUT) -> "ShardPlan":
+        """
+        Build the plan for this process from the shard and shard count the
+        master placed it at. Waits up to `timeout` seconds for the placement,
+        since a worker that joins a running test may start users first, and
+        raises RuntimeError when it doesn't come rather than guess a count.
+        Without a seed a random one is drawn, so slices are disjoint but not replayable.
+        """
+        if not placement.wait(timeout):
+            raise RuntimeError(
+                "No worker placement from the master; call install_placement from the init listener"
+            )
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(32)
+            logger.info(f"No load test seed configured; using random seed {seed}")
+        return cls(seed, placement.shard, placement.shards)
+
+    def next_slot(self) -> int:
+        """Slot for the next user spawned on this worker. Never yields, so no lock is needed."""
+        return self.worker_index + next(self._local_users) * self.worker_count
+
+    def rng(self, slot: int) -> random.Random:
+        """Per-user RNG, identical for the same (seed, slot) on every run."""
+        digest = hashlib.blake2b(f"{self.seed}:{slot}".encode(), digest_size=8).digest()
+        return random.Random(int.from_bytes(digest, "big"))
+
+    @staticmethod
+    def pick(slot: int, choices: Sequence[T]) -> T:
+        """Round-robin pick; distinct for every slot while there are enough choices."""
+        return choices[slot % len(choices)]
+
+    @staticmethod
+    def id_range(slot: int, per_user: int) -> Tuple[int, int]:
+        """Half-open [start, end) block of IDs reserved for a slot."""
+        return slot * per_user, (slot + 1) * per_user
@@ -0,0 +1,187 @@
+"""
+Expiry-aware lifecycle for the shared auth tokens.
+
+TokenManager wraps the TokenPool with knowledge of each token's `exp` claim.
+A single background greenlet re-logs in shortly before a token expires, with
+the credentials that token was issued for, and swaps the fresh token in, so
+login traffic is roughly one request per token lifetime. Task methods get
+prebuilt, shared headers without any network call.
+"""
+
+import base64
+import hashlib
+import heapq
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+import gevent
+from gevent.event import Event
+
+from app.core.locust_load_test.custom.auth_headers import HeaderCache
+from app.core.locust_load_test.custom.token_pool import TokenPool
+
+logger = logging.getLogger(__name__)
+
+
+def decode_jwt_exp(token: str) -> Optional[float]:
+    """
+    Read the `exp` claim (unix seconds) from a JWT without verifying its signature.
+    Returns None for opaque tokens or tokens without an expiry.
+    """
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+        return float(claims["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+class TokenManager:
+    """
+    Keeps the token pool stocked with unexpired tokens.
+
+    Tokens are refreshed `refresh_margin` seconds before they expire by calling
+    the login function given to `start()` with the credentials the token was
+    added with. Expired or rejected tokens are dropped from the pool. Like
+    TokenPool, nothing here yields to the hub except the refresher greenlet
+    itself, so no locking is needed.
+    """
+
+    RETRY_DELAY = 5.0  # seconds between refresh attempts after a failed login
+
+    def __init__(
+        self, pool: TokenPool, refresh_margin: float = 60.0, clock: Callable[[], float] = time.time
+    ):
+        self.pool = pool
+        self.refresh_margin = refresh_margin
+        self._clock = clock
+        # Every pooled token, None if it never expires
+        self._expiry: Dict[str, Optional[float]] = {}
+        self._ids: Dict[str, str] = {}
+        # What each pooled token was issued for, passed back to login
+        self._credentials: Dict[str, Any] = {}
+        self.header_cache = HeaderCache()
+        self._refresh_queue: List[Tuple[float, str]] = []  # min-heap of (refresh_at, token)
+        self._wakeup = Event()
+        self._refresher: Optional[gevent.Greenlet] = None
+        self.refresh_count = 0
+        self.refresh_failures = 0
+
+    def __len__(self) -> int:
+        return len(self.pool)
+
+    def __contains__(self, token: str) -> bool:
+        return token in self._expiry
+
+    def add(self, token: str, credentials: Any = None) -> None:
+        """Add a freshly issued token and schedule its refresh with the same `credentials`."""
+        if token in self._expiry:
+            return
+
+        expires_at = decode_jwt_exp(token)
+        evicted = self.pool.add(token)
+        if evicted is not None:
+            self._forget(evicted)
+        self._expiry[token] = expires_at
+        self._credentials[token] = credentials
+
+        if expires_at is not None:
+            heapq.heappush(self._refresh_queue, (expires_at - self.refresh_margin, token))
+            self._wakeup.set()
+
+    def invalidate(self, token: Optional[str]) -> None:
+        """Drop a token the server rejected (or that expired) from the pool."""
+        if token and token in self._expiry:
+            self.pool.remove(token)
+            self._forget(token)
+
+    def acquire(self) -> Optional[str]:
+        """Hand out the least-used token that has not expired yet."""
+        while True:
+            token = self.pool.acquire()
+            if token is None or not self.is_expired(token):
+                return token
+            logger.info("Dropping expired token from pool")
+            self.invalidate(token)
+
+    def is_expired(self, token: str) -> bool:
+        expires_at = self._expiry.get(token)
+        return expires_at is not None and expires_at <= self._clock()
+
+    def token_id(self, token: Optional[str]) -> Optional[str]:
+        """Short, stable identifier for a token that is safe to log."""
+        if not token:
+            return None
+        token_id = self._ids.get(token)
+        if token_id is None:
+            token_id = hashlib.blake2b(token.encode(), digest_size=6).hexdigest()
+            if token in self._expiry:
+                self._ids[token] = token_id
+        return token_id
+
+    def headers(self, token: str, ip: Optional[str] = None) -> Optional[Mapping[str, str]]:
+        """
+        Prebuilt, read-only request headers for a pooled token (and spoofed IP),
+        or None if the token is no longer pooled.
+        """
+        if token not in self._expiry:
+            return None
+        return self.header_cache.get(token, ip)
+
+    def start(self, login: Callable[[Any], Optional[str]]) -> None:
+        """Start the background refresher; `login(credentials)` must return a new token or None."""
+        if self._refresher is None or self._refresher.dead:
+            self._refresher = gevent.spawn(self._refresh_loop, login)
+
+    def stop(self) -> None:
+        if self._refresher is not None:
+            self._refresher.kill(block=False)
+            self._refresher = None
+
+    def _forget(self, token: str) -> None:
+        # Stale heap entries are skipped lazily by the refresher
+        self._expiry.pop(token, None)
+        self._ids.pop(token, None)
+        self._credentials.pop(token, None)
+        self.header_cache.invalidate_token(token)
+
+    def _refresh_loop(self, login: Callable[[Any], Optional[str]]) -> None:
+        while True:
+            # Skip entries for tokens that were evicted or invalidated meanwhile
+            while self._refresh_queue and self._refresh_queue[0][1] not in self._expiry:
+                heapq.heappop(self._refresh_queue)
+
+            if not self._refresh_queue:
+                timeout = None
+            else:
+                timeout = self._refresh_queue[0][0] - self._clock()
+
+            if timeout is None or timeout > 0:
+                self._wakeup.clear()
+                self._wakeup.wait(timeout)
+                continue
+
+            _, token = heapq.heappop(self._refresh_queue)
+            credentials = self._credentials.get(token)
+            new_token = None
+            try:
+                new_token = login(credentials)
+            except Exception as e:
+                logger.warning(f"Token refresh raised: {e}")
+
+            if new_token and new_token != token:
+                self.refresh_count += 1
+                self.invalidate(token)
+                self.add(new_token, credentials)
+                logger.info(f"Refreshed token, next expiry at {self._expiry.get(new_token)}")
+            elif self.is_expired(token):
+                self.refresh_failures += 1
+                logger.warning("Token refresh failed and token has expired; dropping it")
+                self.invalidate(token)
+            else:
+                self.refresh_failures += 1
+                logger.warning(f"Token refresh failed, retrying in {self.RETRY_DELAY:.0f}s")
+                heapq.heappush(self._refresh_queue, (self._clock() + self.RETRY_DELAY, token))
@@ -0,0 +1,128 @@
+"""
+Shared auth token pool for the FastAPI load test users.
+
+Tokens are grouped into buckets keyed by how often they have been handed
+out, so the least-used token is always at the front of the lowest bucket
+and the most-used token at the front of the highest one. Acquire and evict
+are O(1) (amortized), instead of re-weighting the whole pool on each call.
+
+No lock is needed: none of the methods yield to the gevent hub, so each
+call runs to completion before another simulated user on the worker can
+touch the pool.
+"""
+
+from typing import Dict, Iterator, Optional, Tuple
+
+
+class TokenPool:
+    """
+    Least-used-first pool of bearer tokens with a bounded size.
+
+    New tokens join at the current lowest usage level so a freshly added
+    token is not handed out to every user in a row while the older tokens
+    catch up. When the pool is full, the most-used token is evicted.
+    """
+
+    def __init__(self, max_size: int = 8):
+        self.max_size = max_size
+        self._level: Dict[str, int] = {}  # scheduling level per token
+        self._uses: Dict[str, int] = {}  # real number of hand-outs per token
+        self._buckets: Dict[int, Dict[str, None]] = {}  # level -> ordered set of tokens
+        self._min = 0
+        self._max = 0
+
+    def __len__(self) -> int:
+        return len(self._level)
+
+    def __contains__(self, token: str) -> bool:
+        return token in self._level
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._level))
+
+    def add(self, token: str) -> Optional[str]:
+        """
+        Add a token to the pool.
+        Returns the token that was evicted to make room, if any.
+        """
+        if token in self._level:
+            return None
+
+        evicted = None
+        if self.max_size and len(self._level) >= self.max_size:
+            evicted = self.evict()
+
+        level = self._min if self._level else 0
+        if not self._level:
+            self._min = self._max = level
+        self._level[token] = level
+        self._uses[token] = 0
+        self._buckets.setdefault(level, {})[token] = None
+        return evicted
+
+    def acquire(self) -> Optional[str]:
+        """
+        Hand out the least-used token and bump its usage.
+        Returns None when the pool is empty.
+        """
+        if not self._level:
+            return None
+
+        level = self._min
+        bucket = self._buckets[level]
+        token = next(iter(bucket))
+        del bucket[token]
+
+        next_level = level + 1
+        self._buckets.setdefault(next_level, {})[token] = None
+        self._level[token] = next_level
+        self._uses[token] += 1
+
+        if not bucket:
+            # The token we just moved guarantees the next level is populated
+            del self._buckets[level]
+            self._min = next_level
+        if next_level > self._max:
+            self._max = next_level
+        return token
+
+    def evict(self) -> Optional[str]:
+        """Remove and return the most-used token (oldest first on ties)."""
+        if not self._level:
+            return None
+        token = next(iter(self._buckets[self._max]))
+        self.remove(token)
+        return token
+
+    def remove(self, token: str) -> bool:
+        """Remove a specific token, e.g. once it has expired or been rejected."""
+        level = self._level.pop(token, None)
+        if level is None:
+            return False
+        del self._uses[token]
+
+        bucket = self._buckets[level]
+        del bucket[token]
+        if not bucket:
+            del self._buckets[level]
+            if not self._level:
+                self._min = self._max = 0
+            else:
+                # Only removals can leave gaps between levels, so these scans
+                # are bounded by the gap they just created
+                while self._min not in self._buckets:
+                    self._min += 1
+                while self._max not in self._buckets:
+                    self._max -= 1
+        return True
+
+    def usage(self) -> Dict[str, int]:
+        """Snapshot of how many times each token has been handed out."""
+        return dict(self._uses)
+
+    def usage_stats(self) -> Optional[Tuple[int, int, float]]:
+        """(min, max, avg) hand-outs per token, or None when the pool is empty."""
+        if not self._uses:
+            return None
+        values = self._uses.values()
+        return min(values), max(values), sum(values) / len(self._uses)
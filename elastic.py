@@ -0,0 +1,212 @@
+"""
+Elastic local workers, scaled by the master from its own telemetry.
+
+With ELASTIC_WORKERS=min:max the master starts and stops worker processes
+on its own machine instead of relying on a fixed --expect-workers or
+`docker compose --scale`. Every ELASTIC_INTERVAL seconds it looks at what
+it already knows about its workers: the CPU usage each one reports in its
+heartbeat and the number of users the current run (or load shape) asks
+for. ScalingPolicy turns that into a worker count:
+
+- more workers when the average worker CPU is at or above ELASTIC_CPU_HIGH,
+  enough to bring it back under that mark,
+- at least target users / ELASTIC_USERS_PER_WORKER workers, so a load
+  shape ramping up gets capacity before the workers saturate,
+- one worker less when the average CPU is at or below ELASTIC_CPU_LOW and
+  the remaining workers would stay under ELASTIC_CPU_HIGH.
+
+New workers connect like any other, and a stopped worker reports that it
+stopped; in both cases the master redistributes the running users, so the
+test keeps going. Workers get the master's target --host, and the master
+places every worker again as the pool changes (placement.py), so the
+arrival rate is split across the current workers. Shards for test data
+are reserved for the maximum up front. Only workers the master started itself are ever
+stopped. After every change the controller waits ELASTIC_COOLDOWN seconds
+so the new distribution shows up in the CPU figures before it decides
+again.
+"""
+
+import logging
+import math
+import os
+import signal
+import time
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+import gevent
+
+logger = logging.getLogger(__name__)
+
+ELASTIC_WORKERS = os.getenv("ELASTIC_WORKERS", "")  # "min:max" local workers; empty disables scaling
+ELASTIC_CPU_HIGH = float(os.getenv("ELASTIC_CPU_HIGH", "75"))  # Average worker CPU that triggers a scale-up
+ELASTIC_CPU_LOW = float(os.getenv("ELASTIC_CPU_LOW", "30"))  # Average worker CPU that allows a scale-down
+ELASTIC_USERS_PER_WORKER = int(os.getenv("ELASTIC_USERS_PER_WORKER", "0"))  # Users one worker can carry; 0 ignores user counts
+ELASTIC_INTERVAL = float(os.getenv("ELASTIC_INTERVAL", "10"))  # Seconds between scaling decisions
+ELASTIC_COOLDOWN = float(os.getenv("ELASTIC_COOLDOWN", "30"))  # Seconds to wait after a change before the next one
+
+
+def parse_range(text: str) -> Tuple[int, int]:
+    """Parse "2:8" into (2, 8); a single number fixes the count."""
+    low, _, high = text.partition(":")
+    minimum, maximum = int(low), int(high or low)
+    if not 0 <= minimum <= maximum or maximum < 1:
+        raise ValueError(f"Invalid worker range {text!r}")
+    return minimum, maximum
+
+
+class ScalingPolicy:
+    """Worker count from per-worker CPU usage and the number of users asked for."""
+
+    def __init__(
+        self,
+        min_workers: int,
+        max_workers: int,
+        cpu_high: float = ELASTIC_CPU_HIGH,
+        cpu_low: float = ELASTIC_CPU_LOW,
+        users_per_worker: int = ELASTIC_USERS_PER_WORKER,
+    ):
+        if cpu_low >= cpu_high:
+            raise ValueError("cpu_low must be below cpu_high")
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.cpu_high = cpu_high
+        self.cpu_low = cpu_low
+        self.users_per_worker = users_per_worker
+
+    def desired(self, cpu: Sequence[float], target_users: int) -> int:
+        current = len(cpu)
+        average = sum(cpu) / current if current else 0.0
+        desired = current
+        if current and average >= self.cpu_high:
+            desired = max(current + 1, math.ceil(current * average / self.cpu_high))
+        elif current > 1 and average <= self.cpu_low and average * current / (current - 1) < self.cpu_high:
+            desired = current - 1
+        if self.users_per_worker:
+            desired = max(desired, math.ceil(target_users / self.users_per_worker))
+        return min(max(desired, self.min_workers), self.max_workers)
+
+
+class ElasticScaler:
+    """Runs in the master: applies ScalingPolicy by starting and stopping local worker processes."""
+
+    def __init__(
+        self,
+        environment: Any,
+        policy: ScalingPolicy,
+        interval: float = ELASTIC_INTERVAL,
+        cooldown: float = ELASTIC_COOLDOWN,
+        spawn: Optional[Callable[[], Any]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.environment = environment
+        self.policy = policy
+        self.interval = interval
+        self.cooldown = cooldown
+        self.spawn = spawn or self._spawn_local_worker
+        self.clock = clock
+        self.managed: List[Any] = []  # Started by us, newest last
+        self.retiring: List[Any] = []
+        self.changed_at: Optional[float] = None
+
+    def _spawn_local_worker(self) -> Any:
+        import subprocess
+
+        from app.core.locust_load_test.launcher import worker_command
+
+        options = self.environment.parsed_options
+        return subprocess.Popen(
+            worker_command(options.locustfile, options.master_bind_port, self.worker_args()), start_new_session=True
+        )
+
+    def worker_args(self) -> List[str]:
+        """Options a local worker needs from the master; the master places it when it connects."""
+        host = self.environment.host or getattr(self.environment.parsed_options, "host", None)
+        return ["--host", host] if host else []
+
+    def _reap(self) -> None:
+        self.managed = [process for process in self.managed if process.poll() is None]
+        self.retiring = [process for process in self.retiring if process.poll() is None]
+
+    def _workers(self) -> List[Any]:
+        from locust.runners import STATE_MISSING
+
+        return [client for client in self.environment.runner.clients.values() if client.state != STATE_MISSING]
+
+    def step(self) -> int:
+        """One scaling decision; returns the change in worker count."""
+        from locust.runners import STATE_INIT, STATE_RUNNING, STATE_SPAWNING
+
+        self._reap()
+        runner = self.environment.runner
+        now = self.clock()
+        # Also covers the time new workers need to connect, so they are not started twice
+        if self.changed_at is not None and now - self.changed_at < self.cooldown:
+            return 0
+        workers = self._workers()
+        current = len(workers)
+        if runner.state in (STATE_RUNNING, STATE_SPAWNING):
+            desired = self.policy.desired([client.cpu_usage for client in workers], runner.target_user_count)
+        elif runner.state == STATE_INIT:
+            # Start the minimum before the first run, so a headless master finds its workers
+            desired = min(max(current, self.policy.min_workers), self.policy.max_workers)
+        else:
+            # Stopping, or stopped and possibly about to quit
+            return 0
+
+        change = 0
+        if desired > current:
+            for _ in range(desired - current):
+                self.managed.append(self.spawn())
+            change = desired - current
+            logger.info(f"Elastic workers: {current} -> {desired} (started {change})")
+        elif desired < current and self.managed and runner.state == STATE_RUNNING:
+            # One at a time; the master moves its users to the others
+            process = self.managed.pop()
+            process.send_signal(signal.SIGTERM)
+            self.retiring.append(process)
+            change = -1
+            logger.info(f"Elastic workers: {current} -> {current - 1} (stopping pid {process.pid})")
+        if change:
+            self.changed_at = now
+        return change
+
+    def run(self) -> None:
+        while True:
+            try:
+                self.step()
+            except Exception:
+                logger.exception("Elastic scaling step failed")
+            gevent.sleep(self.interval)
+
+    def shutdown(self, **kwargs: Any) -> None:
+        """Terminate workers we started that are still running after the master told them to quit."""
+        for process in self.managed + self.retiring:
+            try:
+                process.wait(timeout=5)
+            except Exception:
+                process.terminate()
+        self.managed = []
+        self.retiring = []
+
+
+def install_elastic(environment: Any, workers: str = ELASTIC_WORKERS) -> Optional[ElasticScaler]:
+    """Scale local workers from the master when ELASTIC_WORKERS is set. Call from an `init` listener."""
+    from locust.runners import MasterRunner
+
+    if not workers or not isinstance(environment.runner, MasterRunner):
+        return None
+    from app.core.locust_load_test.placement import slots
+
+    minimum, maximum = parse_range(workers)
+    slots.reserve(maximum)
+    scaler = ElasticScaler(environment, ScalingPolicy(minimum, maximum))
+    greenlet = gevent.spawn(scaler.run)
+
+    def on_quitting(**kwargs: Any) -> None:
+        # Before runner.quit(), so workers leaving are not replaced
+        greenlet.kill(block=False)
+
+    environment.events.quitting.add_listener(on_quitting)
+    environment.events.quit.add_listener(scaler.shutdown)
+    logger.info(f"Elastic workers: {minimum} to {maximum} local workers")
+    return scaler
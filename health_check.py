@@ -1,72 +1,158 @@
 """
 Locust Health Check Module
 Provides health monitoring for distributed Locust test environments
+
+Each check cycle fetches the master's /stats/requests once, over a pooled
+keep-alive session, and every sub-check reads that snapshot; it is cached
+for LOCUST_HEALTH_CACHE_TTL seconds, so calling several checks in a row
+costs one request. check_masters() polls many masters concurrently from
+asyncio, e.g. for a dashboard watching a fleet of load-test clusters.
+
+HealthWatcher keeps polling a set of masters over their open connections
+and emits only what changed between two snapshots: the master going down
+or coming back, its run state, workers joining, leaving, going missing or
+changing state, and the request count not moving while the test runs.
+
+On masters that run worker_health.py, a cycle also reads /workers: how
+long ago each worker last sent a heartbeat and stats, so a worker whose
+reports arrive late is reported even though it is still connected.
 """
 
+import asyncio
 import logging
 import os
-from datetime import datetime, timedelta
-from typing  Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Sequence
+from urllib.parse import urlparse
 
 import requests
+from requests.adapters import HTTPAdapter
 
 logger = logging.getLogger(__name__)
 
+HEALTH_CACHE_TTL = float(os.getenv("LOCUST_HEALTH_CACHE_TTL", "1.0"))  # Seconds a /stats/requests snapshot is reused
+HEALTH_POOL_SIZE = int(os.getenv("LOCUST_HEALTH_POOL_SIZE", "4"))  # Keep-alive connections per master
+WATCH_INTERVAL = float(os.getenv("LOCUST_WATCH_INTERVAL", "5.0"))  # Seconds between polls in watch mode
+WATCH_STALL_AFTER = float(os.getenv("LOCUST_WATCH_STALL_AFTER", "30.0"))  # Seconds without new requests while running
+# Per-worker figures from /workers (worker_health.py) included in check_worker_health
+WORKER_TIMING_FIELDS = (
+    "heartbeat_age_s",
+    "heartbeat_interval_s",
+    "stats_age_s",
+    "report_interval_s",
+    "max_report_interval_s",
+    "report_lag_ms",
+    "queued_entries",
+    "late_reports",
+)
+
 
 class LocustHealthChecker:
-    def __init__(self):
-        self.master_host = os.getenv("LOCUST_MASTER_HOST", "localhost")
-        self.master_port = int(os.getenv("LOCUST_MASTER_PORT", "8089"))
-        self.master_url = f"http://{self.master_host}:{self.master_port}"
-        self.timeout = float(os.getenv("LOCUST_HEALTH_TIMEOUT", "5.0"))
-        self.expected_workers = int(os.getenv("EXPECTED_WORKERS", "1"))
-        self.last_check = datetime.min
-
-    def _make_request(self, endpoint: str) -> dict | None:
-        """Helper method for API requests"""
+    def __init__(
+        self,
+        master_url: str | None = None,
+        timeout: float | None = None,
+        expected_workers: int | None = None,
+        cache_ttl: float = HEALTH_CACHE_TTL,
+        session: requests.Session | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if master_url:
+            parsed = urlparse(master_url)
+            self.master_host = parsed.hostname or "localhost"
+            self.master_port = parsed.port or 8089
+            self.master_url = master_url.rstrip("/")
+        else:
+            self.master_host = os.getenv("LOCUST_MASTER_HOST", "localhost")
+            self.master_port = int(os.getenv("LOCUST_MASTER_PORT", "8089"))
+            self.master_url = f"http://{self.master_host}:{self.master_port}"
+        self.timeout = timeout if timeout is not None else float(os.getenv("LOCUST_HEALTH_TIMEOUT", "5.0"))
+        self.expected_workers = (
+            expected_workers if expected_workers is not None else int(os.getenv("EXPECTED_WORKERS", "1"))
+        )
+        self.cache_ttl = cache_ttl
+        self.session = session or _pooled_session()
+        self.clock = clock
+        self._snapshot: dict[str, Any] | None = None
+        self._timing_supported: bool | None = None
+        self._lock = threading.Lock()
+
+    def _make_request(self, endpoint: str, optional: bool = False) -> tuple[dict | None, float, str | None]:
+        """GET an endpoint; returns (json or None, seconds taken, error). `optional` endpoints may be missing (404)"""
+        started = time.perf_counter()
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.master_url}{endpoint}",
                 timeout=self.timeout,
                 headers={"Accept": "application/json"},
             )
+            if optional and response.status_code == 404:
+                return None, time.perf_counter() - started, "not found"
             response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
-            logger.warning(f"Health check request failed: {str(e)}")
-            return None
+            return response.json(), time.perf_counter() - started, None
+        except (requests.RequestException, ValueError) as e:
+            logger.warning(f"Health check request to {self.master_url} failed: {str(e)}")
+            return None, time.perf_counter() - started, str(e)
 
-    def check_master_health(self) -> dict[str, bool]:
-        """Check if master node is responsive"""
-        now = datetime.now()
-        if now - self.last_check < timedelta(seconds=1):
-            return {"healthy": True, "cached": True}
-
-        stats = self._make_request("/stats/requests")
-        healthy = stats is not None
-        self.last_check = now
+    def snapshot(self) -> dict[str, Any]:
+        """/stats/requests for this check cycle; fetched at most once per cache_ttl"""
+        with self._lock:
+            now = self.clock()
+            if self._snapshot is not None and now - self._snapshot["fetched_at"] < self.cache_ttl:
+                return {**self._snapshot, "cached": True}
+            stats, elapsed, error = self._make_request("/stats/requests")
+            timing = None
+            if stats is not None and self._timing_supported is not False:
+                timing, _, timing_error = self._make_request("/workers", optional=True)
+                # Masters without worker_health.py don't serve it; stop asking
+                self._timing_supported = timing_error != "not found"
+            self._snapshot = {
+                "stats": stats,
+                "timing": timing,
+                "response_time": elapsed,
+                "error": error,
+                "fetched_at": now,
+            }
+            return {**self._snapshot, "cached": False}
 
+    def check_master_health(self) -> dict[str, Any]:
+        """Check if master node is responsive"""
+        snapshot = self.snapshot()
+        details = {
+            "endpoint": f"{self.master_url}/stats/requests",
+            "response_time": snapshot["response_time"],
+        }
+        if snapshot["error"]:
+            details["error"] = snapshot["error"]
         return {
-            "healthy": healthy,
-            "cached": False,
-            "details": {
-                "endpoint": f"{self.master_url}/stats/requests",
-                "response_time": (now - self.last_check).total_seconds(),
-            },
+            "healthy": snapshot["stats"] is not None,
+            "cached": snapshot["cached"],
+            "details": details,
         }
 
-    def check_worker_health(self) -> dict[str, int]:
-        """Check worker connectivity"""
-        stats = self._make_request("/stats/requests")
+    def check_worker_health(self) -> dict[str, Any]:
+        """Check worker connectivity, and report timing where the master tracks it"""
+        snapshot = self.snapshot()
+        stats = snapshot["stats"]
         if not stats:
             return {"connected": 0, "expected": self.expected_workers}
 
         workers = stats.get("workers", [])
-        return {
+        health = {
             "connected": len(workers),
             "expected": self.expected_workers,
             "worker_ids": [w["id"] for w in workers],
         }
+        timing = snapshot.get("timing")
+        if timing:
+            health["late"] = timing.get("late", [])
+            health["timing"] = {
+                w["id"]: {key: w.get(key) for key in WORKER_TIMING_FIELDS} for w in timing.get("workers", [])
+            }
+        return health
 
     def full_health_check(self) -> dict[str, dict]:
         """Comprehensive health status report"""
@@ -74,25 +160,228 @@ class LocustHealthChecker:
             "master": self.check_master_health(),
             "workers": self.check_worker_health(),
             "environment": {
+                "url": self.master_url,
                 "host": self.master_host,
                 "port": self.master_port,
                 "timeout": self.timeout,
             },
         }
 
+    def close(self) -> None:
+        self.session.close()
+
+
+def _pooled_session(pool_size: int = HEALTH_POOL_SIZE) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+async def check_masters(checkers: Sequence[LocustHealthChecker]) -> list[dict[str, dict]]:
+    """
+    Full health check of many masters at once, in the order given. Keep the
+    checkers between polls so their connections stay open. The blocking
+    requests run on one thread per master, so the slowest master (at most
+    its timeout) bounds the whole poll.
+    """
+    if not checkers:
+        return []
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=len(checkers), thread_name_prefix="health-check") as executor:
+        return list(
+            await asyncio.gather(*(loop.run_in_executor(executor, checker.full_health_check) for checker in checkers))
+        )
+
+
+class ClusterState:
+    """What the watcher last saw of one master"""
+
+    def __init__(self):
+        self.reachable: bool | None = None
+        self.state: str | None = None
+        self.workers: dict[str, str] = {}
+        self.requests = 0
+        self.progress_at = 0.0
+        self.stalled = False
+        self.late: set[str] = set()
+
+
+def total_requests(stats: dict) -> int:
+    for entry in stats.get("stats", []):
+        if entry.get("name") == "Aggregated":
+            return entry.get("num_requests", 0)
+    return sum(entry.get("num_requests", 0) for entry in stats.get("stats", []))
+
+
+def diff_snapshot(
+    previous: ClusterState,
+    stats: dict | None,
+    now: float,
+    stall_after: float = WATCH_STALL_AFTER,
+    error: str | None = None,
+    timing: dict | None = None,
+) -> list[dict[str, Any]]:
+    """Events between the last state and a new /stats/requests snapshot (None if unreachable); updates `previous`"""
+    events: list[dict[str, Any]] = []
+    if stats is None:
+        if previous.reachable is not False:
+            events.append({"event": "master_down", "error": error})
+        previous.reachable = False
+        return events
+    state = stats.get("state")
+    if not previous.reachable:
+        events.append({"event": "master_up", "state": state, "workers": len(stats.get("workers", []))})
+    elif state != previous.state:
+        events.append({"event": "master_state", "from": previous.state, "to": state})
+    was_running = previous.reachable and previous.state == "running"
+    previous.reachable = True
+    previous.state = state
+
+    workers = {worker["id"]: worker.get("state") for worker in stats.get("workers", [])}
+    for worker, worker_state in workers.items():
+        if worker not in previous.workers:
+            events.append({"event": "worker_joined", "worker": worker, "state": worker_state})
+        elif worker_state != previous.workers[worker]:
+            kind = "worker_missing" if worker_state == "missing" else "worker_state"
+            events.append({"event": kind, "worker": worker, "from": previous.workers[worker], "to": worker_state})
+    for worker in previous.workers.keys() - workers.keys():
+        events.append({"event": "worker_left", "worker": worker})
+    previous.workers = workers
+
+    if timing is not None:
+        late = {w["id"]: w for w in timing.get("workers", []) if w.get("late")}
+        for worker in late.keys() - previous.late:
+            ages = {key: late[worker].get(key) for key in ("stats_age_s", "heartbeat_age_s")}
+            events.append({"event": "worker_late", "worker": worker, **ages})
+        for worker in (previous.late - late.keys()) & workers.keys():
+            events.append({"event": "worker_on_time", "worker": worker})
+        previous.late = set(late)
+
+    # Only a test that was already running can stall; the clock starts when it does
+    requests_seen = total_requests(stats)
+    if requests_seen != previous.requests or not was_running or state != "running":
+        if previous.stalled and requests_seen != previous.requests:
+            events.append({"event": "master_resumed", "requests": requests_seen})
+        previous.requests = requests_seen
+        previous.progress_at = now
+        previous.stalled = False
+    elif not previous.stalled and now - previous.progress_at >= stall_after:
+        seconds = round(now - previous.progress_at, 1)
+        events.append({"event": "master_stalled", "requests": requests_seen, "seconds": seconds})
+        previous.stalled = True
+    return events
+
+
+class HealthWatcher:
+    """
+    Polls many masters on a fixed interval and emits only transitions. Each
+    checker keeps its keep-alive connection between polls, and all masters
+    are fetched concurrently on a small thread pool, so watching a fleet
+    costs one request per master per interval.
+    """
+
+    def __init__(
+        self,
+        checkers: Sequence[LocustHealthChecker],
+        interval: float = WATCH_INTERVAL,
+        stall_after: float = WATCH_STALL_AFTER,
+        emit: Callable[[dict[str, Any]], None] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.checkers = list(checkers)
+        self.interval = interval
+        self.stall_after = stall_after
+        self.emit = emit or print_event
+        self.clock = clock
+        self.states = {checker.master_url: ClusterState() for checker in self.checkers}
+        self.executor = ThreadPoolExecutor(max_workers=max(1, len(self.checkers)), thread_name_prefix="health-watch")
+
+    async def poll(self) -> list[dict[str, Any]]:
+        """Fetch every master once and emit the events since the previous poll"""
+        loop = asyncio.get_running_loop()
+        snapshots = await asyncio.gather(
+            *(loop.run_in_executor(self.executor, checker.snapshot) for checker in self.checkers)
+        )
+        now = self.clock()
+        events = []
+        for checker, snapshot in zip(self.checkers, snapshots):
+            state = self.states[checker.master_url]
+            changes = diff_snapshot(
+                state, snapshot["stats"], now, self.stall_after, snapshot["error"], snapshot["timing"]
+            )
+            for event in changes:
+                event = {"cluster": checker.master_url, **event}
+                events.append(event)
+                self.emit(event)
+        return events
+
+    async def run(self) -> None:
+        try:
+            while True:
+                started = self.clock()
+                await self.poll()
+                await asyncio.sleep(max(0.0, self.interval - (self.clock() - started)))
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False)
+        for checker in self.checkers:
+            checker.close()
+
+
+def print_event(event: dict[str, Any]) -> None:
+    """One compact JSON line per event"""
+    import json
+
+    stamped = {"time": datetime.now(timezone.utc).isoformat(timespec="seconds"), **event}
+    print(json.dumps(stamped, separators=(",", ":")), flush=True)
+
+
+def watch(urls: Sequence[str], interval: float = WATCH_INTERVAL, stall_after: float = WATCH_STALL_AFTER) -> None:
+    """Watch masters until interrupted, printing transitions as JSON lines"""
+    # master_down events carry the error, so don't also log every failed poll
+    logger.setLevel(logging.ERROR)
+    # Every poll must hit the master, so no caching between them
+    checkers = [LocustHealthChecker(url, cache_ttl=0) for url in urls]
+    try:
+        asyncio.run(HealthWatcher(checkers, interval, stall_after).run())
+    except KeyboardInterrupt:
+        pass
+
 
 def health_check() -> bool:
     """Standard health check endpoint for containers"""
     checker = LocustHealthChecker()
-    return (
-        checker.check_master_health()["healthy"]
-        and checker.check_worker_health()["connected"] >= 1
-    )
+    try:
+        report = checker.full_health_check()
+    finally:
+        checker.close()
+    return report["master"]["healthy"] and report["workers"]["connected"] >= 1
 
 
 # CLI support
 if __name__ == "__main__":
+    import argparse
     import json
 
-    checker = LocustHealthChecker()
-    print(json.dumps(checker.full_health_check(), indent=2))
+    parser = argparse.ArgumentParser(description="Check health of Locust masters and their workers")
+    parser.add_argument("urls", nargs="*", help="Master URLs to check concurrently (default: LOCUST_MASTER_HOST/PORT)")
+    parser.add_argument("--watch", action="store_true", help="Keep polling and print only changes, as JSON lines")
+    parser.add_argument("--interval", type=float, default=WATCH_INTERVAL, help="Seconds between polls with --watch")
+    parser.add_argument(
+        "--stall-after", type=float, default=WATCH_STALL_AFTER, help="Seconds without new requests before a running master counts as stalled"
+    )
+    args = parser.parse_args()
+    urls = args.urls
+    if args.watch:
+        watch(urls or [LocustHealthChecker().master_url], args.interval, args.stall_after)
+    elif urls:
+        checkers = [LocustHealthChecker(url) for url in urls]
+        reports = asyncio.run(check_masters(checkers))
+        print(json.dumps(dict(zip(urls, reports)), indent=2))
+    else:
+        checker = LocustHealthChecker()
+        print(json.dumps(checker.full_health_check(), indent=2))
@@ -0,0 +1,306 @@
+"""
+Mergeable log-linear latency histograms (HdrHistogram-style) for Locust.
+
+Locust rounds response times into coarse buckets before computing
+percentiles, which makes p99.9 and beyond unreliable. LatencyHistogram
+records microseconds with a fixed relative error set by `significant_digits`
+(3 digits: within 0.1%), keeping only non-empty buckets, so memory depends
+on the spread of latencies rather than the number of requests.
+
+HistogramRecorder keeps one histogram per endpoint. Workers ship the
+histograms recorded since their last report in the `report_to_master`
+message and start over; the master merges them, so cluster-wide
+percentiles are exact to the configured precision. Current values are
+served at /stats/hdr on the web UI.
+
+Optionally a second, coordinated-omission corrected histogram is kept per
+endpoint. Closed-loop users wait for each response before sending the next
+request, so a stall is recorded once instead of once per request that real
+clients would have sent meanwhile. Corrected samples are measured from the
+intended send time (adding how late the task started, in the open model)
+and, with CO_EXPECTED_INTERVAL_MS, back-filled the way HdrHistogram's
+recordValueWithExpectedInterval does. In the open model, arrivals dropped
+because no user was free are back-filled too, at the lag they had when
+they were dropped, with the next request of the user that skipped them.
+"""
+
+import logging
+import math
+import os
+from typing import Any, Callable, Iterable, Optional
+
+from app.core.locust_load_test.stats_window import percentile_from_counts
+
+logger = logging.getLogger(__name__)
+
+HDR_SIGNIFICANT_DIGITS = int(os.getenv("HDR_SIGNIFICANT_DIGITS", "3"))
+CO_EXPECTED_INTERVAL_MS = float(os.getenv("CO_EXPECTED_INTERVAL_MS", "0"))  # Intended gap between a user's requests; 0 disables back-filling
+REPORT_KEY = "hdr_histograms"
+CORRECTED_REPORT_KEY = "hdr_corrected_histograms"
+DEFAULT_QUANTILES = (0.5, 0.9, 0.95, 0.99, 0.999, 0.9999)
+
+
+class LatencyHistogram:
+    """
+    Sparse log-linear histogram of integer microsecond values.
+
+    Values below `sub_bucket_count` get their own bucket. Above that, every
+    power of two is split into `sub_bucket_count / 2` linear buckets, so a
+    bucket is never wider than 1 / (sub_bucket_count / 2) of its values.
+    """
+
+    def __init__(self, significant_digits: int = HDR_SIGNIFICANT_DIGITS):
+        if not 1 <= significant_digits <= 5:
+            raise ValueError("significant_digits must be between 1 and 5")
+        self.significant_digits = significant_digits
+        magnitude = math.ceil(math.log2(2 * 10 ** significant_digits))
+        self._sub_bucket_bits = magnitude
+        self._sub_bucket_count = 1 << magnitude
+        self._half_count = self._sub_bucket_count >> 1
+        self.counts: dict[int, int] = {}
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    def _index(self, value: int) -> int:
+        if value < self._sub_bucket_count:
+            return value
+        shift = value.bit_length() - self._sub_bucket_bits
+        return self._sub_bucket_count + (shift - 1) * self._half_count + (value >> shift) - self._half_count
+
+    def _highest_equivalent(self, index: int) -> int:
+        """Largest value that lands in bucket `index`."""
+        if index < self._sub_bucket_count:
+            return index
+        shift, offset = divmod(index - self._sub_bucket_count, self._half_count)
+        shift += 1
+        return ((offset + self._half_count) << shift) + (1 << shift) - 1
+
+    def record(self, value_us: int, count: int = 1) -> None:
+        value_us = max(int(value_us), 0)
+        index = self._index(value_us)
+        self.counts[index] = self.counts.get(index, 0) + count
+        if not self.count or value_us < self.min:
+            self.min = value_us
+        if value_us > self.max:
+            self.max = value_us
+        self.count += count
+        self.total += value_us * count
+
+    def record_ms(self, value_ms: float) -> None:
+        """Record a Locust response time (milliseconds, float)."""
+        self.record(round(value_ms * 1000))
+
+    def record_corrected_ms(self, value_ms: float, expected_interval_ms: float) -> None:
+        """
+        Record a response time plus the samples that requests due every
+        `expected_interval_ms` would have seen while this one was stalled.
+        """
+        self.record_ms(value_ms)
+        if expected_interval_ms <= 0:
+            return
+        missing = value_ms - expected_interval_ms
+        while missing >= expected_interval_ms:
+            self.record_ms(missing)
+            missing -= expected_interval_ms
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        if other.significant_digits != self.significant_digits:
+            raise ValueError("Cannot merge histograms with different precision")
+        if not other.count:
+            return
+        counts = self.counts
+        for index, count in other.counts.items():
+            counts[index] = counts.get(index, 0) + count
+        self.min = other.min if not self.count else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.count += other.count
+        self.total += other.total
+
+    def percentile(self, quantile: float) -> int:
+        """Value in microseconds at `quantile` (0..1), as HdrHistogram reports it."""
+        if not self.count:
+            return 0
+        return min(percentile_from_counts(self.counts.items(), self.count, quantile, self._highest_equivalent), self.max)
+
+    def percentiles(self, quantiles: Iterable[float] = DEFAULT_QUANTILES) -> dict[float, int]:
+        """Several quantiles in one pass over the sorted buckets."""
+        quantiles = sorted(quantiles)
+        result = {}
+        if not self.count:
+            return {q: 0 for q in quantiles}
+        items = sorted(self.counts.items())
+        position = 0
+        seen = 0
+        for q in quantiles:
+            rank = max(1, math.ceil(q * self.count))
+            while seen < rank:
+                seen += items[position][1]
+                position += 1
+            result[q] = min(self._highest_equivalent(items[position - 1][0]), self.max)
+        return result
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        """Compact, msgpack-friendly state: bucket indexes and counts as one flat list."""
+        flat = []
+        for index, count in self.counts.items():
+            flat.append(index)
+            flat.append(count)
+        return {
+            "digits": self.significant_digits,
+            "count": self.count,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+            "counts": flat,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "LatencyHistogram":
+        histogram = cls(data["digits"])
+        flat = data["counts"]
+        histogram.counts = dict(zip(flat[::2], flat[1::2]))
+        histogram.count = data["count"]
+        histogram.total = data["total"]
+        histogram.min = data["min"]
+        histogram.max = data["max"]
+        return histogram
+
+
+class HistogramRecorder:
+    """
+    Per-endpoint histograms, fed by the request event and merged across workers.
+
+    Corrected histograms are recorded when `expected_interval_ms` is set or a
+    `start_lag` callable is given; it returns how many milliseconds late the
+    calling user's current task started. `missed_lags` returns (and forgets)
+    how late the arrivals the calling user skipped were, in milliseconds.
+    """
+
+    def __init__(
+        self,
+        significant_digits: int = HDR_SIGNIFICANT_DIGITS,
+        expected_interval_ms: float = CO_EXPECTED_INTERVAL_MS,
+        start_lag: Optional[Callable[[], float]] = None,
+        missed_lags: Optional[Callable[[], list[float]]] = None,
+    ):
+        self.significant_digits = significant_digits
+        self.expected_interval_ms = expected_interval_ms
+        self.start_lag = start_lag
+        self.missed_lags = missed_lags
+        self.correcting = expected_interval_ms > 0 or start_lag is not None
+        self.histograms: dict[tuple[str, str], LatencyHistogram] = {}
+        self.corrected: dict[tuple[str, str], LatencyHistogram] = {}
+
+    def _histogram(self, histograms: dict[tuple[str, str], LatencyHistogram], key: tuple[str, str]) -> LatencyHistogram:
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = LatencyHistogram(self.significant_digits)
+        return histogram
+
+    def on_request(self, request_type: str, name: str, response_time: float, **kwargs: Any) -> None:
+        key = (request_type, name)
+        self._histogram(self.histograms, key).record_ms(response_time)
+        if self.correcting:
+            intended = response_time + (self.start_lag() if self.start_lag else 0.0)
+            corrected = self._histogram(self.corrected, key)
+            corrected.record_corrected_ms(intended, self.expected_interval_ms)
+            for lag_ms in self.missed_lags() if self.missed_lags else ():
+                corrected.record_ms(lag_ms)
+
+    def reset(self, **kwargs: Any) -> None:
+        self.histograms = {}
+        self.corrected = {}
+
+    def aggregated(self, corrected: bool = False) -> LatencyHistogram:
+        total = LatencyHistogram(self.significant_digits)
+        for histogram in (self.corrected if corrected else self.histograms).values():
+            total.merge(histogram)
+        return total
+
+    def on_report_to_master(self, client_id: str, data: dict[str, Any]) -> None:
+        """Worker side: send what was recorded since the last report, then start over."""
+        data[REPORT_KEY] = [[method, name, h.to_dict()] for (method, name), h in self.histograms.items()]
+        if self.corrected:
+            data[CORRECTED_REPORT_KEY] = [[method, name, h.to_dict()] for (method, name), h in self.corrected.items()]
+        self.histograms = {}
+        self.corrected = {}
+
+    def on_worker_report(self, client_id: str, data: dict[str, Any]) -> None:
+        """Master side: fold a worker's histograms into the cluster totals."""
+        for histograms, report_key in ((self.histograms, REPORT_KEY), (self.corrected, CORRECTED_REPORT_KEY)):
+            for method, name, state in data.get(report_key, ()):
+                incoming = LatencyHistogram.from_dict(state)
+                histogram = histograms.get((method, name))
+                if histogram is None:
+                    histograms[(method, name)] = incoming
+                else:
+                    histogram.merge(incoming)
+
+    def summary(self, quantiles: Iterable[float] = DEFAULT_QUANTILES) -> list[dict[str, Any]]:
+        """
+        One entry per endpoint plus "Aggregated", times in milliseconds.
+        Entries carry a "corrected" entry of the same shape when corrected samples exist.
+        """
+        def describe(histogram: LatencyHistogram) -> dict[str, Any]:
+            return {
+                "num_requests": histogram.count,
+                "avg_response_time": histogram.mean / 1000,
+                "min_response_time": histogram.min / 1000,
+                "max_response_time": histogram.max / 1000,
+                "percentiles": {str(q): value / 1000 for q, value in histogram.percentiles(quantiles).items()},
+            }
+
+        entries = [
+            (key, histogram, self.corrected.get(key))
+            for key, histogram in sorted(self.histograms.items(), key=lambda item: (item[0][1], item[0][0]))
+        ]
+        entries.append((("", "Aggregated"), self.aggregated(), self.aggregated(corrected=True)))
+        summary = []
+        for (method, name), histogram, corrected in entries:
+            entry = {"method": method, "name": name, **describe(histogram)}
+            if corrected is not None and corrected.count:
+                entry["corrected"] = describe(corrected)
+            summary.append(entry)
+        return summary
+
+    def install(self, environment: Any) -> None:
+        """Hook into `environment`'s events and web UI. Call from an `init` listener."""
+        from locust.runners import MasterRunner, WorkerRunner
+
+        events = environment.events
+        events.reset_stats.add_listener(self.reset)
+        events.test_start.add_listener(self.reset)
+        if isinstance(environment.runner, WorkerRunner):
+            events.request.add_listener(self.on_request)
+            events.report_to_master.add_listener(self.on_report_to_master)
+        elif isinstance(environment.runner, MasterRunner):
+            events.worker_report.add_listener(self.on_worker_report)
+        else:
+            events.request.add_listener(self.on_request)
+
+        if environment.web_ui:
+            from flask import jsonify
+
+            @environment.web_ui.app.route("/stats/hdr")
+            @environment.web_ui.auth_required_if_enabled
+            def hdr_stats() -> Any:
+                return jsonify({"significant_digits": self.significant_digits, "stats": self.summary()})
+
+
+def install_histograms(
+    environment: Any,
+    significant_digits: int = HDR_SIGNIFICANT_DIGITS,
+    expected_interval_ms: float = CO_EXPECTED_INTERVAL_MS,
+    start_lag: Optional[Callable[[], float]] = None,
+    missed_lags: Optional[Callable[[], list[float]]] = None,
+) -> HistogramRecorder:
+    """Create a HistogramRecorder and attach it to `environment`. Call from an `init` listener."""
+    recorder = HistogramRecorder(significant_digits, expected_interval_ms, start_lag, missed_lags)
+    recorder.install(environment)
+    return recorder
@@ -0,0 +1,210 @@
+"""
+Local launcher: one Locust master plus a pool of worker processes.
+
+One Locust process runs on a single core, so using a whole machine means
+one worker per core. LocalCluster starts the master and `processes`
+workers (default: the core count) on this machine, optionally pins each
+worker to its own core, restarts workers that crash, and shuts everything
+down in order when the master exits or the launcher gets SIGINT/SIGTERM:
+the master is stopped first so it can tell its workers to quit, and
+workers still running after `grace` seconds are terminated.
+
+Children run in their own session, so Ctrl+C reaches only the launcher
+and is forwarded from there. Each worker gets LOCUST_WORKER_INDEX and
+LOCUST_WORKER_COUNT as its placement until the master sends its own
+(placement.py); a restarted worker keeps its index.
+"""
+
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+LOCUST_COMMAND = [sys.executable, "-m", "locust"]
+MASTER_BIND_PORT = 5557
+POLL_INTERVAL = 0.5  # Seconds between supervision passes
+RESTART_BACKOFF = 1.0  # Seconds before a crashed worker is started again, doubled per restart
+
+
+def worker_command(locustfile: str, master_port: int = MASTER_BIND_PORT, extra_args: Sequence[str] = ()) -> List[str]:
+    """Command for a worker that connects to a master on this machine."""
+    return LOCUST_COMMAND + [
+        "-f", str(locustfile),
+        "--worker",
+        "--master-host", "127.0.0.1",
+        "--master-port", str(master_port),
+    ] + list(extra_args)
+
+
+class WorkerProcess:
+    """One worker slot: its index, pinned core and current process."""
+
+    def __init__(self, index: int, core: Optional[int] = None):
+        self.index = index
+        self.core = core
+        self.process: Optional[Any] = None
+        self.restarts = 0
+        self.restart_at: Optional[float] = None
+
+
+class LocalCluster:
+    """A master and `processes` supervised workers on this machine; run() blocks until they exit."""
+
+    def __init__(
+        self,
+        locustfile: str,
+        processes: Optional[int] = None,
+        master_args: Sequence[str] = (),
+        worker_args: Sequence[str] = (),
+        pin_cpus: bool = False,
+        max_restarts: int = 5,
+        master_port: int = MASTER_BIND_PORT,
+        grace: float = 10.0,
+        env: Optional[Dict[str, str]] = None,
+        popen: Callable[..., Any] = subprocess.Popen,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.locustfile = str(locustfile)
+        self.processes = processes or os.cpu_count() or 1
+        self.master_args = list(master_args)
+        self.worker_args = list(worker_args)
+        self.pin_cpus = pin_cpus
+        self.max_restarts = max_restarts
+        self.master_port = master_port
+        self.grace = grace
+        self.env = dict(os.environ if env is None else env)
+        self.popen = popen
+        self.clock = clock
+        cores = sorted(available_cores()) if pin_cpus else []
+        self.workers = [
+            WorkerProcess(index, cores[index % len(cores)] if cores else None) for index in range(self.processes)
+        ]
+        self.master: Optional[Any] = None
+        self.stopping_since: Optional[float] = None
+
+    def master_command(self) -> List[str]:
+        return LOCUST_COMMAND + [
+            "-f", self.locustfile,
+            "--master",
+            "--master-bind-port", str(self.master_port),
+            "--expect-workers", str(self.processes),
+        ] + self.master_args
+
+    def worker_command(self) -> List[str]:
+        return worker_command(self.locustfile, self.master_port, self.worker_args)
+
+    def worker_env(self, worker: WorkerProcess) -> Dict[str, str]:
+        return {
+            **self.env,
+            "LOCUST_WORKER_INDEX": str(worker.index),
+            "LOCUST_WORKER_COUNT": str(self.processes),
+            "LOCUST_EXPECT_WORKERS": str(self.processes),
+        }
+
+    def _spawn(self, command: List[str], env: Dict[str, str]) -> Any:
+        return self.popen(command, env=env, start_new_session=True)
+
+    def start_worker(self, worker: WorkerProcess) -> None:
+        worker.process = self._spawn(self.worker_command(), self.worker_env(worker))
+        worker.restart_at = None
+        if worker.core is not None:
+            pin(worker.process.pid, worker.core)
+        logger.info(
+            f"Started worker {worker.index} (pid {worker.process.pid}"
+            + (f", core {worker.core})" if worker.core is not None else ")")
+        )
+
+    def start(self) -> None:
+        self.master = self._spawn(self.master_command(), {**self.env, "LOCUST_EXPECT_WORKERS": str(self.processes)})
+        logger.info(f"Started master (pid {self.master.pid}) for {self.processes} local workers")
+        for worker in self.workers:
+            self.start_worker(worker)
+
+    def stop(self, signum: Optional[int] = None, frame: Any = None) -> None:
+        """Ask the master to quit; it tells the workers. Safe to call from a signal handler."""
+        if self.stopping_since is not None:
+            return
+        self.stopping_since = self.clock()
+        if self.master is not None and self.master.poll() is None:
+            logger.info("Stopping master" + (f" on signal {signum}" if signum else ""))
+            self.master.send_signal(signal.SIGTERM)
+
+    def _supervise_worker(self, worker: WorkerProcess, now: float) -> None:
+        process = worker.process
+        if process is None:
+            if worker.restart_at is not None and now >= worker.restart_at and self.stopping_since is None:
+                self.start_worker(worker)
+            return
+        if process.poll() is None:
+            return
+        worker.process = None
+        if self.stopping_since is not None or process.returncode == 0:
+            return
+        if worker.restarts >= self.max_restarts:
+            logger.error(f"Worker {worker.index} exited with code {process.returncode}; giving up after {worker.restarts} restarts")
+            return
+        delay = RESTART_BACKOFF * 2 ** worker.restarts
+        worker.restarts += 1
+        worker.restart_at = now + delay
+        logger.warning(f"Worker {worker.index} exited with code {process.returncode}; restarting in {delay:g}s")
+
+    def supervise(self) -> bool:
+        """One supervision pass; returns False once the master and every worker have exited."""
+        now = self.clock()
+        if self.stopping_since is None and self.master.poll() is not None:
+            logger.info(f"Master exited with code {self.master.returncode}")
+            self.stopping_since = now
+        for worker in self.workers:
+            self._supervise_worker(worker, now)
+
+        running = [
+            process
+            for process in [self.master] + [worker.process for worker in self.workers]
+            if process is not None and process.poll() is None
+        ]
+        if self.stopping_since is not None:
+            # Escalate for processes that ignore the master's quit
+            waited = now - self.stopping_since
+            for process in running:
+                if waited >= 2 * self.grace:
+                    process.kill()
+                elif waited >= self.grace:
+                    process.terminate()
+        return bool(running)
+
+    def run(self) -> int:
+        """Start the cluster, supervise it until it exits, and return the master's exit code."""
+        previous = {sig: signal.signal(sig, self.stop) for sig in (signal.SIGINT, signal.SIGTERM)}
+        try:
+            self.start()
+            while self.supervise():
+                time.sleep(POLL_INTERVAL)
+        finally:
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+        return self.master.returncode
+
+
+def available_cores() -> List[int]:
+    """Cores this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return list(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def pin(pid: int, core: int) -> None:
+    """Restrict a process to one core; logged and skipped where unsupported."""
+    try:
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(pid, {core})
+        else:
+            import psutil
+
+            psutil.Process(pid).cpu_affinity([core])
+    except (AttributeError, OSError) as e:
+        logger.warning(f"Could not pin pid {pid} to core {core}: {e}")
@@ -9,13 +9,37 @@ How to run:
 
 Environment variables:
     BASE_URL: The base URL for your backend (default: http://localhost:8000)
+    LOCUST_CLIENT: "requests" (default) or "fast" to use FastHttpUser (geventhttpclient)
+    ARRIVAL_RATE: task starts per second across all workers (open model); unset keeps the closed-loop wait times
+    ARRIVAL_MODE: "constant" (default) or "poisson" arrivals when ARRIVAL_RATE is set
+    SLO_RULES: e.g. "p95 < 500; failure_ratio < 0.01" to stop early on a sustained breach and fail the run
+    METRICS_PORT: serve Prometheus metrics on this port as well as at /metrics on the web UI
+    SATURATION_REJECT: "true" to drop stats from report intervals in which a worker was saturated
+    ELASTIC_WORKERS: e.g. "1:8" to let the master start and stop local workers as load requires
+    WORKER_LATE_FACTOR: report or heartbeat gaps over this many intervals mark a worker late at /workers (default 2)
 """
 
 import logging
 import os
 from typing import Any
 
-from locust import HttpUser, between, events, task
+from locust import FastHttpUser, HttpUser, between, events, task
+
+from app.core.locust_load_test.arrival import (
+    install_arrivals,
+    missed_lags_source,
+    open_model_wait_time,
+    start_lag_source,
+)
+from app.core.locust_load_test.elastic import install_elastic
+from app.core.locust_load_test.histogram import install_histograms
+from app.core.locust_load_test.metrics import install_metrics
+from app.core.locust_load_test.placement import install_placement
+from app.core.locust_load_test.request_log import install_request_log
+from app.core.locust_load_test.request_trace import install_trace_writer
+from app.core.locust_load_test.saturation import install_saturation
+from app.core.locust_load_test.slo import install_slo
+from app.core.locust_load_test.worker_health import install_worker_health
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -24,13 +48,15 @@ logger = logging.getLogger(__name__)
 BASE_URL = os.getenv("BASE_URL", "http://localhost:8000")
 WAIT_TIME_MIN = int(os.getenv("LOCUST_WAIT_TIME_MIN", "1"))
 WAIT_TIME_MAX = int(os.getenv("LOCUST_WAIT_TIME_MAX", "3"))
+USE_FAST_HTTP = os.getenv("LOCUST_CLIENT", "requests").lower() == "fast"
 
 class BasicUser(HttpUser):
     """
     Simulates a basic user hitting health and sample endpoints.
     """
+    abstract = USE_FAST_HTTP
     host = BASE_URL
-    wait_time = between(WAIT_TIME_MIN, WAIT_TIME_MAX)
+    wait_time = open_model_wait_time(between(WAIT_TIME_MIN, WAIT_TIME_MAX))
 
     @task(2)
     def health_check(self) -> None:
@@ -54,9 +80,25 @@ class BasicUser(HttpUser):
                 response.failure(f"Sample API failed: {response.status_code} {response.text}")
                 logger.error(f"Sample API failed: {response.status_code} {response.text}")
 
+class BasicFastHttpUser(FastHttpUser, BasicUser):
+    """
+    BasicUser on geventhttpclient (LOCUST_CLIENT=fast).
+    """
+    abstract = not USE_FAST_HTTP
+
 # Optional: Add Locust event hooks for test lifecycle logging
 def on_locust_init(environment: Any, **kwargs: Any) -> None:
     logger.info("Locust environment initialized.")
+    install_request_log(environment)
+    install_trace_writer(environment)
+    install_histograms(environment, start_lag=start_lag_source(), missed_lags=missed_lags_source())
+    install_placement(environment)
+    install_arrivals(environment)
+    install_slo(environment)
+    install_metrics(environment)
+    install_saturation(environment, start_lag=start_lag_source())
+    install_elastic(environment)
+    install_worker_health(environment)
 def on_test_start(environment: Any, **kwargs: Any) -> None:
     logger.info("Locust test started.")
 def on_test_stop(environment: Any, **kwargs: Any) -> None:
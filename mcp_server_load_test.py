@@ -4,27 +4,75 @@ Tests MCP-specific endpoints and tools to ensure performance under load.
 """
 
 import json
+import os
 import random
 import time
-from typing import Dict, Any
+from typing import Dict, Any, List
 
-from locust import HttpUser, task, between, events
+from gevent.pool import Group
+from locust import FastHttpUser, HttpUser, task, between, events
 from locust.env import Environment
 import logging
 
+from app.core.locust_load_test.arrival import (
+    carry_task_lag,
+    install_arrivals,
+    missed_lags_source,
+    open_model_wait_time,
+    start_lag_source,
+)
+from app.core.locust_load_test.elastic import install_elastic
+from app.core.locust_load_test.histogram import install_histograms
+from app.core.locust_load_test.metrics import install_metrics
+from app.core.locust_load_test.placement import install_placement
+from app.core.locust_load_test.request_log import install_request_log
+from app.core.locust_load_test.request_trace import install_trace_writer
+from app.core.locust_load_test.saturation import install_saturation
+from app.core.locust_load_test.slo import install_slo
+from app.core.locust_load_test.worker_health import install_worker_health
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# "requests" (HttpUser) or "fast" (FastHttpUser, geventhttpclient)
+USE_FAST_HTTP = os.getenv("LOCUST_CLIENT", "requests").lower() == "fast"
+
+# Concurrent tool calls per agent turn for MCPAgentUser, e.g. "1,2,4,8,16" (empty disables the agent user)
+MCP_AGENT_FANOUT: List[int] = [int(n) for n in os.getenv("MCP_AGENT_FANOUT", "").split(",") if n.strip()]
+
+
+def check_add_response(response, expected_sum: int) -> bool:
+    """Mark a caught 'add' tool response as success or failure; returns True on success."""
+    if response.status_code != 200:
+        response.failure(f"Add tool failed: {response.status_code}")
+        return False
+    try:
+        data = response.json()
+    except json.JSONDecodeError:
+        response.failure("Invalid JSON in tool response")
+        return False
+    # Verify the add operation result
+    if not isinstance(data, list) or len(data) == 0:
+        response.failure("Invalid tool response format")
+        return False
+    result_data = data[0]
+    if "info" in result_data and result_data["info"].get("sum") == expected_sum:
+        response.success()
+        return True
+    response.failure(f"Incorrect sum: expected {expected_sum}")
+    return False
+
 
 class MCPServerUser(HttpUser):
     """
     Load test user for MCP server endpoints.
     Simulates LLM/AI agent interactions with the MCP server.
     """
+    abstract = USE_FAST_HTTP
     
     # Wait time between requests (simulating think time)
-    wait_time = between(1, 3)
+    wait_time = open_model_wait_time(between(1, 3))
     
     def on_start(self):
         """Called when a user starts. Setup any required state."""
@@ -119,23 +167,7 @@ class MCPServerUser(HttpUser):
             headers=self.headers,
             catch_response=True
         ) as response:
-            if response.status_code == 200:
-                try:
-                    data = response.json()
-                    # Verify the add operation result
-                    expected_sum = a + b
-                    if isinstance(data, list) and len(data) > 0:
-                        result_data = data[0]
-                        if "info" in result_data and result_data["info"].get("sum") == expected_sum:
-                            response.success()
-                        else:
-                            response.failure(f"Incorrect sum: expected {expected_sum}")
-                    else:
-                        response.failure("Invalid tool response format")
-                except json.JSONDecodeError:
-                    response.failure("Invalid JSON in tool response")
-            else:
-                response.failure(f"Add tool failed: {response.status_code}")
+            check_add_response(response, a + b)
 
     @task(1)
     def test_mcp_resource_version(self):
@@ -208,6 +240,21 @@ class MCPServerUser(HttpUser):
                     response.failure(f"Sensitive endpoint {endpoint} not properly blocked: {response.status_code}")
 
 
+@events.init.add_listener
+def on_locust_init(environment: Environment, **kwargs):
+    """Called when Locust initializes. Installs the optional collectors."""
+    install_request_log(environment)
+    install_trace_writer(environment)
+    install_histograms(environment, start_lag=start_lag_source(), missed_lags=missed_lags_source())
+    install_placement(environment)
+    install_arrivals(environment)
+    install_slo(environment)
+    install_metrics(environment)
+    install_saturation(environment, start_lag=start_lag_source())
+    install_elastic(environment)
+    install_worker_health(environment)
+
+
 @events.test_start.add_listener
 def on_test_start(environment: Environment, **kwargs):
     """Called when test starts."""
@@ -231,16 +278,104 @@ def on_test_stop(environment: Environment, **kwargs):
 # Configuration for different test scenarios
 class MCPLightLoad(MCPServerUser):
     """Light load test - simulates normal usage."""
-    wait_time = between(2, 5)
+    abstract = USE_FAST_HTTP
+    wait_time = open_model_wait_time(between(2, 5))
     weight = 3
 
 
 class MCPHeavyLoad(MCPServerUser):
     """Heavy load test - simulates high usage."""
-    wait_time = between(0.5, 1.5)  
+    abstract = USE_FAST_HTTP
+    wait_time = open_model_wait_time(between(0.5, 1.5))
     weight = 1
 
 
+# geventhttpclient-based variants, selected with LOCUST_CLIENT=fast
+class MCPServerFastHttpUser(FastHttpUser, MCPServerUser):
+    """MCPServerUser on geventhttpclient."""
+    abstract = not USE_FAST_HTTP
+
+
+class MCPLightLoadFastHttp(FastHttpUser, MCPLightLoad):
+    """Light load test on geventhttpclient."""
+    abstract = not USE_FAST_HTTP
+
+
+class MCPHeavyLoadFastHttp(FastHttpUser, MCPHeavyLoad):
+    """Heavy load test on geventhttpclient."""
+    abstract = not USE_FAST_HTTP
+
+
+class MCPAgentUser(FastHttpUser):
+    """
+    AI-agent style user: every turn fans out N concurrent tool calls and
+    waits for all of them, like an agent executing a parallel tool plan.
+
+    Enabled by MCP_AGENT_FANOUT. Each turn picks one of the configured
+    fan-out levels; every call is reported as "tools/call [fan-out N]" and
+    the whole turn as a FANOUT request "tools/call xN", so the level at
+    which per-call and per-turn latency start to climb shows up side by side.
+    The calls share the user's pooled keep-alive connections, sized to the
+    largest fan-out.
+    """
+    abstract = not MCP_AGENT_FANOUT
+    wait_time = open_model_wait_time(between(1, 3))
+    concurrency = max(MCP_AGENT_FANOUT, default=1)
+
+    def on_start(self):
+        """Discover the available tools once, as an agent would before planning."""
+        self.headers = {
+            "Content-Type": "application/json",
+            "User-Agent": "MCP-LoadTest/1.0",
+            "Accept": "application/json"
+        }
+        with self.client.get(
+            "/api/v1/mcp/discovery",
+            headers=self.headers,
+            catch_response=True
+        ) as response:
+            if response.status_code == 200:
+                response.success()
+            else:
+                response.failure(f"Discovery endpoint failed: {response.status_code}")
+
+    def call_add_tool(self, fanout: int) -> bool:
+        """One 'add' tool call within a fan-out of `fanout` calls."""
+        a = random.randint(1, 100)
+        b = random.randint(1, 100)
+        with self.client.post(
+            "/api/v1/tools/call",
+            json={"name": "add", "arguments": {"a": a, "b": b}},
+            headers=self.headers,
+            name=f"tools/call [fan-out {fanout}]",
+            catch_response=True
+        ) as response:
+            return check_add_response(response, a + b)
+
+    @task
+    def fan_out_tool_calls(self):
+        """Issue N tool calls at once and record the time until the last one returns."""
+        fanout = random.choice(MCP_AGENT_FANOUT)
+        group = Group()
+        start = time.perf_counter()
+        try:
+            # Each call started as late as the turn did
+            calls = [group.spawn(carry_task_lag(self.call_add_tool), fanout) for _ in range(fanout)]
+            group.join()
+        finally:
+            # Don't leave calls running if the user is stopped mid-turn
+            group.kill(block=False)
+        failed = sum(1 for call in calls if not call.value)
+        self.environment.events.request.fire(
+            request_type="FANOUT",
+            name=f"tools/call x{fanout}",
+            response_time=(time.perf_counter() - start) * 1000,
+            response_length=0,
+            exception=RuntimeError(f"{failed}/{fanout} tool calls failed") if failed else None,
+            context={},
+        )
+
+
 if __name__ == "__main__":
     """
     Run the load test directly.
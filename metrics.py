@@ -0,0 +1,241 @@
+"""
+Prometheus exporter for live load-test metrics.
+
+The master (or a local runner) serves per-endpoint request and failure
+counters, response time histograms, users and current RPS at /metrics on
+the web UI, and on a standalone port with METRICS_PORT for headless runs.
+Per-process CPU and RSS (from psutil), greenlet counts and counters
+supplied by the locustfile (token pool size, logins, IP rotations) are
+exported per worker, labelled `worker`.
+
+Nothing is recomputed per scrape. Workers already send the stats recorded
+since their last report to the master; MetricsState folds each of these
+deltas into running counters and histogram buckets as it arrives (or each
+request as it completes, on a local runner), and a scrape only reads the
+current totals. Counters are never reset, so `rate()` keeps working across
+test restarts and stats resets.
+
+Requires prometheus_client on the master; workers only add a few numbers
+to their regular report.
+"""
+
+import bisect
+import logging
+import os
+import re
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # Standalone /metrics port on the master; 0 only serves it on the web UI
+METRICS_BUCKETS_MS = os.getenv("METRICS_BUCKETS_MS", "5,10,25,50,100,250,500,1000,2500,5000,10000")  # Histogram upper bounds
+REPORT_KEY = "metrics"
+LOCAL_WORKER = "local"
+MASTER_WORKER = "master"
+
+Counters = Callable[[], Dict[str, float]]
+
+
+def parse_buckets(text: str) -> Tuple[float, ...]:
+    buckets = tuple(sorted(float(bound) for bound in text.split(",") if bound.strip()))
+    if not buckets:
+        raise ValueError("At least one histogram bucket is required")
+    return buckets
+
+
+class EndpointMetrics:
+    """Running totals for one (method, name); `buckets` holds per-bucket, not cumulative, counts."""
+
+    __slots__ = ("requests", "failures", "sum_ms", "buckets")
+
+    def __init__(self, bucket_count: int):
+        self.requests = 0
+        self.failures = 0
+        self.sum_ms = 0.0
+        self.buckets = [0] * (bucket_count + 1)  # Last slot is +Inf
+
+
+class MetricsState:
+    """Metrics accumulated from requests or worker reports, read by MetricsCollector on scrape."""
+
+    def __init__(self, buckets: Iterable[float] = parse_buckets(METRICS_BUCKETS_MS)):
+        self.bounds = tuple(buckets)
+        self.endpoints: Dict[Tuple[str, str], EndpointMetrics] = {}
+        self.workers: Dict[str, Dict[str, Any]] = {}
+
+    def _endpoint(self, method: str, name: str) -> EndpointMetrics:
+        endpoint = self.endpoints.get((method, name))
+        if endpoint is None:
+            endpoint = self.endpoints[(method, name)] = EndpointMetrics(len(self.bounds))
+        return endpoint
+
+    def observe(self, method: str, name: str, response_time: float, failed: bool = False) -> None:
+        """Record one request (local runner)."""
+        endpoint = self._endpoint(method, name)
+        endpoint.requests += 1
+        endpoint.failures += failed
+        endpoint.sum_ms += response_time
+        endpoint.buckets[bisect.bisect_left(self.bounds, response_time)] += 1
+
+    def add_entry(self, entry: Dict[str, Any]) -> None:
+        """Fold in one serialized StatsEntry delta from a worker report."""
+        endpoint = self._endpoint(entry["method"], entry["name"])
+        endpoint.requests += entry["num_requests"]
+        endpoint.failures += entry["num_failures"]
+        endpoint.sum_ms += entry["total_response_time"]
+        for response_time, count in (entry.get("response_times") or {}).items():
+            endpoint.buckets[bisect.bisect_left(self.bounds, float(response_time))] += count
+
+    def set_worker(self, worker: str, sample: Dict[str, Any]) -> None:
+        self.workers[worker] = sample
+
+    def on_request(self, request_type: str, name: str, response_time: float, exception: Any = None, **kwargs: Any) -> None:
+        self.observe(request_type, name, response_time, exception is not None)
+
+    def on_worker_report(self, client_id: str, data: Dict[str, Any]) -> None:
+        for entry in data.get("stats", ()):
+            self.add_entry(entry)
+        if REPORT_KEY in data:
+            self.set_worker(client_id, data[REPORT_KEY])
+
+
+# CPU percent is measured between consecutive samples, i.e. over one report interval
+_process = psutil.Process()
+
+
+def process_sample(runner: Any, counters: Optional[Counters] = None) -> Dict[str, Any]:
+    """This process's load: CPU and RSS, greenlets, users and custom counters."""
+    return {
+        "cpu_percent": _process.cpu_percent(),
+        "rss_bytes": _process.memory_info().rss,
+        "greenlets": len(runner.user_greenlets) + len(runner.greenlet),
+        "users": runner.user_count,
+        "counters": dict(counters()) if counters else {},
+    }
+
+
+def metric_name(name: str) -> str:
+    return "locust_" + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+class MetricsCollector:
+    """prometheus_client collector that turns the current MetricsState into metric families."""
+
+    def __init__(self, state: MetricsState, environment: Any, counters: Optional[Counters] = None):
+        self.state = state
+        self.environment = environment
+        self.counters = counters
+
+    def _workers(self) -> Dict[str, Dict[str, Any]]:
+        from locust.runners import MasterRunner
+
+        runner = self.environment.runner
+        if not isinstance(runner, MasterRunner):
+            return {LOCAL_WORKER: process_sample(runner, self.counters)}
+        # Workers that quit or went missing drop out of runner.clients
+        workers = {worker: sample for worker, sample in self.state.workers.items() if worker in runner.clients}
+        # The master runs no users itself; its user_count is the cluster total
+        workers[MASTER_WORKER] = {key: value for key, value in process_sample(runner).items() if key != "users"}
+        return workers
+
+    def collect(self) -> Iterator[Any]:
+        from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily
+
+        runner = self.environment.runner
+        labels = ["method", "name"]
+        requests = CounterMetricFamily("locust_requests", "Requests sent", labels=labels)
+        failures = CounterMetricFamily("locust_request_failures", "Failed requests", labels=labels)
+        latency = HistogramMetricFamily("locust_response_time_milliseconds", "Response time", labels=labels)
+        for (method, name), endpoint in sorted(self.state.endpoints.items()):
+            requests.add_metric([method, name], endpoint.requests)
+            failures.add_metric([method, name], endpoint.failures)
+            cumulative, buckets = 0, []
+            for bound, count in zip(self.state.bounds + (float("inf"),), endpoint.buckets):
+                cumulative += count
+                buckets.append(("+Inf" if bound == float("inf") else f"{bound:g}", cumulative))
+            latency.add_metric([method, name], buckets, endpoint.sum_ms)
+        yield requests
+        yield failures
+        yield latency
+
+        yield GaugeMetricFamily("locust_users", "Running users", value=runner.user_count)
+        yield GaugeMetricFamily("locust_current_rps", "Requests per second", value=runner.stats.total.current_rps)
+        yield GaugeMetricFamily(
+            "locust_current_fail_per_sec", "Failures per second", value=runner.stats.total.current_fail_per_sec
+        )
+
+        workers = self._workers()
+        process = {
+            "cpu_percent": GaugeMetricFamily("locust_process_cpu_percent", "Process CPU usage", labels=["worker"]),
+            "rss_bytes": GaugeMetricFamily("locust_process_resident_memory_bytes", "Process RSS", labels=["worker"]),
+            "greenlets": GaugeMetricFamily("locust_process_greenlets", "Running greenlets", labels=["worker"]),
+            "users": GaugeMetricFamily("locust_worker_users", "Users running on the worker", labels=["worker"]),
+        }
+        custom: Dict[str, Any] = {}
+        for worker, sample in sorted(workers.items()):
+            for key, family in process.items():
+                if key in sample:
+                    family.add_metric([worker], sample[key])
+            for key, value in sample.get("counters", {}).items():
+                family = custom.get(key)
+                if family is None:
+                    # Names ending in _total are monotonic counters, everything else a gauge
+                    if key.endswith("_total"):
+                        family = CounterMetricFamily(metric_name(key[: -len("_total")]), key, labels=["worker"])
+                    else:
+                        family = GaugeMetricFamily(metric_name(key), key, labels=["worker"])
+                    custom[key] = family
+                family.add_metric([worker], value)
+        yield from process.values()
+        yield from custom.values()
+
+
+def install_metrics(
+    environment: Any, counters: Optional[Counters] = None, port: int = METRICS_PORT
+) -> Optional[MetricsState]:
+    """
+    Export metrics from the master or a local runner; on workers, add the
+    process sample and `counters()` to each stats report. Call from an
+    `init` listener.
+    """
+    from locust.runners import MasterRunner, WorkerRunner
+
+    runner = environment.runner
+    events = environment.events
+    if isinstance(runner, WorkerRunner):
+
+        def on_report_to_master(client_id: str, data: Dict[str, Any]) -> None:
+            data[REPORT_KEY] = process_sample(runner, counters)
+
+        events.report_to_master.add_listener(on_report_to_master)
+        return None
+
+    try:
+        from prometheus_client import CollectorRegistry, generate_latest, start_http_server
+        from prometheus_client.exposition import CONTENT_TYPE_LATEST
+    except ImportError:
+        logger.info("prometheus_client is not installed; /metrics is disabled")
+        return None
+
+    state = MetricsState()
+    registry = CollectorRegistry()
+    registry.register(MetricsCollector(state, environment, counters))
+    if isinstance(runner, MasterRunner):
+        events.worker_report.add_listener(state.on_worker_report)
+    else:
+        events.request.add_listener(state.on_request)
+
+    if environment.web_ui:
+        from flask import Response
+
+        @environment.web_ui.app.route("/metrics")
+        @environment.web_ui.auth_required_if_enabled
+        def metrics() -> Any:
+            return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+    if port:
+        start_http_server(port, registry=registry)
+        logger.info(f"Prometheus metrics on :{port}/metrics")
+    return state
@@ -0,0 +1,180 @@
+"""
+Where each worker sits in the cluster, as the master sees it.
+
+A worker can't tell on its own how many other workers there are: only a
+launcher sets LOCUST_WORKER_INDEX / LOCUST_WORKER_COUNT, and workers
+started by hand, by docker compose or by elastic.py would all believe they
+are worker 0 of 1. The master knows which workers are connected, so it
+hands out each worker's placement with a custom message:
+
+- index / count: the worker's rank among the connected workers and how
+  many there are, for splitting a cluster-wide rate (arrival.py),
+- shard / shards: a number that stays with the worker for the whole run,
+  and the stride between them, for partitioning test data
+  (custom/sharding.py). A worker that leaves frees its shard for the next
+  one to join. `shards` covers --expect-workers and the ELASTIC_WORKERS
+  maximum up front, so it doesn't have to grow mid-run.
+
+The master sends the placements from its test_start listener, which runs
+before it sends the first spawn message, so every worker is placed before
+its users start. A worker also asks for its placement once its own `init`
+listeners are in place: one that joins a running test can get its first
+users before that, so wait() lets them hold off until it is placed. The
+other workers are placed again whenever a worker joins, quits or goes
+missing (checked on every heartbeat, since the master doesn't always move
+users then). A local (non-distributed) runner is worker 0 of 1.
+"""
+
+import itertools
+import logging
+import os
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from gevent.event import Event
+
+logger = logging.getLogger(__name__)
+
+PLACEMENT_MESSAGE = "worker_placement"
+
+
+class Placement:
+    """This process's place among the workers; `known` stays False until the master sends it."""
+
+    def __init__(self):
+        self.index = 0
+        self.count = 1
+        self.shard = 0
+        self.shards = 1
+        self.known = False
+        self._listeners: List[Callable[["Placement"], None]] = []
+        self._placed = Event()
+
+    def subscribe(self, listener: Callable[["Placement"], None]) -> None:
+        """Call `listener(placement)` whenever the placement changes."""
+        self._listeners.append(listener)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block the calling greenlet until the placement is known; False on timeout."""
+        return self._placed.wait(timeout)
+
+    def update(self, index: int, count: int, shard: Optional[int] = None, shards: Optional[int] = None) -> None:
+        previous = (self.index, self.count, self.shard, self.shards) if self.known else None
+        self.index = index
+        self.count = count
+        self.shard = index if shard is None else shard
+        self.shards = count if shards is None else shards
+        self.known = True
+        self._placed.set()
+        if (self.index, self.count, self.shard, self.shards) != previous:
+            for listener in self._listeners:
+                listener(self)
+
+
+class SlotTable:
+    """Runs in the master: shards and ranks for the connected workers."""
+
+    def __init__(self, reserved: int = 1):
+        self.reserved = reserved
+        self.shard_of: Dict[str, int] = {}
+        self.shards = reserved
+
+    def reserve(self, count: int) -> None:
+        """Keep room for `count` workers from the next run on."""
+        self.reserved = max(self.reserved, count)
+
+    def restart(self, client_ids: Iterable[str]) -> None:
+        """A new run: shards in client id order."""
+        ordered = sorted(set(client_ids))
+        self.shard_of = {client_id: shard for shard, client_id in enumerate(ordered)}
+        self.shards = max(len(ordered), self.reserved, 1)
+
+    def update(self, client_ids: Iterable[str], running: bool = True) -> None:
+        """Workers joined or left: departed shards are freed, new workers take the lowest free ones."""
+        connected = set(client_ids)
+        self.shard_of = {client_id: shard for client_id, shard in self.shard_of.items() if client_id in connected}
+        taken = set(self.shard_of.values())
+        free = (shard for shard in itertools.count() if shard not in taken)
+        for client_id in sorted(connected - self.shard_of.keys()):
+            self.shard_of[client_id] = next(free)
+        needed = max(self.shard_of.values(), default=-1) + 1
+        if needed > self.shards:
+            if running:
+                logger.warning(
+                    f"{needed} workers connected but shards were reserved for {self.shards}; users on different "
+                    "workers may share test data until the next run. Raise --expect-workers or the ELASTIC_WORKERS maximum"
+                )
+            self.shards = needed
+
+    def placements(self) -> Dict[str, Dict[str, int]]:
+        """Message data for every connected worker, ranked by shard."""
+        ordered = sorted(self.shard_of, key=self.shard_of.__getitem__)
+        return {
+            client_id: {"index": index, "count": len(ordered), "shard": self.shard_of[client_id], "shards": self.shards}
+            for index, client_id in enumerate(ordered)
+        }
+
+
+# This process's placement, and on the master the table it is handed out from
+placement = Placement()
+slots = SlotTable()
+
+
+def install_placement(environment: Any) -> Placement:
+    """Place workers from the master. Call from an `init` listener, before install_arrivals."""
+    from locust.runners import STATE_MISSING, STATE_RUNNING, STATE_SPAWNING, MasterRunner, WorkerRunner
+
+    runner = environment.runner
+    if isinstance(runner, MasterRunner):
+        options = environment.parsed_options
+        slots.reserve(getattr(options, "expect_workers", 1) or 1)
+        sent: Dict[str, Dict[str, int]] = {}
+
+        def connected(*extra: str) -> List[str]:
+            return [client.id for client in runner.clients.values() if client.state != STATE_MISSING] + list(extra)
+
+        def send(force: Iterable[str] = ()) -> None:
+            for client_id, data in slots.placements().items():
+                if client_id in force or sent.get(client_id) != data:
+                    runner.send_message(PLACEMENT_MESSAGE, data, client_id=client_id)
+                    sent[client_id] = data
+
+        def running() -> bool:
+            return runner.state in (STATE_RUNNING, STATE_SPAWNING)
+
+        def on_test_start(**kwargs: Any) -> None:
+            slots.restart(connected())
+            send(force=slots.shard_of)
+
+        def on_worker_connect(client_id: str, **kwargs: Any) -> None:
+            # Fired before the worker is added to runner.clients; it asks for its own placement once it is ready
+            slots.update(connected(client_id), running())
+            sent[client_id] = slots.placements()[client_id]
+            send()
+
+        def on_request(msg: Any, **kwargs: Any) -> None:
+            slots.update(connected(msg.node_id), running())
+            send(force=[msg.node_id])
+
+        def on_workers_changed(**kwargs: Any) -> None:
+            # After users were moved, and on every heartbeat for workers that quit or went missing
+            slots.update(connected(), running())
+            send()
+
+        environment.events.test_start.add_listener(on_test_start)
+        environment.events.worker_connect.add_listener(on_worker_connect)
+        environment.events.spawning_complete.add_listener(on_workers_changed)
+        environment.events.heartbeat_sent.add_listener(on_workers_changed)
+        runner.register_message(PLACEMENT_MESSAGE, on_request)
+    elif isinstance(runner, WorkerRunner):
+        if os.getenv("LOCUST_WORKER_INDEX") and os.getenv("LOCUST_WORKER_COUNT"):
+            # Set by launcher.py; the master's placement replaces it
+            placement.update(int(os.environ["LOCUST_WORKER_INDEX"]), int(os.environ["LOCUST_WORKER_COUNT"]))
+
+        def on_placement(msg: Any, **kwargs: Any) -> None:
+            placement.update(**msg.data)
+
+        runner.register_message(PLACEMENT_MESSAGE, on_placement)
+        runner.send_message(PLACEMENT_MESSAGE)
+    else:
+        placement.update(0, 1)
+    return placement
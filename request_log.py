@@ -0,0 +1,245 @@
+"""
+Per-request event log for Locust workers.
+
+Opt-in sink hooked to Locust's `request` event. Each request is appended to a
+bounded in-memory queue; a background greenlet drains it in batches and hands
+the encoded batch to gevent's thread pool for the actual `write()`, so a slow
+disk never blocks the user greenlets or the hub. When the queue is full new
+records are dropped and counted instead of growing memory, which keeps worker
+RSS flat over long soaks. Files rotate by size.
+
+Enable by setting REQUEST_LOG_PATH (e.g. request_log.jsonl). Workers write
+to their own file, suffixed with the worker index. Every run after the
+first in the same process gets a new file (request_log.run2.jsonl, ...),
+so stopping and restarting a test from the web UI keeps earlier runs.
+"""
+
+import abc
+import json
+import logging
+import os
+from collections import deque
+from pathlib import Path
+from typing import Any
+
+import gevent
+from gevent.event import Event
+
+logger = logging.getLogger(__name__)
+
+REQUEST_LOG_PATH = os.getenv("REQUEST_LOG_PATH", "")
+REQUEST_LOG_MAX_QUEUE = int(os.getenv("REQUEST_LOG_MAX_QUEUE", "100000"))
+REQUEST_LOG_MAX_BYTES = int(os.getenv("REQUEST_LOG_MAX_BYTES", str(256 * 1024 * 1024)))
+REQUEST_LOG_BACKUPS = int(os.getenv("REQUEST_LOG_BACKUPS", "5"))
+
+
+class BufferedEventSink(abc.ABC):
+    """
+    Bounded queue of records flushed to a size-rotated file by a background greenlet.
+
+    Subclasses implement `encode()` to turn a batch of records into bytes and
+    may override `file_header()` for formats that start each file with one.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_queue: int = 100_000,
+        batch_size: int = 2_000,
+        flush_interval: float = 0.5,
+        max_bytes: int = 256 * 1024 * 1024,
+        backups: int = 5,
+    ):
+        self.path = Path(path)
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.written = 0
+        self.dropped = 0
+        self._queue: deque = deque()
+        self._file = None
+        self._file_bytes = 0
+        self._writer: gevent.Greenlet | None = None
+        self._stopping = Event()
+
+    def submit(self, record: Any) -> bool:
+        """Queue a record without blocking. Returns False if it was dropped."""
+        if len(self._queue) >= self.max_queue:
+            self.dropped += 1
+            return False
+        self._queue.append(record)
+        return True
+
+    def start(self) -> None:
+        if self._writer is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._open()
+            self._stopping.clear()
+            self._writer = gevent.spawn(self._run)
+            logger.info(f"Writing request events to {self.path}")
+
+    def stop(self) -> None:
+        """Stop the writer after it flushed whatever is still queued."""
+        if self._writer is None:
+            return
+        # Killing the writer could interrupt a write in the thread pool; let it finish and exit instead
+        self._stopping.set()
+        self._writer.join()
+        self._writer = None
+        self._file.close()
+        self._file = None
+        if self.dropped:
+            logger.warning(f"{self.path}: dropped {self.dropped} records under backpressure")
+        logger.info(f"{self.path}: wrote {self.written} records")
+
+    @abc.abstractmethod
+    def encode(self, batch: list) -> bytes:
+        """Turn a batch of queued records into the bytes to append."""
+
+    def file_header(self) -> bytes:
+        return b""
+
+    def flush(self) -> None:
+        threadpool = gevent.get_hub().threadpool
+        while self._queue:
+            count = min(self.batch_size, len(self._queue))
+            batch = [self._queue.popleft() for _ in range(count)]
+            threadpool.apply(self._write, (self.encode(batch),))
+            self.written += count
+
+    def _run(self) -> None:
+        while True:
+            stopping = self._stopping.wait(self.flush_interval)
+            try:
+                self.flush()
+            except OSError as e:
+                logger.error(f"{self.path}: write failed: {e}")
+            if stopping:
+                return
+
+    def _open(self) -> None:
+        self._file = open(self.path, "wb")
+        header = self.file_header()
+        self._file.write(header)
+        self._file_bytes = len(header)
+
+    def _write(self, data: bytes) -> None:
+        # Runs in the hub's thread pool
+        if self.max_bytes and self._file_bytes + len(data) > self.max_bytes and self._file_bytes:
+            self._rotate()
+        self._file.write(data)
+        self._file_bytes += len(data)
+
+    def _rotate(self) -> None:
+        self._file.close()
+        for index in range(self.backups - 1, 0, -1):
+            older = self.path.with_name(f"{self.path.name}.{index}")
+            if older.exists():
+                older.replace(self.path.with_name(f"{self.path.name}.{index + 1}"))
+        if self.backups > 0:
+            self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+        self._open()
+
+
+class RequestLogWriter(BufferedEventSink):
+    """JSON Lines sink: one object per request."""
+
+    FIELDS = ("ts", "method", "name", "status", "latency_ms", "bytes", "token_id", "ip", "error")
+
+    def encode(self, batch: list) -> bytes:
+        fields = self.FIELDS
+        return "".join(
+            json.dumps(dict(zip(fields, record)), separators=(",", ":")) + "\n" for record in batch
+        ).encode()
+
+    def on_request(
+        self,
+        request_type: str,
+        name: str,
+        response_time: float,
+        response_length: int,
+        response: Any = None,
+        context: dict | None = None,
+        exception: Exception | None = None,
+        start_time: float | None = None,
+        **kwargs: Any,
+    ) -> None:
+        """Listener for `events.request`; only builds a tuple, encoding happens in the writer."""
+        context = context or {}
+        self.submit((
+            start_time,
+            request_type,
+            name,
+            getattr(response, "status_code", None),
+            response_time,
+            response_length,
+            context.get("token_id"),
+            context.get("ip"),
+            repr(exception) if exception else None,
+        ))
+
+
+# Locust is imported inside the helpers below so that offline readers of these
+# files (e.g. generate_report.py) don't pull in its gevent monkey-patching.
+
+def is_master(environment: Any) -> bool:
+    from locust.runners import MasterRunner
+
+    return isinstance(environment.runner, MasterRunner)
+
+
+def worker_path(path: str | Path, environment: Any) -> Path:
+    """Give each worker its own file: request_log.jsonl -> request_log.w3.jsonl."""
+    from locust.runners import WorkerRunner
+
+    path = Path(path)
+    if isinstance(environment.runner, WorkerRunner):
+        return path.with_name(f"{path.stem}.w{environment.runner.worker_index}{path.suffix}")
+    return path
+
+
+def run_path(path: str | Path, run: int) -> Path:
+    """File for the nth run in this process: request_log.jsonl, then request_log.run2.jsonl, ..."""
+    path = Path(path)
+    if run <= 1:
+        return path
+    return path.with_name(f"{path.stem}.run{run}{path.suffix}")
+
+
+def install_request_log(environment: Any, path: str = REQUEST_LOG_PATH) -> RequestLogWriter | None:
+    """
+    Attach a RequestLogWriter to `environment` if `path` is set.
+    Call from an `init` listener; the file is opened when the test starts.
+    """
+    if not path or is_master(environment):
+        return None
+
+    sink = RequestLogWriter(
+        path,
+        max_queue=REQUEST_LOG_MAX_QUEUE,
+        max_bytes=REQUEST_LOG_MAX_BYTES,
+        backups=REQUEST_LOG_BACKUPS,
+    )
+    attach_sink(environment, sink)
+    return sink
+
+
+def attach_sink(environment: Any, sink: BufferedEventSink) -> None:
+    """Feed `sink` from the request event and open/close it with the test, one file per run."""
+    path = sink.path
+    runs = 0
+
+    def on_test_start(environment: Any, **kwargs: Any) -> None:
+        nonlocal runs
+        runs += 1
+        sink.path = run_path(worker_path(path, environment), runs)
+        sink.start()
+
+    def on_test_stop(environment: Any, **kwargs: Any) -> None:
+        sink.stop()
+
+    environment.events.request.add_listener(sink.on_request)
+    environment.events.test_start.add_listener(on_test_start)
+    environment.events.test_stop.add_listener(on_test_stop)
@@ -0,0 +1,283 @@
+"""
+Compact binary per-request trace format.
+
+JSONL is too large for full-fidelity traces at tens of thousands of RPS, so
+this module writes fixed-width 20-byte records instead:
+
+    ts (float64, unix seconds) | endpoint (uint16) | status (uint16)
+    | latency_us (uint32) | bytes (uint32)
+
+The top bit of `status` (0x8000) flags requests Locust counted as failures.
+
+Each file starts with a fixed-size header holding a magic string, the record
+size and a JSON dictionary mapping endpoint IDs to "METHOD name". Records
+start right after the header, so the reader can map them with
+`numpy.memmap` and analyse them without building Python objects.
+
+Enable on workers by setting REQUEST_TRACE_PATH (e.g. trace.bin). Writing
+needs only the standard library; reading (TraceReader, exact_percentiles)
+needs NumPy, which the Docker image installs.
+"""
+
+import json
+import os
+import struct
+import time
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from app.core.locust_load_test.request_log import BufferedEventSink, attach_sink, is_master
+
+try:
+    import numpy as np
+except ImportError:  # Only the reader needs NumPy
+    np = None
+
+REQUEST_TRACE_PATH = os.getenv("REQUEST_TRACE_PATH", "")
+REQUEST_TRACE_MAX_QUEUE = int(os.getenv("REQUEST_TRACE_MAX_QUEUE", "500000"))
+REQUEST_TRACE_MAX_BYTES = int(os.getenv("REQUEST_TRACE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+
+MAGIC = b"LCTRACE1"
+HEADER_SIZE = 64 * 1024
+HEADER_PREFIX = struct.Struct("<8sHHI")  # magic, version, record size, dictionary length
+VERSION = 1
+RECORD = struct.Struct("<dHHII")
+MAX_U16 = 0xFFFF
+FAILURE_FLAG = 0x8000
+MAX_U32 = 0xFFFFFFFF
+
+if np is not None:
+    TRACE_DTYPE = np.dtype([
+        ("ts", "<f8"),
+        ("endpoint", "<u2"),
+        ("status", "<u2"),
+        ("latency_us", "<u4"),
+        ("bytes", "<u4"),
+    ])
+    assert TRACE_DTYPE.itemsize == RECORD.size
+
+
+def encode_header(endpoints: list[str]) -> bytes:
+    dictionary = json.dumps(endpoints, separators=(",", ":")).encode()
+    header = HEADER_PREFIX.pack(MAGIC, VERSION, RECORD.size, len(dictionary)) + dictionary
+    if len(header) > HEADER_SIZE:
+        raise ValueError(f"Endpoint dictionary does not fit in the {HEADER_SIZE}-byte trace header")
+    return header.ljust(HEADER_SIZE, b"\0")
+
+
+def decode_header(header: bytes) -> list[str]:
+    magic, version, record_size, dict_len = HEADER_PREFIX.unpack_from(header)
+    if magic != MAGIC:
+        raise ValueError("Not a request trace file")
+    if version != VERSION or record_size != RECORD.size:
+        raise ValueError(f"Unsupported trace version {version} (record size {record_size})")
+    start = HEADER_PREFIX.size
+    return json.loads(header[start:start + dict_len])
+
+
+class TraceWriter(BufferedEventSink):
+    """
+    Binary trace sink for Locust's `request` event.
+
+    Endpoint IDs are assigned as new (method, name) pairs show up, up to
+    MAX_U16 - 1; ID MAX_U16 is the shared overflow bucket. The header is
+    rewritten in place whenever the dictionary grew since the last write.
+    """
+
+    def __init__(self, path: str | Path, **kwargs: Any):
+        super().__init__(path, **kwargs)
+        self._endpoint_ids: dict[tuple[str, str], int] = {}
+        self.endpoints: list[str] = []
+        self._header_endpoints = 0
+        # The dictionary as of the batch being written; users keep adding to `endpoints` meanwhile
+        self._written_endpoints: list[str] = []
+
+    def endpoint_id(self, request_type: str, name: str) -> int:
+        key = (request_type, name)
+        endpoint = self._endpoint_ids.get(key)
+        if endpoint is None:
+            if len(self.endpoints) >= MAX_U16:
+                return MAX_U16  # shared overflow bucket
+            endpoint = len(self.endpoints)
+            self._endpoint_ids[key] = endpoint
+            self.endpoints.append(f"{request_type} {name}")
+        return endpoint
+
+    def start(self) -> None:
+        self._written_endpoints = list(self.endpoints)
+        super().start()
+
+    def file_header(self) -> bytes:
+        self._header_endpoints = len(self._written_endpoints)
+        return encode_header(self._written_endpoints)
+
+    def encode(self, batch: list) -> bytes:
+        # Runs on the hub thread, so the copy can't race the users appending endpoints
+        self._written_endpoints = list(self.endpoints)
+        pack = RECORD.pack
+        return b"".join(pack(*record) for record in batch)
+
+    def _write(self, data: bytes) -> None:
+        # Runs in the hub's thread pool
+        super()._write(data)
+        if len(self._written_endpoints) != self._header_endpoints:
+            self._file.seek(0)
+            self._file.write(self.file_header())
+            self._file.seek(0, os.SEEK_END)
+
+    def on_request(
+        self,
+        request_type: str,
+        name: str,
+        response_time: float,
+        response_length: int,
+        response: Any = None,
+        exception: Exception | None = None,
+        start_time: float | None = None,
+        **kwargs: Any,
+    ) -> None:
+        status = min(getattr(response, "status_code", 0) or 0, FAILURE_FLAG - 1)
+        self.submit((
+            start_time or time.time(),
+            self.endpoint_id(request_type, name),
+            status | FAILURE_FLAG if exception else status,
+            min(int((response_time or 0) * 1000), MAX_U32),
+            min(response_length or 0, MAX_U32),
+        ))
+
+
+class TraceReader:
+    """Zero-copy view of a trace file: `records` is a numpy.memmap with TRACE_DTYPE."""
+
+    def __init__(self, path: str | Path):
+        if np is None:
+            raise ImportError("Reading request traces requires numpy")
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self.endpoints = decode_header(f.read(HEADER_SIZE))
+        count = (self.path.stat().st_size - HEADER_SIZE) // RECORD.size  # ignore a torn last record
+        if count > 0:
+            self.records = np.memmap(self.path, dtype=TRACE_DTYPE, mode="r", offset=HEADER_SIZE, shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype=TRACE_DTYPE)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def chunks(self, size: int = 8_000_000) -> Iterator[Any]:
+        for start in range(0, len(self.records), size):
+            yield self.records[start:start + size]
+
+
+def _remapped_chunks(readers: list[TraceReader], names: list[str], chunk_size: int) -> Iterator[tuple[Any, Any, Any]]:
+    """Yield (endpoint, latency_us, status) arrays with endpoint IDs mapped onto `names`."""
+    index = {name: i for i, name in enumerate(names)}
+    overflow = len(names) - 1
+    for reader in readers:
+        remap = np.array([index[name] for name in reader.endpoints] + [overflow], dtype=np.int64)
+        for chunk in reader.chunks(chunk_size):
+            endpoint = remap[np.minimum(chunk["endpoint"].astype(np.int64), len(remap) - 1)]
+            yield endpoint, chunk["latency_us"].astype(np.int64), chunk["status"]
+
+
+def exact_percentiles(
+    readers: TraceReader | list[TraceReader],
+    quantiles: Iterable[float] = (0.5, 0.9, 0.95, 0.99, 0.999),
+    chunk_size: int = 8_000_000,
+) -> dict[str, dict[str, Any]]:
+    """
+    Exact nearest-rank latency percentiles (in ms) per endpoint, plus "Aggregated".
+
+    Several trace files (e.g. one per worker) are combined as one data set.
+    Works in two bounded-memory passes over the memmaps: the first counts
+    latencies per endpoint by their high 16 bits, which locates the 65 ms-wide
+    bucket holding each requested rank; the second counts the low 16 bits of
+    just those buckets, which pins down the exact microsecond value.
+    """
+    if isinstance(readers, TraceReader):
+        readers = [readers]
+    quantiles = list(quantiles)
+    names: list[str] = []
+    for reader in readers:
+        names += [name for name in reader.endpoints if name not in names]
+    names.append("(overflow)")
+    n_endpoints = len(names)
+    width = 1 << 16
+
+    # Pass 1: per-endpoint counts by high bits, plus totals for the summary
+    coarse = np.zeros(n_endpoints * width, dtype=np.int64)
+    latency_sum = np.zeros(n_endpoints, dtype=np.float64)
+    latency_max = np.zeros(n_endpoints, dtype=np.int64)
+    failures = np.zeros(n_endpoints, dtype=np.int64)
+    for endpoint, latency, status in _remapped_chunks(readers, names, chunk_size):
+        coarse += np.bincount(endpoint * width + (latency >> 16), minlength=coarse.size)
+        latency_sum += np.bincount(endpoint, weights=latency, minlength=n_endpoints)
+        np.maximum.at(latency_max, endpoint, latency)
+        bad = (status & FAILURE_FLAG) != 0
+        failures += np.bincount(endpoint[bad], minlength=n_endpoints)
+
+    # The aggregate is an extra row that sums every endpoint
+    aggregated = n_endpoints
+    coarse = coarse.reshape(n_endpoints, width)
+    coarse = np.vstack([coarse, coarse.sum(axis=0)])
+    counts = coarse.sum(axis=1)
+    latency_sum = np.append(latency_sum, latency_sum.sum())
+    latency_max = np.append(latency_max, latency_max.max())
+    failures = np.append(failures, failures.sum())
+    names.append("Aggregated")
+
+    # Locate the coarse bucket (and the rank inside it) for every endpoint/quantile
+    targets: dict[tuple[int, int], int] = {}  # (endpoint, high bits) -> fine histogram row
+    wanted: list[tuple[int, float, int, int, int]] = []  # (endpoint, quantile, row, high bits, rank in bucket)
+    for endpoint in np.nonzero(counts)[0]:
+        cumulative = np.cumsum(coarse[endpoint])
+        for q in quantiles:
+            rank = max(1, int(np.ceil(q * counts[endpoint])))
+            high = int(np.searchsorted(cumulative, rank))
+            below = int(cumulative[high - 1]) if high else 0
+            row = targets.setdefault((int(endpoint), high), len(targets))
+            wanted.append((int(endpoint), q, row, high, rank - below))
+
+    # Pass 2: exact low-bit counts, only for the located buckets
+    fine = np.zeros(max(len(targets), 1) * width, dtype=np.int64)
+    if targets:
+        lookup = np.full(n_endpoints * width, -1, dtype=np.int64)
+        aggregated_lookup = np.full(width, -1, dtype=np.int64)
+        for (endpoint, high), row in targets.items():
+            if endpoint == aggregated:
+                aggregated_lookup[high] = row
+            else:
+                lookup[endpoint * width + high] = row
+        for endpoint, latency, _ in _remapped_chunks(readers, names[:-1], chunk_size):
+            high, low = latency >> 16, latency & 0xFFFF
+            for row in (lookup[endpoint * width + high], aggregated_lookup[high]):
+                hit = row >= 0
+                fine += np.bincount(row[hit] * width + low[hit], minlength=fine.size)
+    fine = fine.reshape(-1, width)
+
+    summary: dict[str, dict[str, Any]] = {}
+    for endpoint in np.nonzero(counts)[0]:
+        summary[names[endpoint]] = {
+            "num_requests": int(counts[endpoint]),
+            "num_failures": int(failures[endpoint]),
+            "avg_response_time": float(latency_sum[endpoint] / counts[endpoint] / 1000),
+            "max_response_time": float(latency_max[endpoint] / 1000),
+            "percentiles": {},
+        }
+    for endpoint, q, row, high, rank in wanted:
+        low = int(np.searchsorted(np.cumsum(fine[row]), rank))
+        summary[names[endpoint]]["percentiles"][q] = ((high << 16) | low) / 1000
+    return summary
+
+
+def install_trace_writer(environment: Any, path: str = REQUEST_TRACE_PATH) -> TraceWriter | None:
+    """
+    Attach a TraceWriter to `environment` if `path` is set.
+    Call from an `init` listener; the file is opened when the test starts.
+    """
+    if not path or is_master(environment):
+        return None
+
+    sink = TraceWriter(path, max_queue=REQUEST_TRACE_MAX_QUEUE, max_bytes=REQUEST_TRACE_MAX_BYTES)
+    attach_sink(environment, sink)
+    return sink
@@ -1,9 +1,13 @@
 import argparse
+import shlex
 import subprocess
 import logging
 import sys
 from pathlib import Path
 
+# Add the backend directory to sys.path to allow importing the launcher
+sys.path.append(str(Path(__file__).parent.parent.parent.parent))
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -25,12 +29,28 @@ def main() -> None:
     parser.add_argument("--spawn-rate", type=float, default=10.0, help="User spawn rate per second")
     parser.add_argument("--expect-workers", type=int, default=1, help="Expected worker count (master)")
     parser.add_argument("--extra-args", type=str, default="", help="Extra args for locust command")
+    parser.add_argument("--processes", type=int, nargs="?", const=0, default=None,
+                        help="Start a master plus N local workers (default N: one per core)")
+    parser.add_argument("--pin-cpus", action="store_true", help="Pin each local worker to its own core (--processes)")
+    parser.add_argument("--max-restarts", type=int, default=5, help="Restarts per crashed local worker (--processes)")
     args = parser.parse_args()
 
     if not LOCUSTFILE.exists():
         logger.error(f"Could not find locustfile.py at {LOCUSTFILE}")
         sys.exit(1)
 
+    if args.processes is not None:
+        from app.core.locust_load_test.launcher import LocalCluster
+
+        cluster = LocalCluster(
+            LOCUSTFILE,
+            processes=args.processes,
+            master_args=["--users", str(args.users), "--spawn-rate", str(args.spawn_rate)] + shlex.split(args.extra_args),
+            pin_cpus=args.pin_cpus,
+            max_restarts=args.max_restarts,
+        )
+        sys.exit(cluster.run())
+
     if args.master:
         cmd = (
             f"locust -f {LOCUSTFILE} --master --expect-workers {args.expect_workers} "
@@ -0,0 +1,306 @@
+"""
+Load-generator saturation detection.
+
+A worker pegged at 100% CPU delays its own greenlets: responses sit in the
+socket until the hub gets to them and tasks start late, so the latencies it
+records grow although the system under test is fine. Each worker therefore
+samples its own load over every stats report interval:
+
+- CPU usage of the worker process (psutil),
+- event-loop lag: how much later than requested a probe greenlet wakes up
+  from gevent.sleep(), i.e. how long the hub takes to get around to it,
+- send delay: in the open model, how late tasks start relative to their
+  scheduled arrival (see arrival.task_start_lag_ms).
+
+The sample travels to the master with the stats it describes. An interval
+in which any of them crosses its threshold is flagged as saturated, except
+the first one after test_start: it covers spawning users, interpreter
+warm-up and the CPU it takes to open connections, which are not steady
+load. With SATURATION_REJECT the worker drops that interval's latencies
+from the report (request, failure and error counts are kept), so the
+master's response times only contain samples from healthy generators.
+The master logs per worker how often this happened, serves the totals at
+/stats/saturation, and generate_report.py states whether the bottleneck was
+the load generator or the system under test.
+"""
+
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import gevent
+import psutil
+
+logger = logging.getLogger(__name__)
+
+SATURATION_CPU_PERCENT = float(os.getenv("SATURATION_CPU_PERCENT", "90"))  # Worker CPU at or above this marks an interval saturated
+SATURATION_LOOP_LAG_MS = float(os.getenv("SATURATION_LOOP_LAG_MS", "100"))  # Worst event-loop lag within an interval
+SATURATION_SEND_DELAY_MS = float(os.getenv("SATURATION_SEND_DELAY_MS", "250"))  # Average task start delay (open model only)
+SATURATION_REJECT = os.getenv("SATURATION_REJECT", "false").lower() == "true"  # Drop latencies from saturated intervals
+SATURATION_PROBE_INTERVAL = float(os.getenv("SATURATION_PROBE_INTERVAL", "0.1"))  # Seconds between event-loop probes
+REPORT_KEY = "saturation"
+# Extra per-interval latency samples in worker reports (see histogram.py) that are dropped along with the stats
+REJECTED_REPORT_KEYS = ("hdr_histograms", "hdr_corrected_histograms")
+LOCAL_WORKER = "local"
+
+
+class SaturationMonitor:
+    """Samples one process's CPU, event-loop lag and send delay between calls to sample()."""
+
+    def __init__(
+        self,
+        cpu_percent: float = SATURATION_CPU_PERCENT,
+        loop_lag_ms: float = SATURATION_LOOP_LAG_MS,
+        send_delay_ms: float = SATURATION_SEND_DELAY_MS,
+        reject: bool = SATURATION_REJECT,
+        probe_interval: float = SATURATION_PROBE_INTERVAL,
+        start_lag: Optional[Callable[[], float]] = None,
+        cpu: Optional[Callable[[], float]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.cpu_percent = cpu_percent
+        self.loop_lag_ms = loop_lag_ms
+        self.send_delay_ms = send_delay_ms
+        self.reject = reject
+        self.probe_interval = probe_interval
+        self.start_lag = start_lag
+        # cpu_percent() measures since its previous call, i.e. over one interval
+        self.cpu = cpu or psutil.Process().cpu_percent
+        self.clock = clock
+        self._probe: Optional[gevent.Greenlet] = None
+        self._warming_up = False
+        self._clear()
+
+    def _clear(self) -> None:
+        self.max_loop_lag_ms = 0.0
+        self.send_delay_total_ms = 0.0
+        self.send_delay_count = 0
+
+    def record_loop_lag(self, lag_ms: float) -> None:
+        self.max_loop_lag_ms = max(self.max_loop_lag_ms, lag_ms)
+
+    def on_request(self, **kwargs: Any) -> None:
+        self.send_delay_total_ms += self.start_lag()
+        self.send_delay_count += 1
+
+    def probe(self) -> None:
+        """Greenlet body: measure how late the hub wakes us up."""
+        while True:
+            before = self.clock()
+            gevent.sleep(self.probe_interval)
+            self.record_loop_lag(max(0.0, self.clock() - before - self.probe_interval) * 1000)
+
+    def start(self, **kwargs: Any) -> None:
+        self.stop()
+        self._clear()
+        self._warming_up = True
+        self.cpu()
+        self._probe = gevent.spawn(self.probe)
+
+    def stop(self, **kwargs: Any) -> None:
+        if self._probe is not None:
+            self._probe.kill(block=False)
+            self._probe = None
+
+    def sample(self) -> Dict[str, Any]:
+        """Load since the last sample and why it counts as saturated, if it does (never the first after start())."""
+        cpu = self.cpu()
+        send_delay = self.send_delay_total_ms / self.send_delay_count if self.send_delay_count else 0.0
+        warmup, self._warming_up = self._warming_up, False
+        reasons = []
+        if not warmup:
+            if cpu >= self.cpu_percent:
+                reasons.append(f"CPU {cpu:.0f}%")
+            if self.max_loop_lag_ms >= self.loop_lag_ms:
+                reasons.append(f"event loop lag {self.max_loop_lag_ms:.0f} ms")
+            if self.send_delay_count and send_delay >= self.send_delay_ms:
+                reasons.append(f"send delay {send_delay:.0f} ms")
+        sample = {
+            "cpu_percent": cpu,
+            "loop_lag_ms": self.max_loop_lag_ms,
+            "send_delay_ms": send_delay,
+            "reasons": reasons,
+            "warmup": warmup,
+        }
+        self._clear()
+        return sample
+
+    def on_report_to_master(self, client_id: str, data: Dict[str, Any]) -> None:
+        """Worker side: attach the sample for the interval these stats cover; drop their latencies if saturated and rejecting."""
+        sample = self.sample()
+        sample["requests"] = data.get("stats_total", {}).get("num_requests", 0)
+        sample["rejected"] = bool(sample["reasons"]) and self.reject
+        if sample["rejected"]:
+            reject_stats(data)
+        data[REPORT_KEY] = sample
+
+
+def strip_latencies(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """A serialized StatsEntry with its counts but no response times, as if none had been measured."""
+    return {
+        **entry,
+        "num_none_requests": entry.get("num_requests", 0),
+        "total_response_time": 0,
+        "max_response_time": 0,
+        "min_response_time": None,
+        "response_times": {},
+    }
+
+
+def reject_stats(data: Dict[str, Any]) -> None:
+    """
+    Drop the latency samples from a worker report. Request and failure
+    counts and the errors stay: those requests were sent and answered, only
+    their timing was distorted. Locust counts requests without a response
+    time (num_none_requests) out of averages and percentiles.
+    """
+    data["stats"] = [strip_latencies(entry) for entry in data.get("stats", [])]
+    if data.get("stats_total"):
+        data["stats_total"] = strip_latencies(data["stats_total"])
+    for key in REJECTED_REPORT_KEYS:
+        data.pop(key, None)
+
+
+class WorkerSaturation:
+    """Saturated intervals of one worker, as seen by the master."""
+
+    def __init__(self):
+        self.intervals = 0
+        self.saturated = 0
+        self.requests = 0
+        self.saturated_requests = 0
+        self.rejected_requests = 0
+        self.peak_cpu_percent = 0.0
+        self.peak_loop_lag_ms = 0.0
+        self.peak_send_delay_ms = 0.0
+        self.reasons: List[str] = []
+
+    def add(self, sample: Dict[str, Any]) -> None:
+        requests = sample.get("requests", 0)
+        self.intervals += 1
+        self.requests += requests
+        self.peak_cpu_percent = max(self.peak_cpu_percent, sample.get("cpu_percent", 0.0))
+        self.peak_loop_lag_ms = max(self.peak_loop_lag_ms, sample.get("loop_lag_ms", 0.0))
+        self.peak_send_delay_ms = max(self.peak_send_delay_ms, sample.get("send_delay_ms", 0.0))
+        if sample.get("reasons"):
+            self.saturated += 1
+            self.saturated_requests += requests
+            self.reasons = sample["reasons"]
+            if sample.get("rejected"):
+                self.rejected_requests += requests
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+
+class SaturationStats:
+    """Per-worker saturation totals on the master (or a local runner)."""
+
+    def __init__(self):
+        self.workers: Dict[str, WorkerSaturation] = {}
+
+    def add(self, worker: str, sample: Dict[str, Any]) -> None:
+        self.workers.setdefault(worker, WorkerSaturation()).add(sample)
+
+    def reset(self, **kwargs: Any) -> None:
+        self.workers = {}
+
+    def on_worker_report(self, client_id: str, data: Dict[str, Any]) -> None:
+        if REPORT_KEY in data:
+            self.add(client_id, data[REPORT_KEY])
+
+    def verdict(self) -> str:
+        saturated = {worker: stats for worker, stats in self.workers.items() if stats.saturated}
+        if not self.workers:
+            return "No load generator samples were collected."
+        if not saturated:
+            return "The load generator was never saturated; the measured latencies reflect the system under test."
+        intervals = sum(stats.intervals for stats in self.workers.values())
+        saturated_intervals = sum(stats.saturated for stats in saturated.values())
+        details = ", ".join(f"{worker}: {', '.join(stats.reasons)}" for worker, stats in sorted(saturated.items()))
+        rejected = sum(stats.rejected_requests for stats in saturated.values())
+        outcome = (
+            f"The response times of {rejected} requests from those intervals were left out of the results."
+            if rejected
+            else "Latencies from those intervals are inflated by the load generator, not the system under test."
+        )
+        return (
+            f"The load generator was saturated in {saturated_intervals} of {intervals} report intervals "
+            f"({details}). {outcome} Add workers or run fewer users per worker."
+        )
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "saturated": any(stats.saturated for stats in self.workers.values()),
+            "verdict": self.verdict(),
+            "workers": {worker: stats.to_dict() for worker, stats in sorted(self.workers.items())},
+        }
+
+    def log_summary(self) -> None:
+        if any(stats.saturated for stats in self.workers.values()):
+            logger.warning(self.verdict())
+        elif self.workers:
+            logger.info(self.verdict())
+
+
+def install_saturation(environment: Any, start_lag: Optional[Callable[[], float]] = None) -> SaturationStats:
+    """
+    Sample generator load on workers (and local runners) and collect it on
+    the master. Pass arrival.start_lag_source() as `start_lag` to include
+    the send delay. Call from an `init` listener, after install_histograms.
+    """
+    from locust.runners import MasterRunner, WorkerRunner
+
+    runner = environment.runner
+    events = environment.events
+    stats = SaturationStats()
+    events.test_start.add_listener(stats.reset)
+    events.reset_stats.add_listener(stats.reset)
+
+    if isinstance(runner, MasterRunner):
+        events.worker_report.add_listener(stats.on_worker_report)
+        # Workers only send their last report when told to quit, so summarize after that
+        events.quit.add_listener(lambda **kwargs: stats.log_summary())
+    else:
+        monitor = SaturationMonitor(start_lag=start_lag)
+        events.test_start.add_listener(monitor.start)
+        events.test_stop.add_listener(monitor.stop)
+        if start_lag is not None:
+            events.request.add_listener(monitor.on_request)
+        if isinstance(runner, WorkerRunner):
+            events.report_to_master.add_listener(monitor.on_report_to_master)
+        else:
+            local_loop: List[gevent.Greenlet] = []
+
+            def sample_locally() -> None:
+                from locust.runners import WORKER_REPORT_INTERVAL
+
+                previous = runner.stats.total.num_requests
+                while True:
+                    gevent.sleep(WORKER_REPORT_INTERVAL)
+                    sample = monitor.sample()
+                    sample["requests"] = runner.stats.total.num_requests - previous
+                    previous = runner.stats.total.num_requests
+                    stats.add(LOCAL_WORKER, sample)
+
+            def on_test_start(**kwargs: Any) -> None:
+                local_loop.append(gevent.spawn(sample_locally))
+
+            def on_test_stop(**kwargs: Any) -> None:
+                while local_loop:
+                    local_loop.pop().kill(block=False)
+                stats.log_summary()
+
+            events.test_start.add_listener(on_test_start)
+            events.test_stop.add_listener(on_test_stop)
+
+    if environment.web_ui:
+        from flask import jsonify
+
+        @environment.web_ui.app.route("/stats/saturation")
+        @environment.web_ui.auth_required_if_enabled
+        def saturation_stats() -> Any:
+            return jsonify(stats.summary())
+
+    return stats
@@ -0,0 +1,249 @@
+"""
+Declarative service level objectives with early abort and pass/fail gating.
+
+Rules are written as `<metric>[<endpoint>] <op> <threshold>`, separated by
+semicolons in SLO_RULES or one per line in SLO_FILE, for example:
+
+    p99[Read Items] < 300; failure_ratio < 0.01; rps >= 50
+
+Metrics are percentiles (p50, p95, p99, p99.9, ...), `avg` (ms),
+`failure_ratio` (0..1) and `rps`. Without an endpoint a rule applies to all
+requests. An endpoint matches the request name for every HTTP method.
+
+On the master (or a local runner) SLOMonitor takes the change in Locust's
+cumulative stats once a second and keeps a sliding window of these
+per-second deltas, adding the newest and subtracting the one that drops
+out, so history is never rescanned (stats_window.py). When a rule stays
+breached over the window for SLO_BREACH_DURATION seconds the test is
+stopped early. Lower bounds (`>`, `>=`, e.g. on rps) are only judged once
+the window holds no seconds from before the users finished spawning, so a
+ramp-up doesn't abort the test.
+
+When the run ends, every rule is checked against the whole run, and the
+process exit code is set to 1 if any rule failed or the test was aborted,
+so CI can gate on it.
+"""
+
+import logging
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import gevent
+
+from app.core.locust_load_test.stats_window import (
+    EMPTY,
+    Snapshot,
+    StatsWindow,
+    difference,
+    snapshot,
+)
+
+logger = logging.getLogger(__name__)
+
+SLO_RULES = os.getenv("SLO_RULES", "")
+SLO_FILE = os.getenv("SLO_FILE")
+# Seconds of requests each rule is evaluated over
+SLO_WINDOW = int(os.getenv("SLO_WINDOW", "30"))
+# Seconds a breach must last before aborting
+SLO_BREACH_DURATION = int(os.getenv("SLO_BREACH_DURATION", "10"))
+# Windows with fewer requests are not judged
+SLO_MIN_REQUESTS = int(os.getenv("SLO_MIN_REQUESTS", "20"))
+SLO_ABORT = os.getenv("SLO_ABORT", "true").lower() == "true"
+
+RULE_PATTERN = re.compile(
+    r"^(?P<metric>p\d+(?:\.\d+)?|avg|failure_ratio|rps)\s*(?:\[(?P<name>[^\]]+)\])?\s*"
+    r"(?P<op><=|>=|<|>)\s*(?P<threshold>\d+(?:\.\d+)?)$"
+)
+OPERATORS = {
+    "<": lambda value, threshold: value < threshold,
+    "<=": lambda value, threshold: value <= threshold,
+    ">": lambda value, threshold: value > threshold,
+    ">=": lambda value, threshold: value >= threshold,
+}
+
+class SLORule:
+    """One threshold on one metric of one endpoint (or of all requests when `name` is None)."""
+
+    def __init__(self, metric: str, op: str, threshold: float, name: Optional[str] = None):
+        if op not in OPERATORS:
+            raise ValueError(f"Unknown operator {op!r}")
+        self.metric = metric
+        self.op = op
+        self.threshold = threshold
+        self.name = name
+
+    @classmethod
+    def parse(cls, text: str) -> "SLORule":
+        match = RULE_PATTERN.match(text.strip())
+        if not match:
+            raise ValueError(f"Cannot parse SLO rule {text!r}")
+        name = match["name"].strip() if match["name"] else None
+        return cls(match["metric"], match["op"], float(match["threshold"]), name)
+
+    def measure(self, window: "StatsWindow") -> float:
+        if self.metric == "avg":
+            return window.avg
+        if self.metric == "failure_ratio":
+            return window.failure_ratio
+        if self.metric == "rps":
+            return window.rps
+        return window.percentile(float(self.metric[1:]) / 100)
+
+    def passes(self, value: float) -> bool:
+        return OPERATORS[self.op](value, self.threshold)
+
+    def __str__(self) -> str:
+        target = f"[{self.name}]" if self.name else ""
+        return f"{self.metric}{target} {self.op} {self.threshold:g}"
+
+
+def parse_rules(text: str) -> List[SLORule]:
+    """Rules separated by semicolons or newlines; blank lines and `#` comments are skipped."""
+    rules = []
+    for line in re.split(r"[;\n]", text):
+        line = line.split("#", 1)[0].strip()
+        if line:
+            rules.append(SLORule.parse(line))
+    return rules
+
+
+def load_rules(rules: str = SLO_RULES, path: Optional[str] = SLO_FILE) -> List[SLORule]:
+    text = rules
+    if path:
+        with open(path) as f:
+            text += "\n" + f.read()
+    return parse_rules(text)
+
+
+class SLOMonitor:
+    """Evaluates rules once per sample() call, i.e. once a second on the master."""
+
+    def __init__(
+        self,
+        rules: List[SLORule],
+        window: int = SLO_WINDOW,
+        breach_duration: int = SLO_BREACH_DURATION,
+        min_requests: int = SLO_MIN_REQUESTS,
+        abort: bool = SLO_ABORT,
+    ):
+        self.rules = rules
+        self.window = window
+        self.breach_duration = breach_duration
+        self.min_requests = min_requests
+        self.abort = abort
+        self.reset()
+
+    def reset(self, **kwargs: Any) -> None:
+        targets = {rule.name for rule in self.rules}
+        self.windows = {name: StatsWindow(self.window) for name in targets}
+        self.previous: Dict[Optional[str], Snapshot] = {name: EMPTY for name in targets}
+        self.breached_for = {str(rule): 0 for rule in self.rules}
+        self.seconds = 0
+        self.running_for = 0
+        self.aborted: List[str] = []
+
+    def _entries(self, stats: Any, name: Optional[str]) -> List[Any]:
+        if name is None:
+            return [stats.total]
+        return [entry for (entry_name, _), entry in stats.entries.items() if entry_name == name]
+
+    def sample(self, stats: Any, running: bool = True) -> List[str]:
+        """
+        Take one second of deltas; returns the rules breached for
+        `breach_duration` seconds. `running` is False while users are spawning.
+        """
+        self.seconds += 1
+        self.running_for = self.running_for + 1 if running else 0
+        for name, window in self.windows.items():
+            current = snapshot(self._entries(stats, name))
+            window.push(difference(current, self.previous[name]))
+            self.previous[name] = current
+
+        sustained = []
+        for rule in self.rules:
+            window = self.windows[rule.name]
+            key = str(rule)
+            if rule.op in (">", ">=") and self.running_for < self.window:
+                self.breached_for[key] = 0
+            elif window.requests >= self.min_requests and not rule.passes(rule.measure(window)):
+                self.breached_for[key] += 1
+            else:
+                self.breached_for[key] = 0
+            if self.breached_for[key] >= self.breach_duration:
+                sustained.append(f"{key} (now {rule.measure(window):.4g})")
+        return sustained
+
+    def verdict(self, stats: Any) -> List[Tuple[SLORule, float, bool]]:
+        """Every rule checked against the whole run."""
+        results = []
+        for rule in self.rules:
+            whole_run = StatsWindow(1)
+            whole_run.push(snapshot(self._entries(stats, rule.name)))
+            if rule.metric == "rps":
+                value = whole_run.requests / max(self.seconds, 1)
+            else:
+                value = rule.measure(whole_run)
+            results.append((rule, value, rule.passes(value)))
+        return results
+
+    def install(self, environment: Any) -> None:
+        """Evaluate on the master or a local runner. Call from an `init` listener."""
+        from locust.runners import STATE_RUNNING, WorkerRunner
+
+        if isinstance(environment.runner, WorkerRunner):
+            return
+        events = environment.events
+        loop: List[gevent.Greenlet] = []
+
+        def watch() -> None:
+            runner = environment.runner
+            while True:
+                gevent.sleep(1)
+                breached = self.sample(runner.stats, runner.state == STATE_RUNNING)
+                if breached and self.abort:
+                    self.aborted = breached
+                    logger.error(
+                        f"SLO breached for {self.breach_duration}s, stopping the test: "
+                        f"{', '.join(breached)}"
+                    )
+                    environment.process_exit_code = 1
+                    if environment.web_ui:
+                        runner.stop()
+                    else:
+                        runner.quit()
+                    return
+
+        def on_test_start(**kwargs: Any) -> None:
+            self.reset()
+            loop.append(gevent.spawn(watch))
+
+        def on_test_stop(**kwargs: Any) -> None:
+            while loop:
+                greenlet = loop.pop()
+                if greenlet is not gevent.getcurrent():
+                    greenlet.kill(block=False)
+
+        def on_quitting(environment: Any, **kwargs: Any) -> None:
+            failed = bool(self.aborted)
+            for rule, value, passed in self.verdict(environment.runner.stats):
+                logger.info(f"SLO {'PASS' if passed else 'FAIL'}: {rule} (measured {value:.4g})")
+                failed = failed or not passed
+            if failed:
+                environment.process_exit_code = 1
+
+        events.test_start.add_listener(on_test_start)
+        events.reset_stats.add_listener(self.reset)
+        events.test_stop.add_listener(on_test_stop)
+        events.quitting.add_listener(on_quitting)
+
+
+def install_slo(environment: Any) -> Optional[SLOMonitor]:
+    """Attach an SLOMonitor when SLO_RULES or SLO_FILE is set. Call from an `init` listener."""
+    rules = load_rules()
+    if not rules:
+        return None
+    monitor = SLOMonitor(rules)
+    monitor.install(environment)
+    logger.info(f"SLO rules: {'; '.join(str(rule) for rule in rules)}")
+    return monitor
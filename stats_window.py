@@ -0,0 +1,124 @@
+"""
+Request stats over a span of a running test.
+
+Locust's StatsEntry only keeps cumulative totals. snapshot() captures the
+requests, failures, requests without a response time, total response time
+and rounded response-time counts of some entries, and difference() of two
+snapshots is what happened in between. StatsWindow sums such deltas: a
+sliding number of them (one per second for the SLO checks in slo.py) or a
+single one covering a whole span (a capacity search level in
+custom/load_shapes.py, or a whole run).
+
+percentile_from_counts is the nearest-rank percentile behind StatsWindow
+and the HDR histograms in histogram.py.
+"""
+
+import math
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, Tuple
+
+# (requests, failures, requests without a response time, total response time in ms,
+#  {rounded response time: count})
+Snapshot = Tuple[int, int, int, float, Dict[int, int]]
+EMPTY: Snapshot = (0, 0, 0, 0.0, {})
+
+
+def percentile_from_counts(
+    counts: Iterable[Tuple[int, int]], total: int, quantile: float, value_of: Callable[[int], int] = lambda index: index
+) -> int:
+    """
+    Nearest-rank percentile over (bucket, count) pairs in any order.
+    `value_of` maps a bucket to the value it stands for.
+    """
+    rank = max(1, math.ceil(quantile * total))
+    seen = 0
+    for index, count in sorted(counts):
+        seen += count
+        if seen >= rank:
+            return value_of(index)
+    raise ValueError("total is larger than the sum of counts")
+
+
+def snapshot(entries: Iterable[Any]) -> Snapshot:
+    """Cumulative totals of Locust StatsEntry objects, summed."""
+    requests = failures = untimed = 0
+    total_time = 0.0
+    counts: Dict[int, int] = {}
+    for entry in entries:
+        requests += entry.num_requests
+        failures += entry.num_failures
+        untimed += entry.num_none_requests
+        total_time += entry.total_response_time
+        for response_time, count in entry.response_times.items():
+            counts[response_time] = counts.get(response_time, 0) + count
+    return requests, failures, untimed, total_time, counts
+
+
+def difference(current: Snapshot, previous: Snapshot) -> Snapshot:
+    """What happened between two snapshots of the same entries."""
+    counts = {}
+    previous_counts = previous[4]
+    for response_time, count in current[4].items():
+        delta = count - previous_counts.get(response_time, 0)
+        if delta:
+            counts[response_time] = delta
+    return (
+        current[0] - previous[0],
+        current[1] - previous[1],
+        current[2] - previous[2],
+        current[3] - previous[3],
+        counts,
+    )
+
+
+class StatsWindow:
+    """Sliding sum of the last `size` stats deltas."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.deltas: deque = deque()
+        self.requests = 0
+        self.failures = 0
+        self.untimed = 0
+        self.total_time = 0.0
+        self.counts: Dict[int, int] = {}
+
+    def _apply(self, delta: Snapshot, sign: int) -> None:
+        requests, failures, untimed, total_time, counts = delta
+        self.requests += sign * requests
+        self.failures += sign * failures
+        self.untimed += sign * untimed
+        self.total_time += sign * total_time
+        for response_time, count in counts.items():
+            remaining = self.counts.get(response_time, 0) + sign * count
+            if remaining:
+                self.counts[response_time] = remaining
+            else:
+                del self.counts[response_time]
+
+    def push(self, delta: Snapshot) -> None:
+        self.deltas.append(delta)
+        self._apply(delta, 1)
+        while len(self.deltas) > self.size:
+            self._apply(self.deltas.popleft(), -1)
+
+    @property
+    def avg(self) -> float:
+        """Mean response time of the requests that have one, like Locust's avg_response_time."""
+        timed = self.requests - self.untimed
+        return self.total_time / timed if timed else 0.0
+
+    @property
+    def failure_ratio(self) -> float:
+        return self.failures / self.requests if self.requests else 0.0
+
+    @property
+    def rps(self) -> float:
+        """Requests per pushed delta, i.e. per second when one is pushed every second."""
+        return self.requests / len(self.deltas) if self.deltas else 0.0
+
+    def percentile(self, quantile: float) -> float:
+        total = sum(self.counts.values())
+        if not total:
+            return 0.0
+        return float(percentile_from_counts(self.counts.items(), total, quantile))
@@ -0,0 +1,190 @@
+"""
+Per-worker heartbeat and report timing, tracked on the master.
+
+Counting connected workers can't tell a healthy worker from one whose
+stats reports arrive seconds late because its hub is starved. Such a
+worker still sends heartbeats often enough not to be marked missing, but
+its requests land in the master's aggregates in bursts, which skews the
+current RPS and the windowed percentiles.
+
+For every worker the master records:
+
+- the gap between consecutive heartbeats (expected: HEARTBEAT_INTERVAL),
+- the gap between consecutive stats reports (expected:
+  WORKER_REPORT_INTERVAL), and how long the report took from the worker's
+  report_to_master to the master (wall clock, so it includes any clock
+  skew between machines),
+- how many stats and error entries the report carried, i.e. how much had
+  queued up on the worker since its previous report,
+- how old the worker's latest stats are right now.
+
+A gap longer than WORKER_LATE_FACTOR times the expected interval counts as
+late. The master serves the figures at /workers, merged with the state,
+users and CPU it already keeps per worker; health_check.py and
+generate_report.py read them from there, and the master logs the workers
+with late reports when it quits.
+"""
+
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+WORKER_LATE_FACTOR = float(os.getenv("WORKER_LATE_FACTOR", "2"))  # Gap over this many expected intervals counts as late
+REPORT_KEY = "report_timing"
+
+
+def on_report_to_master(client_id: str, data: Dict[str, Any]) -> None:
+    """Worker side: stamp the report so the master can measure how long it took."""
+    data[REPORT_KEY] = {"sent_at": time.time()}
+
+
+class WorkerTiming:
+    """Heartbeat and report timing of one worker, as seen by the master."""
+
+    def __init__(self):
+        self.heartbeats = 0
+        self.last_heartbeat_at: Optional[float] = None
+        self.heartbeat_interval_s = 0.0
+        self.max_heartbeat_interval_s = 0.0
+        self.reports = 0
+        self.late_reports = 0
+        self.last_report_at: Optional[float] = None
+        self.report_interval_s = 0.0
+        self.max_report_interval_s = 0.0
+        self.report_lag_ms = 0.0
+        self.max_report_lag_ms = 0.0
+        self.queued_entries = 0
+        self.max_queued_entries = 0
+
+    def heartbeat(self, now: float) -> None:
+        if self.last_heartbeat_at is not None:
+            self.heartbeat_interval_s = now - self.last_heartbeat_at
+            self.max_heartbeat_interval_s = max(self.max_heartbeat_interval_s, self.heartbeat_interval_s)
+        self.last_heartbeat_at = now
+        self.heartbeats += 1
+
+    def report(self, data: Dict[str, Any], now: float, late_after: float) -> None:
+        if self.last_report_at is not None:
+            self.report_interval_s = now - self.last_report_at
+            self.max_report_interval_s = max(self.max_report_interval_s, self.report_interval_s)
+            self.late_reports += self.report_interval_s > late_after
+        sent_at = data.get(REPORT_KEY, {}).get("sent_at")
+        if sent_at is not None:
+            self.report_lag_ms = max(0.0, now - sent_at) * 1000
+            self.max_report_lag_ms = max(self.max_report_lag_ms, self.report_lag_ms)
+        self.queued_entries = len(data.get("stats", ())) + len(data.get("errors", ()))
+        self.max_queued_entries = max(self.max_queued_entries, self.queued_entries)
+        self.last_report_at = now
+        self.reports += 1
+
+    def reset(self) -> None:
+        """Start the per-run peaks and late count over; keep the last timestamps."""
+        self.max_heartbeat_interval_s = 0.0
+        self.max_report_interval_s = 0.0
+        self.max_report_lag_ms = 0.0
+        self.max_queued_entries = 0
+        self.late_reports = 0
+
+    def to_dict(self, now: float, heartbeat_late_after: float, report_late_after: float) -> Dict[str, Any]:
+        values = {key: value for key, value in vars(self).items() if not key.startswith("last_")}
+        values["heartbeat_age_s"] = now - self.last_heartbeat_at if self.last_heartbeat_at is not None else None
+        values["stats_age_s"] = now - self.last_report_at if self.last_report_at is not None else None
+        values["late"] = (values["heartbeat_age_s"] or 0) > heartbeat_late_after or (
+            values["stats_age_s"] or 0
+        ) > report_late_after
+        return values
+
+
+class WorkerTimingStats:
+    """Timing of every worker on the master."""
+
+    def __init__(
+        self,
+        heartbeat_interval: float,
+        report_interval: float,
+        late_factor: float = WORKER_LATE_FACTOR,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.heartbeat_late_after = late_factor * heartbeat_interval
+        self.report_late_after = late_factor * report_interval
+        self.clock = clock
+        self.workers: Dict[str, WorkerTiming] = {}
+
+    def _worker(self, client_id: str) -> WorkerTiming:
+        worker = self.workers.get(client_id)
+        if worker is None:
+            worker = self.workers[client_id] = WorkerTiming()
+        return worker
+
+    def on_heartbeat(self, client_id: str, timestamp: Optional[float] = None, **kwargs: Any) -> None:
+        self._worker(client_id).heartbeat(self.clock())
+
+    def on_worker_report(self, client_id: str, data: Dict[str, Any]) -> None:
+        self._worker(client_id).report(data, self.clock(), self.report_late_after)
+
+    def reset(self, **kwargs: Any) -> None:
+        for worker in self.workers.values():
+            worker.reset()
+
+    def summary(self, clients: Dict[str, Any]) -> Dict[str, Any]:
+        """/workers: each connected worker's runner state merged with its timing"""
+        now = self.clock()
+        workers = []
+        for client_id, client in clients.items():
+            timing = self.workers.get(client_id)
+            workers.append({
+                "id": client_id,
+                "state": client.state,
+                "user_count": client.user_count,
+                "cpu_usage": client.cpu_usage,
+                "memory_usage": client.memory_usage,
+                **(timing.to_dict(now, self.heartbeat_late_after, self.report_late_after) if timing else {}),
+            })
+        return {
+            "workers": workers,
+            "late": [worker["id"] for worker in workers if worker.get("late")],
+            "heartbeat_late_after_s": self.heartbeat_late_after,
+            "report_late_after_s": self.report_late_after,
+        }
+
+    def log_summary(self) -> None:
+        late = {client_id: worker for client_id, worker in self.workers.items() if worker.late_reports}
+        for client_id, worker in sorted(late.items()):
+            logger.warning(
+                f"Worker {client_id}: {worker.late_reports} of {worker.reports} stats reports arrived late "
+                f"(longest gap {worker.max_report_interval_s:.1f}s, peak lag {worker.max_report_lag_ms:.0f} ms, "
+                f"up to {worker.max_queued_entries} queued entries); its requests reached the aggregates in bursts"
+            )
+
+
+def install_worker_health(environment: Any) -> Optional[WorkerTimingStats]:
+    """Stamp reports on workers and track their timing on the master. Call from an `init` listener."""
+    from locust.runners import HEARTBEAT_INTERVAL, WORKER_REPORT_INTERVAL, MasterRunner, WorkerRunner
+
+    runner = environment.runner
+    events = environment.events
+    if isinstance(runner, WorkerRunner):
+        events.report_to_master.add_listener(on_report_to_master)
+        return None
+    if not isinstance(runner, MasterRunner):
+        return None
+
+    stats = WorkerTimingStats(HEARTBEAT_INTERVAL, WORKER_REPORT_INTERVAL)
+    # Fired by the master each time it gets (and answers) a worker's heartbeat
+    events.heartbeat_sent.add_listener(stats.on_heartbeat)
+    events.worker_report.add_listener(stats.on_worker_report)
+    events.test_start.add_listener(stats.reset)
+    events.quit.add_listener(lambda **kwargs: stats.log_summary())
+
+    if environment.web_ui:
+        from flask import jsonify
+
+        @environment.web_ui.app.route("/workers")
+        @environment.web_ui.auth_required_if_enabled
+        def worker_health() -> Any:
+            return jsonify(stats.summary(runner.clients))
+
+    return stats